@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tools.label_scanner import scan_label_files
+
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg", ".webp")
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dataset_stats (
+    image_dir TEXT NOT NULL,
+    label_dir TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    image_count INTEGER NOT NULL,
+    label_count INTEGER NOT NULL,
+    class_histogram TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (image_dir, label_dir)
+);
+CREATE TABLE IF NOT EXISTS label_files (
+    label_dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    num_labels INTEGER NOT NULL,
+    class_counts TEXT NOT NULL,
+    PRIMARY KEY (label_dir, name)
+);
+"""
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_dataset_stats_cache():
+    """
+    获取全局数据集统计缓存（首次调用时创建）
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from config import get_dataset_stats_db_path
+            _cache = DatasetStatsCache(get_dataset_stats_db_path())
+        return _cache
+
+def _dir_fingerprint(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns]
+
+class DatasetStatsCache:
+    """
+    数据集统计缓存
+
+    按 (图片目录, 标签目录) 持久化图片数、标注数与各类别直方图，
+    以两个目录的 inode + mtime 作为指纹：指纹未变时直接返回缓存；
+    指纹变化时先返回旧值，同时在后台增量刷新（只重新读取 mtime / 大小变化的标签文件）。
+    """
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        self._refreshing = set()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dataset-stats")
+
+    def _fingerprint(self, image_dir, label_dir):
+        return json.dumps([_dir_fingerprint(image_dir), _dir_fingerprint(label_dir)])
+
+    def get(self, image_dir, label_dir):
+        """
+        获取统计结果
+
+        返回 {"image_count", "label_count", "class_histogram", "status"}，status 为：
+        - fresh: 缓存有效
+        - stale: 目录已变化，返回的是上一次的结果，后台正在刷新
+        - pending: 尚无缓存，后台正在统计（各数量为 None）
+        """
+        image_dir, label_dir = str(image_dir), str(label_dir)
+        fingerprint = self._fingerprint(image_dir, label_dir)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint, image_count, label_count, class_histogram FROM dataset_stats WHERE image_dir = ? AND label_dir = ?",
+                (image_dir, label_dir),
+            ).fetchone()
+
+        if row is not None and row[0] == fingerprint:
+            return {
+                "image_count": row[1],
+                "label_count": row[2],
+                "class_histogram": json.loads(row[3]),
+                "status": "fresh",
+            }
+
+        self.schedule_refresh(image_dir, label_dir)
+        if row is None:
+            return {"image_count": None, "label_count": None, "class_histogram": None, "status": "pending"}
+        return {
+            "image_count": row[1],
+            "label_count": row[2],
+            "class_histogram": json.loads(row[3]),
+            "status": "stale",
+        }
+
+    def schedule_refresh(self, image_dir, label_dir):
+        """
+        提交后台刷新（同一对目录同时只会有一个刷新任务）
+        """
+        key = (str(image_dir), str(label_dir))
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.refresh(*key)
+            except Exception:
+                logger.exception(f"统计数据集失败: {key[0]}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._pool.submit(run)
+
+    def refresh(self, image_dir, label_dir):
+        """
+        增量统计：每个目录只列一次，标签文件 mtime / 大小未变时复用上一次的统计结果，其余交给 label_scanner 并行解析
+        """
+        image_dir, label_dir = str(image_dir), str(label_dir)
+        # 先取指纹再扫描，扫描期间若目录再次变化，下次查询时会重新刷新
+        fingerprint = self._fingerprint(image_dir, label_dir)
+
+        stems = []
+        if os.path.isdir(image_dir):
+            with os.scandir(image_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                        stems.append(os.path.splitext(entry.name)[0])
+
+        label_entries = {}
+        if os.path.isdir(label_dir):
+            with os.scandir(label_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".txt") and entry.is_file():
+                        label_entries[entry.name] = entry.stat()
+
+        with self._lock:
+            cached = {
+                name: (mtime_ns, size, num_labels, class_counts)
+                for name, mtime_ns, size, num_labels, class_counts in self._db.execute(
+                    "SELECT name, mtime_ns, size, num_labels, class_counts FROM label_files WHERE label_dir = ?",
+                    (label_dir,),
+                )
+            }
+
+        # 只重新读取新增或 mtime / 大小变化的标签文件，并行解析
+        per_file = {}
+        changed = []
+        for stem in stems:
+            name = stem + ".txt"
+            st = label_entries.get(name)
+            if st is None:
+                continue
+            entry = cached.get(name)
+            if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                per_file[name] = (entry[2], json.loads(entry[3]))
+            else:
+                changed.append(name)
+
+        scanned = scan_label_files([os.path.join(label_dir, name) for name in changed], per_file=True)["files"]
+        updated = []
+        for name in changed:
+            result = scanned.get(os.path.join(label_dir, name))
+            if result is None:
+                continue
+            st = label_entries[name]
+            class_counts = {str(cls): count for cls, count in result["class_counts"].items()}
+            per_file[name] = (result["num_labels"], class_counts)
+            updated.append((label_dir, name, st.st_mtime_ns, st.st_size, result["num_labels"], json.dumps(class_counts)))
+
+        label_count = 0
+        class_histogram = {}
+        for num_labels, class_counts in per_file.values():
+            label_count += num_labels
+            for cls, count in class_counts.items():
+                class_histogram[cls] = class_histogram.get(cls, 0) + count
+
+        stale_names = [(label_dir, name) for name in cached if name not in label_entries]
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO label_files (label_dir, name, mtime_ns, size, num_labels, class_counts) VALUES (?, ?, ?, ?, ?, ?)",
+                updated,
+            )
+            self._db.executemany("DELETE FROM label_files WHERE label_dir = ? AND name = ?", stale_names)
+            self._db.execute(
+                "INSERT OR REPLACE INTO dataset_stats (image_dir, label_dir, fingerprint, image_count, label_count, class_histogram, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (image_dir, label_dir, fingerprint, len(stems), label_count, json.dumps(class_histogram), time.time()),
+            )
+            self._db.commit()
+
+        return len(stems), label_count, class_histogram
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import env_int
+
+DOWNLOAD_WORKERS_DEFAULT = env_int("LS_DOWNLOAD_WORKERS", 16)
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _origin(url: str):
+    parts = urlsplit(url)
+    try:
+        port = parts.port
+    except ValueError:      # 端口非法的地址不会与 base_url 相同
+        return None
+    return parts.scheme.lower(), parts.hostname, port or {"http": 80, "https": 443}.get(parts.scheme.lower())
+
+class ImageDownloader:
+    """
+    并发图片下载器
+
+    - 共享一个带连接池的 requests.Session（keep-alive），连接数与线程数一致
+    - 对连接错误与 429 / 5xx 自动重试（指数退避）
+    - 流式写入临时文件后原子替换，内存占用与图片大小无关，中断不会留下半截文件
+    - 目标文件已存在时跳过：skip_existing="size" 时用 HEAD 的 Content-Length 校验大小，
+      "hash" 时与传入的 sha256 比对，"exists" 时只要存在即跳过，None 时总是重新下载
+    """
+    def __init__(
+        self,
+        max_workers: int = None,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout=(10, 60),
+        headers: dict = None,
+        base_url: str = None,
+        base_url_headers: dict = None,
+        skip_existing: str = "size",
+        chunk_size: int = 256 * 1024,
+    ):
+        self.max_workers = max_workers or DOWNLOAD_WORKERS_DEFAULT
+        self.timeout = timeout
+        self.base_url = base_url
+        # 鉴权头只发送给 Label Studio 自身，避免把 Token 泄露给外部图床
+        self.base_url_headers = base_url_headers or {}
+        self.skip_existing = skip_existing
+        self.chunk_size = chunk_size
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def resolve_url(self, url: str) -> str:
+        """
+        Label Studio 本地上传的图片为相对路径（如 /data/upload/1/xx.jpg），需拼接服务地址
+        """
+        if self.base_url and not url.lower().startswith(("http://", "https://")):
+            return urljoin(self.base_url.rstrip("/") + "/", url.lstrip("/"))
+        return url
+
+    def _headers_for(self, url: str):
+        # 按 scheme + host + port 比较，前缀匹配会把 http://ls:8080 的 Token 发给 http://ls:80801
+        origin = _origin(url)
+        if self.base_url and origin is not None and origin == _origin(self.base_url):
+            return self.base_url_headers
+        return None
+
+    def _is_present(self, url: str, dest: str, sha256: str = None) -> bool:
+        if not self.skip_existing or not os.path.exists(dest):
+            return False
+        if self.skip_existing == "exists":
+            return True
+        if self.skip_existing == "hash":
+            return sha256 is not None and file_sha256(dest) == sha256
+        # size：服务端未返回长度时视为已存在
+        try:
+            res = self.session.head(url, headers=self._headers_for(url), timeout=self.timeout, allow_redirects=True)
+            length = res.headers.get("Content-Length") if res.ok else None
+        except requests.RequestException:
+            length = None
+        return length is None or int(length) == os.path.getsize(dest)
+
+    def download(self, url: str, dest: str, sha256: str = None) -> str:
+        """
+        下载单个文件，返回 "downloaded" / "skipped"；失败时抛出异常
+        """
+        url = self.resolve_url(url)
+        if self._is_present(url, dest, sha256):
+            return "skipped"
+
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        tmp_path = f"{dest}.part.{threading.get_ident()}"
+        try:
+            with self.session.get(url, headers=self._headers_for(url), stream=True, timeout=self.timeout) as res:
+                res.raise_for_status()
+                with open(tmp_path, "wb") as f:
+                    for chunk in res.iter_content(chunk_size=self.chunk_size):
+                        if chunk:
+                            f.write(chunk)
+            os.replace(tmp_path, dest)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return "downloaded"
+
+    def download_all(self, items, on_progress=None) -> dict:
+        """
+        并发下载多个文件
+
+        - items: 可迭代的 (url, dest) 或 (url, dest, sha256)
+        - on_progress: 可选回调 on_progress(done, total)
+
+        返回 {"downloaded": n, "skipped": n, "failed": [(url, 错误信息), ...]}
+        """
+        items = list(items)
+        total = len(items)
+        result = {"downloaded": 0, "skipped": 0, "failed": []}
+        lock = threading.Lock()
+        done = [0]
+
+        def run(item):
+            url, dest = item[0], item[1]
+            sha256 = item[2] if len(item) > 2 else None
+            try:
+                status = self.download(url, dest, sha256)
+                error = None
+            except Exception as e:
+                status, error = "failed", str(e)
+            with lock:
+                if status == "failed":
+                    result["failed"].append((url, error))
+                else:
+                    result[status] += 1
+                done[0] += 1
+                if on_progress:
+                    on_progress(done[0], total)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(run, items))
+        return result
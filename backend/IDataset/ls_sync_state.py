@@ -0,0 +1,147 @@
+import json
+import os
+import sqlite3
+
+# 同步状态文件，保存在数据集目录下
+SYNC_STATE_FILENAME = ".ls_sync_state.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_key TEXT PRIMARY KEY,
+    pre_name TEXT NOT NULL,
+    image_url TEXT NOT NULL,
+    image_name TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    updated_at TEXT,
+    split TEXT,
+    stratum INTEGER,
+    sync_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_sync ON tasks (sync_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# SQLite 单条语句的参数个数上限较低，批量查询时分批
+_QUERY_BATCH = 500
+
+def sync_state_path(dataset_dir):
+    return os.path.join(dataset_dir, SYNC_STATE_FILENAME)
+
+class LabelStudioSyncState:
+    """
+    Label Studio 增量同步状态
+
+    按任务记录标注内容哈希、updated_at、对应的文件主名 / 图片文件名与所属划分，
+    同步时只处理哈希变化的任务；meta 中保存项目 ID、服务地址、类别列表与划分参数等。
+    状态存放在 SQLite 中，不需要把所有任务加载到内存。
+    """
+    def __init__(self, dataset_dir):
+        self.path = sync_state_path(dataset_dir)
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(tasks)")}
+        if "stratum" not in columns:
+            self._db.execute("ALTER TABLE tasks ADD COLUMN stratum INTEGER")
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_meta(self, key, default=None):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_tasks(self, task_keys):
+        """
+        批量获取任务记录，返回 {task_key: {...}}
+        """
+        task_keys = list(task_keys)
+        result = {}
+        for i in range(0, len(task_keys), _QUERY_BATCH):
+            batch = task_keys[i:i + _QUERY_BATCH]
+            rows = self._db.execute(
+                f"SELECT task_key, pre_name, image_url, image_name, hash, updated_at, split FROM tasks "
+                f"WHERE task_key IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            for task_key, pre_name, image_url, image_name, hash_, updated_at, split in rows:
+                result[task_key] = {
+                    "pre_name": pre_name,
+                    "image_url": image_url,
+                    "image_name": image_name,
+                    "hash": hash_,
+                    "updated_at": updated_at,
+                    "split": split,
+                }
+        return result
+
+    def upsert_tasks(self, records, sync_id):
+        """
+        records: 可迭代的 (task_key, pre_name, image_url, image_name, hash, updated_at, split, stratum)
+        """
+        self._db.executemany(
+            "INSERT OR REPLACE INTO tasks (task_key, pre_name, image_url, image_name, hash, updated_at, split, stratum, sync_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [tuple(record) + (sync_id,) for record in records],
+        )
+
+    def touch_tasks(self, task_keys, sync_id):
+        """
+        标记本次同步中仍存在且未变化的任务
+        """
+        self._db.executemany("UPDATE tasks SET sync_id = ? WHERE task_key = ?", [(sync_id, key) for key in task_keys])
+
+    def set_splits(self, items):
+        """
+        items: 可迭代的 (pre_name, split, stratum)
+        """
+        self._db.executemany(
+            "UPDATE tasks SET split = ?, stratum = ? WHERE pre_name = ?",
+            [(split, stratum, pre_name) for pre_name, split, stratum in items],
+        )
+
+    def split_counts(self):
+        """
+        各分层（stratum）中每个划分的样本数 {stratum: {split: n}}，用于分层划分时延续已有配额
+        """
+        counts = {}
+        for stratum, split, n in self._db.execute(
+            "SELECT stratum, split, COUNT(*) FROM tasks WHERE split IS NOT NULL GROUP BY stratum, split"
+        ):
+            counts.setdefault(stratum, {})[split] = n
+        return counts
+
+    def remove_tasks(self, task_keys):
+        self._db.executemany("DELETE FROM tasks WHERE task_key = ?", [(key,) for key in task_keys])
+
+    def remove_unsplit(self):
+        """
+        删除未进入任何划分的任务（无有效标注或图片缺失），下次同步时会重新处理
+        """
+        self._db.execute("DELETE FROM tasks WHERE split IS NULL")
+
+    def stale_tasks(self, sync_id):
+        """
+        本次同步中未出现（已在 Label Studio 中删除）的任务
+        """
+        return [
+            {"task_key": task_key, "pre_name": pre_name, "image_name": image_name, "split": split}
+            for task_key, pre_name, image_name, split in self._db.execute(
+                "SELECT task_key, pre_name, image_name, split FROM tasks WHERE sync_id != ?", (sync_id,)
+            )
+        ]
+
+    def commit(self):
+        self._db.commit()
@@ -1,17 +1,41 @@
 # from label_studio_sdk import Client,LabelStudio
+import ast
 import json
 import os 
-import io
+import numpy as np
 import pandas as pd
 import requests
-from collections import Counter
+from collections import Counter, defaultdict
 import shutil
 import random
 import glob
+import errno
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from IDataset.image_downloader import ImageDownloader
+from IDataset.ls_sync_state import LabelStudioSyncState
+from config import env_int
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 # Allow configuring Label Studio via env vars as defaults
 LS_BASE_URL_DEFAULT = os.environ.get("LS_BASE_URL", "")
 LS_API_TOKEN_DEFAULT = os.environ.get("LS_API_TOKEN", "")
+# 导出 CSV 每次读取与转换的行数
+EXPORT_CHUNK_ROWS_DEFAULT = env_int("LS_EXPORT_CHUNK_ROWS", 5000)
+EXPORT_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# 划分数据集时文件的落地方式：move / hardlink / reflink / copy
+MATERIALIZE_MODES = ("move", "hardlink", "reflink", "copy")
+MATERIALIZE_WORKERS_DEFAULT = 8
+# Linux FICLONE ioctl（btrfs / xfs 等支持写时复制的文件系统）
+_FICLONE = 0x40049409
+SPLIT_NAMES = ("train", "val", "test")
+# 划分策略：hash 按样本文件主名的稳定哈希分配；random 为整体 shuffle 后按比例切分（旧行为）
+SPLIT_STRATEGIES = ("hash", "random")
 
 # 提取label-studio中项目名称与id
 def _build_auth_header(token: str) -> dict:
@@ -39,7 +63,187 @@ def get_projects_name(base_url: str = None, token: str = None):
         result[project['title']] = project['id']
     return result
 
-def export_project_to_yolo(project_id: int, save_dir: str, exportType: str = "CSV", class_names=None, download_images: bool = True, base_url: str = None, token: str = None) -> None:
+def _parse_json_cell(value):
+    """
+    安全解析 CSV 中的 JSON 字段（代替 eval），兼容 Python 字面量写法，无法解析时返回 None
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return None
+
+def _image_url(value):
+    """
+    image 列可能是 JSON 列表字符串（'["http://..."]'）或直接是 URL
+    """
+    if isinstance(value, str) and value.lstrip().startswith("["):
+        parsed = _parse_json_cell(value)
+        return parsed[0] if parsed else None
+    return value if isinstance(value, str) else None
+
+def _image_filename(url: str, pre_name: str) -> str:
+    img_ext = os.path.splitext(url.split('?', 1)[0])[1]
+    if not img_ext:
+        img_ext = ".jpg"
+    return f"{pre_name}{img_ext}"
+
+def task_records(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    每个任务（CSV 行）的同步信息，索引与 df 一致
+
+    返回列：task_key（Label Studio 任务 ID，导出不含 id 列时为文件主名）, image, pre_name,
+    hash（图片地址 + 标注内容的 SHA1）, updated_at
+    """
+    columns = ["task_key", "image", "pre_name", "hash", "updated_at"]
+    if df.empty or "image" not in df.columns:
+        return pd.DataFrame(columns=columns)
+
+    tasks = pd.DataFrame({"image": df["image"].map(_image_url)}, index=df.index)
+    tasks = tasks[tasks["image"].notna()]
+    tasks["pre_name"] = tasks["image"].str.rsplit("/", n=1).str[-1].str.split(".").str[0]
+    if "id" in df.columns:
+        tasks["task_key"] = df.loc[tasks.index, "id"].astype(str)
+    else:
+        tasks["task_key"] = tasks["pre_name"]
+    objects = df.loc[tasks.index, "object"].fillna("") if "object" in df.columns else pd.Series("", index=tasks.index)
+    tasks["hash"] = [
+        hashlib.sha1(f"{image}\0{obj}".encode("utf-8")).hexdigest()
+        for image, obj in zip(tasks["image"].tolist(), objects.astype(str).tolist())
+    ]
+    tasks["updated_at"] = df.loc[tasks.index, "updated_at"].astype(str) if "updated_at" in df.columns else None
+    return tasks[columns]
+
+def annotations_to_boxes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    将 Label Studio CSV 导出解析为每个矩形框一行的 DataFrame
+
+    每行只解析一次 object 列，随后 explode 为扁平表。
+    返回列：row, image, pre_name, label, x, y, width, height
+    （row 为所在 CSV 行号，x/y/width/height 为百分比）
+    """
+    columns = ["row", "image", "pre_name", "label", "x", "y", "width", "height"]
+    if df.empty or "object" not in df.columns or "image" not in df.columns:
+        return pd.DataFrame(columns=columns)
+
+    frame = pd.DataFrame({
+        "image": df["image"].map(_image_url),
+        "objects": df["object"].map(_parse_json_cell),
+    })
+    frame = frame[frame["image"].notna() & frame["objects"].map(lambda v: isinstance(v, list) and len(v) > 0)]
+    if frame.empty:
+        return pd.DataFrame(columns=columns)
+
+    # 文件主名
+    frame["pre_name"] = frame["image"].str.rsplit("/", n=1).str[-1].str.split(".").str[0]
+    frame["row"] = np.arange(len(frame))
+
+    objects = frame["objects"].explode()
+    objects = objects[objects.map(lambda v: isinstance(v, dict))]
+    boxes = pd.DataFrame(objects.tolist(), index=objects.index)
+    if boxes.empty or "rectanglelabels" not in boxes.columns:
+        return pd.DataFrame(columns=columns)
+
+    boxes["label"] = boxes["rectanglelabels"].map(lambda v: v[0] if isinstance(v, list) and v else None)
+    boxes = boxes.join(frame[["row", "image", "pre_name"]])
+    for col in ("x", "y", "width", "height"):
+        boxes[col] = pd.to_numeric(boxes.get(col), errors="coerce")
+    boxes = boxes.dropna(subset=["label", "x", "y", "width", "height"])
+    return boxes[columns].reset_index(drop=True)
+
+def boxes_to_yolo(boxes: pd.DataFrame, class_names) -> pd.DataFrame:
+    """
+    批量把百分比坐标转换为 YOLO 归一化的中心点与宽高并裁剪到 [0,1]
+
+    x/y/width/height 均为相对原图的百分比，换算为像素再除以原图尺寸后原图尺寸会被约去，
+    因此直接用百分比计算即可。
+    返回列：pre_name, class_id, cx, cy, w, h（不在 class_names 中的类别被丢弃）
+    """
+    label_to_id = {name: idx for idx, name in enumerate(class_names)}
+    class_ids = boxes["label"].map(label_to_id)
+    boxes = boxes[class_ids.notna()]
+    class_ids = class_ids[class_ids.notna()]
+    # 同名图片以最后一个含有效标注的行为准（与逐行覆盖写入的结果一致）
+    keep = (boxes["row"] == boxes.groupby("pre_name")["row"].transform("max")).to_numpy()
+
+    x = boxes["x"].to_numpy(dtype=np.float64)[keep] / 100.0
+    y = boxes["y"].to_numpy(dtype=np.float64)[keep] / 100.0
+    w = boxes["width"].to_numpy(dtype=np.float64)[keep] / 100.0
+    h = boxes["height"].to_numpy(dtype=np.float64)[keep] / 100.0
+
+    return pd.DataFrame({
+        "pre_name": boxes["pre_name"].to_numpy()[keep],
+        "class_id": class_ids.to_numpy()[keep].astype(np.int64),
+        "cx": np.clip(x + w / 2.0, 0.0, 1.0),
+        "cy": np.clip(y + h / 2.0, 0.0, 1.0),
+        "w": np.clip(w, 0.0, 1.0),
+        "h": np.clip(h, 0.0, 1.0),
+    })
+
+def write_yolo_labels(yolo: pd.DataFrame, labels_dir: str) -> int:
+    """
+    按图片分组写出 labels/{pre_name}.txt，返回写出的文件数
+    """
+    if yolo.empty:
+        return 0
+    lines = [
+        f"{c} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}"
+        for c, cx, cy, w, h in zip(
+            yolo["class_id"].tolist(), yolo["cx"].tolist(), yolo["cy"].tolist(), yolo["w"].tolist(), yolo["h"].tolist()
+        )
+    ]
+    # 稳定排序后按分组边界切片，避免 groupby 对每个分组的逐组开销
+    codes, names = pd.factorize(yolo["pre_name"])
+    order = np.argsort(codes, kind="stable")
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    starts = np.concatenate(([0], bounds)).tolist()
+    ends = np.concatenate((bounds, [len(order)])).tolist()
+    order = order.tolist()
+    for start, end in zip(starts, ends):
+        pre_name = names[codes[order[start]]]
+        with open(os.path.join(labels_dir, f"{pre_name}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines[i] for i in order[start:end]))
+    return len(starts)
+
+def _spool_export(project_id: int, save_dir: str, exportType: str, base_url: str, token: str) -> str:
+    """
+    流式下载导出文件到 save_dir 下的临时文件（不在内存中保留完整响应，也避免转换期间长时间占用导出连接），返回文件路径
+    """
+    export_path = os.path.join(save_dir, f".ls_export_{project_id}.csv")
+    with requests.get(
+        f'{base_url.rstrip("/")}/api/projects/{project_id}/export',
+        headers=_build_auth_header(token),
+        params={"exportType": exportType.upper()},
+        stream=True,
+    ) as response:
+        response.raise_for_status()
+        with open(export_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=EXPORT_DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+    return export_path
+
+def _read_export_chunks(export_path: str, chunk_rows: int = None):
+    try:
+        yield from pd.read_csv(export_path, chunksize=chunk_rows or EXPORT_CHUNK_ROWS_DEFAULT)
+    except pd.errors.EmptyDataError:
+        return
+
+def _append_new_classes(boxes: pd.DataFrame, class_names: list) -> None:
+    """
+    按首次出现顺序把新类别追加到 class_names（已有类别 ID 不变）
+    """
+    known = set(class_names)
+    for label in pd.unique(boxes["label"]):
+        if label and label not in known:
+            known.add(label)
+            class_names.append(label)
+
+def export_project_to_yolo(project_id: int, save_dir: str, exportType: str = "CSV", class_names=None, download_images: bool = True, base_url: str = None, token: str = None, download_workers: int = None, chunk_rows: int = None, on_tasks=None) -> None:
     """
     将 Label Studio 项目导出为 YOLO 标注格式。
 
@@ -52,23 +256,20 @@ def export_project_to_yolo(project_id: int, save_dir: str, exportType: str = "CS
     每个 labels/*.txt 行格式：
       <class_id> <cx> <cy> <w> <h>  (均为 0~1 归一化)
 
-    说明：实现基于 Label Studio 的 CSV 导出（row['object'] 为字符串表达的列表），
-    其中 x/y/width/height 字段为百分比（0~100）。
+    说明：实现基于 Label Studio 的 CSV 导出（row['object'] 为 JSON 字符串表达的列表），
+    其中 x/y/width/height 字段为百分比（0~100）；解析与坐标转换均为批量（pandas / NumPy）处理。
+    导出内容先流式落盘，再按 chunk_rows 行分块读取、转换并写出标签，内存占用与项目大小无关；
+    每块的图片由 ImageDownloader 并发下载（download_workers 个线程，已存在且大小一致的图片跳过）。
+    on_tasks: 可选回调 on_tasks(tasks)，每块调用一次，tasks 为 task_records 的结果（用于记录同步状态）。
     """
     if exportType.upper() != "CSV":
         raise NotImplementedError("当前仅支持 CSV 导出为 YOLO 格式")
 
     # 拉取导出数据
-    params = {"exportType": exportType.upper()}
     base_url = base_url or LS_BASE_URL_DEFAULT
     token = token or LS_API_TOKEN_DEFAULT
     if not base_url:
         raise ValueError("Label Studio base_url 未配置")
-    response = requests.get(
-        f'{base_url.rstrip("/")}/api/projects/{project_id}/export',
-        headers=_build_auth_header(token),
-        params=params
-    )
 
     # 准备输出目录
     images_dir = os.path.join(save_dir, "images")
@@ -76,27 +277,44 @@ def export_project_to_yolo(project_id: int, save_dir: str, exportType: str = "CS
     os.makedirs(images_dir, exist_ok=True)
     os.makedirs(labels_dir, exist_ok=True)
 
-    # 读取 CSV
-    data_text = response.text
-    df = pd.read_csv(io.StringIO(data_text))
-
-    # 类别名称及映射
-    if class_names is None:
-        label_list = []
-        for _, row in df.iterrows():
-            if pd.isna(row.get("object")):
-                continue
-            try:
-                objects = eval(row["object"])  # 字符串 -> 列表
-                for obj in objects:
-                    label = obj.get("rectanglelabels", [None])[0]
-                    if label and label not in label_list:
-                        label_list.append(label)
-            except Exception:
-                continue
-        class_names = label_list
-
-    label_to_id = {name: idx for idx, name in enumerate(class_names)}
+    export_path = _spool_export(project_id, save_dir, exportType, base_url, token)
+
+    # 类别名称及映射：未指定时按首次出现顺序逐块追加，结果与整体推断一致
+    infer_classes = class_names is None
+    class_names = [] if infer_classes else list(class_names)
+
+    downloader = None
+    if download_images:
+        downloader = ImageDownloader(max_workers=download_workers, base_url=base_url, base_url_headers=_build_auth_header(token))
+    downloaded = skipped = failed_count = 0
+    failed = []
+
+    try:
+        # 逐块解析、转换并写出标签（同名图片的后续行会覆盖之前写出的标签文件）
+        for df in _read_export_chunks(export_path, chunk_rows):
+            if on_tasks is not None:
+                on_tasks(task_records(df))
+            boxes = annotations_to_boxes(df)
+            if infer_classes:
+                _append_new_classes(boxes, class_names)
+
+            write_yolo_labels(boxes_to_yolo(boxes, class_names), labels_dir)
+
+            # 并发下载本块中含标注的图片（下载失败不影响标签导出）
+            if downloader is not None and not boxes.empty:
+                downloads = [
+                    (url, os.path.join(images_dir, _image_filename(url, pre_name)))
+                    for url, pre_name in boxes[["image", "pre_name"]].drop_duplicates("pre_name", keep="last").itertuples(index=False)
+                ]
+                result = downloader.download_all(downloads)
+                downloaded += result["downloaded"]
+                skipped += result["skipped"]
+                failed_count += len(result["failed"])
+                failed.extend(result["failed"][:20 - len(failed)])
+    finally:
+        if downloader is not None:
+            downloader.close()
+        os.remove(export_path)
 
     # 写出 classes.txt
     classes_txt = os.path.join(save_dir, "classes.txt")
@@ -104,68 +322,139 @@ def export_project_to_yolo(project_id: int, save_dir: str, exportType: str = "CS
         for name in class_names:
             f.write(f"{name}\n")
 
-    # 逐图写出 YOLO 标签
-    for _, row in df.iterrows():
-        if pd.isna(row.get("object")):
-            continue
-        try:
-            objects = eval(row["object"])  # list[dict]
-            if not objects:
-                continue
-
-            # 文件主名
-            pre_name = eval(row['image'])[0].rsplit('/', 1)[-1].split('.')[0]
-
-            # 下载图片
-            if download_images:
-                try:
-                    url = json.loads(row['image'])[0]
-                    img_ext = os.path.splitext(url)[1]
-                    if not img_ext:
-                        img_ext = ".jpg"
-                    img_path = os.path.join(images_dir, f"{pre_name}{img_ext}")
-                    with open(img_path, "wb") as f:
-                        f.write(requests.get(url).content)
-                except Exception:
-                    pass  # 下载失败不影响标签导出
-
-            original_width = int(objects[0].get('original_width'))
-            original_height = int(objects[0].get('original_height'))
-
-            label_fp = os.path.join(labels_dir, f"{pre_name}.txt")
-            lines = []
-            for obj in objects:
-                label = obj.get('rectanglelabels', [None])[0]
-                if label is None or label not in label_to_id:
-                    continue
-                cls_id = label_to_id[label]
-
-                # 百分比 -> 绝对像素
-                x = float(obj.get('x')) / 100.0 * original_width
-                y = float(obj.get('y')) / 100.0 * original_height
-                w = float(obj.get('width')) / 100.0 * original_width
-                h = float(obj.get('height')) / 100.0 * original_height
+    if downloader is not None:
+        print(f"图片下载完成: 新下载 {downloaded}，跳过 {skipped}，失败 {failed_count}")
+        for url, error in failed:
+            print(f"下载 {url} 失败: {error}")
 
-                # 转为 YOLO 归一化中心点与宽高
-                cx = (x + w / 2.0) / original_width
-                cy = (y + h / 2.0) / original_height
-                nw = w / original_width
-                nh = h / original_height
 
-                # 裁剪范围到 [0,1]
-                cx = min(max(cx, 0.0), 1.0)
-                cy = min(max(cy, 0.0), 1.0)
-                nw = min(max(nw, 0.0), 1.0)
-                nh = min(max(nh, 0.0), 1.0)
+def _reflink(src: str, dst: str) -> None:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink 不受支持")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+def materialize_file(src: str, dst: str, mode: str = "move") -> str:
+    """
+    将文件放到目标位置，返回实际使用的方式
 
-                lines.append(f"{cls_id} {cx:.6f} {cy:.6f} {nw:.6f} {nh:.6f}")
+    - move: 同一文件系统内为 rename，瞬间完成
+    - hardlink / reflink: 不复制数据（reflink 需文件系统支持写时复制）
+    以上方式不可用（跨文件系统、文件系统不支持）时回退为 copy。
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        if mode == "move":
+            os.replace(src, dst)
+            return "move"
+        if mode == "hardlink":
+            os.link(src, dst)
+            return "hardlink"
+        if mode == "reflink":
+            _reflink(src, dst)
+            return "reflink"
+    except OSError:
+        pass
+    shutil.copy2(src, dst)
+    if mode == "move":
+        os.remove(src)
+    return "copy"
+
+def materialize_files(pairs, mode: str = "move", workers: int = None) -> dict:
+    """
+    并行落地多个 (src, dst) 文件，返回各方式的使用次数
+    """
+    if mode not in MATERIALIZE_MODES:
+        raise ValueError(f"不支持的 materialize 方式: {mode}，可选 {', '.join(MATERIALIZE_MODES)}")
+    counts = Counter()
+    if not pairs:
+        return counts
+    with ThreadPoolExecutor(max_workers=workers or MATERIALIZE_WORKERS_DEFAULT) as pool:
+        for used in pool.map(lambda pair: materialize_file(pair[0], pair[1], mode), pairs):
+            counts[used] += 1
+    return counts
+
+def write_dataset_yaml(out_dir: str, names, has_test: bool) -> str:
+    """
+    写 dataset.yaml，返回其完整路径
+    """
+    dataset_yaml = os.path.join(out_dir, "dataset.yaml")
+    content_lines = []
+    content_lines.append(f"path: {out_dir}")
+    content_lines.append(f"train: images/train")
+    content_lines.append(f"val: images/val")
+    if has_test:
+        content_lines.append(f"test: images/test")
+    content_lines.append("")
+    content_lines.append(f"nc: {len(names)}")
+    # 写 names 数组（简单一行形式）
+    joined = ", ".join([f"'{n}'" for n in names])
+    content_lines.append(f"names: [{joined}]")
+    with open(dataset_yaml, "w", encoding="utf-8") as f:
+        f.write("\n".join(content_lines) + "\n")
+    return dataset_yaml
 
-            if lines:
-                with open(label_fp, "w", encoding="utf-8") as f:
-                    f.write("\n".join(lines))
-        except Exception as e:
-            print(f"导出 {row.get('image')} 失败: {e}")
+class HashSplitter:
+    """
+    按样本键的稳定哈希分配 train / val / test
 
+    每个样本只由 sha1(seed:key) 决定划分，与样本数量和处理顺序无关，
+    新增样本不会改变已有样本的划分，也不需要把所有样本放在内存里 shuffle。
+    stratify=True 时按分层（如样本的主类别）记录各划分的数量，哈希选中的划分超出该层配额时
+    改为缺口最大的划分，使每个类别在各划分中的比例接近设定值；counts 用于延续已有的分层计数。
+    """
+    def __init__(self, splits, seed=42, stratify=False, counts=None):
+        self.ratios = dict(zip(SPLIT_NAMES, splits))
+        self.seed = seed
+        self.stratify = stratify
+        self.counts = defaultdict(Counter)
+        for stratum, split_counts in (counts or {}).items():
+            self.counts[stratum].update(split_counts)
+
+    def hash_split(self, key: str) -> str:
+        digest = hashlib.sha1(f"{self.seed}:{key}".encode("utf-8")).digest()
+        u = int.from_bytes(digest[:8], "big") / 2 ** 64
+        cumulative = 0.0
+        for name in SPLIT_NAMES:
+            cumulative += self.ratios[name]
+            if u < cumulative:
+                return name
+        # 比例之和因浮点误差略小于 1 时，落到最后一个非空划分
+        return [name for name in SPLIT_NAMES if self.ratios[name] > 0][-1]
+
+    def assign(self, key: str, stratum=None) -> str:
+        split = self.hash_split(key)
+        if self.stratify:
+            counts = self.counts[stratum]
+            total = sum(counts.values()) + 1
+            if counts[split] + 1 > self.ratios[split] * total + 1:
+                split = max(SPLIT_NAMES, key=lambda name: self.ratios[name] * total - counts[name])
+            counts[split] += 1
+        return split
+
+def dominant_class(label_path: str):
+    """
+    标签文件中实例最多的类别 ID（数量相同时取较小的 ID），无标注时返回 None
+    """
+    counts = Counter()
+    with open(label_path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if parts:
+                try:
+                    counts[int(float(parts[0]))] += 1
+                except ValueError:
+                    continue
+    if not counts:
+        return None
+    return min(counts, key=lambda cls: (-counts[cls], cls))
 
 def build_yolo_dataset_from_label_studio(
     project_id: int,
@@ -177,6 +466,12 @@ def build_yolo_dataset_from_label_studio(
     class_names=None,
     base_url: str = None,
     token: str = None,
+    download_workers: int = None,
+    materialize: str = "move",
+    materialize_workers: int = None,
+    keep_staging: bool = False,
+    split_strategy: str = "hash",
+    stratify: bool = False,
 ) -> str:
     """
     从 Label Studio 项目导入数据并构建 YOLO 数据集（含划分与 dataset.yaml）。
@@ -193,9 +488,31 @@ def build_yolo_dataset_from_label_studio(
         │   └─ test/ (可选)
         └─ dataset.yaml
 
+    划分结果通过 materialize 指定的方式（move / hardlink / reflink / copy）从临时目录落地，
+    不可用时自动回退为复制；完成后删除临时目录（keep_staging=True 时保留，move 方式下其中只剩未参与划分的文件）。
+
+    split_strategy="hash" 时按文件主名的稳定哈希划分（可复现，增量同步时已有样本不变），
+    stratify=True 时按样本主类别分层；"random" 为按 seed 整体 shuffle 后切分。
+    同时在 out_dir 下记录 Label Studio 同步状态，之后可用 sync_dataset_from_label_studio 增量同步。
+
     返回：dataset.yaml 的完整路径。
     """
+    if materialize not in MATERIALIZE_MODES:
+        raise ValueError(f"不支持的 materialize 方式: {materialize}，可选 {', '.join(MATERIALIZE_MODES)}")
+    if split_strategy not in SPLIT_STRATEGIES:
+        raise ValueError(f"不支持的划分策略: {split_strategy}，可选 {', '.join(SPLIT_STRATEGIES)}")
     os.makedirs(out_dir, exist_ok=True)
+    state = LabelStudioSyncState(out_dir)
+    sync_id = 1
+
+    def _record_tasks(tasks):
+        state.upsert_tasks(
+            (
+                (key, pre_name, url, _image_filename(url, pre_name), hash_, updated_at, None, None)
+                for key, url, pre_name, hash_, updated_at in tasks[["task_key", "image", "pre_name", "hash", "updated_at"]].itertuples(index=False)
+            ),
+            sync_id,
+        )
 
     # 第一步：导出到临时目录（原始 YOLO 标注：images/, labels/, classes.txt）
     staging_dir = os.path.join(out_dir, "_yolo_staging")
@@ -208,6 +525,8 @@ def build_yolo_dataset_from_label_studio(
         download_images=download_images,
         base_url=base_url,
         token=token,
+        download_workers=download_workers,
+        on_tasks=_record_tasks,
     )
 
     # 读取类别
@@ -249,13 +568,25 @@ def build_yolo_dataset_from_label_studio(
     if abs((train_r + val_r + test_r) - 1.0) > 1e-6:
         raise ValueError("splits 三者之和必须为 1.0")
 
-    random.seed(seed)
-    random.shuffle(samples)
-    n_train = int(total * train_r)
-    n_val = int(total * val_r)
-    train_set = samples[:n_train]
-    val_set = samples[n_train:n_train + n_val]
-    test_set = samples[n_train + n_val:]
+    strata = {}
+    if split_strategy == "hash":
+        # 逐个样本独立分配，无需 shuffle 整个列表
+        splitter = HashSplitter(splits, seed=seed, stratify=stratify)
+        split_sets = {name: [] for name in SPLIT_NAMES}
+        for ip, lp in samples:
+            base = os.path.splitext(os.path.basename(lp))[0]
+            stratum = dominant_class(lp) if stratify else None
+            strata[base] = stratum
+            split_sets[splitter.assign(base, stratum)].append((ip, lp))
+        train_set, val_set, test_set = split_sets["train"], split_sets["val"], split_sets["test"]
+    else:
+        random.seed(seed)
+        random.shuffle(samples)
+        n_train = int(total * train_r)
+        n_val = int(total * val_r)
+        train_set = samples[:n_train]
+        val_set = samples[n_train:n_train + n_val]
+        test_set = samples[n_train + n_val:]
 
     # 准备目标目录
     def _ensure_dirs(base_dir: str):
@@ -268,36 +599,222 @@ def build_yolo_dataset_from_label_studio(
 
     _ensure_dirs(out_dir)
 
-    def _copy_pairs(pairs, split_name: str):
+    def _split_targets(pairs, split_name: str):
+        targets = []
         for ip, lp in pairs:
             base = os.path.basename(lp).replace('.txt', '')
             img_ext = os.path.splitext(ip)[1]
-            shutil.copy2(ip, os.path.join(out_dir, "images", split_name, f"{base}{img_ext}"))
-            shutil.copy2(lp, os.path.join(out_dir, "labels", split_name, f"{base}.txt"))
+            targets.append((ip, os.path.join(out_dir, "images", split_name, f"{base}{img_ext}")))
+            targets.append((lp, os.path.join(out_dir, "labels", split_name, f"{base}.txt")))
+        return targets
+
+    targets = _split_targets(train_set, "train") + _split_targets(val_set, "val") + _split_targets(test_set, "test")
+    used = materialize_files(targets, mode=materialize, workers=materialize_workers)
+    if used.get("copy") and materialize != "copy":
+        print(f"{used['copy']} 个文件无法使用 {materialize}，已回退为复制")
+
+    # 清理临时目录（硬链接 / reflink 删除后不再额外占用空间）
+    if not keep_staging:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    # 记录同步状态：未进入任何划分的任务（无有效标注或图片缺失）不记录，下次同步时重新处理
+    for split_name, split_set in (("train", train_set), ("val", val_set), ("test", test_set)):
+        bases = (os.path.splitext(os.path.basename(lp))[0] for _, lp in split_set)
+        state.set_splits((base, split_name, strata.get(base)) for base in bases)
+    state.remove_unsplit()
+    state.set_meta("project_id", project_id)
+    state.set_meta("base_url", base_url or LS_BASE_URL_DEFAULT)
+    state.set_meta("class_names", names)
+    state.set_meta("class_names_fixed", class_names is not None)
+    state.set_meta("splits", list(splits))
+    state.set_meta("seed", seed)
+    state.set_meta("split_strategy", split_strategy)
+    state.set_meta("stratify", stratify)
+    state.set_meta("sync_id", sync_id)
+    state.set_meta("synced_at", int(time.time()))
+    state.commit()
+    state.close()
+
+    return write_dataset_yaml(out_dir, names, has_test=len(test_set) > 0)
+
+def _draw_split(rng: random.Random, splits) -> str:
+    train_r, val_r, _ = splits
+    r = rng.random()
+    if r < train_r:
+        return "train"
+    if r < train_r + val_r:
+        return "val"
+    return "test"
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def sync_dataset_from_label_studio(
+    dataset_dir: str,
+    base_url: str = None,
+    token: str = None,
+    download_images: bool = True,
+    download_workers: int = None,
+    chunk_rows: int = None,
+) -> dict:
+    """
+    增量同步由 build_yolo_dataset_from_label_studio 构建的数据集。
 
-    _copy_pairs(train_set, "train")
-    _copy_pairs(val_set, "val")
-    if test_set:
-        _copy_pairs(test_set, "test")
+    根据数据集目录下记录的同步状态，只处理新增或标注内容变化的任务：
+    - 变化的任务重写标签文件，图片地址未变且已存在时不重新下载；
+    - 已有任务保持原来的划分，新任务按构建时的划分策略与比例划分（hash 策略下与重新构建的结果一致）；
+    - Label Studio 中已删除或不再有有效标注的任务，从数据集中移除对应文件；
+    - 新出现的类别追加到类别列表末尾（已有类别 ID 不变），并更新 dataset.yaml。
 
-    # 写 dataset.yaml
-    dataset_yaml = os.path.join(out_dir, "dataset.yaml")
-    has_test = len(test_set) > 0
-    content_lines = []
-    content_lines.append(f"path: {out_dir}")
-    content_lines.append(f"train: images/train")
-    content_lines.append(f"val: images/val")
-    if has_test:
-        content_lines.append(f"test: images/test")
-    content_lines.append("")
-    content_lines.append(f"nc: {len(names)}")
-    # 写 names 数组（简单一行形式）
-    joined = ", ".join([f"'{n}'" for n in names])
-    content_lines.append(f"names: [{joined}]")
-    with open(dataset_yaml, "w", encoding="utf-8") as f:
-        f.write("\n".join(content_lines) + "\n")
+    返回 {"added", "updated", "removed", "unchanged", "failed"} 各类任务数量。
+    """
+    state = LabelStudioSyncState(dataset_dir)
+    try:
+        project_id = state.get_meta("project_id")
+        if project_id is None:
+            raise ValueError("数据集没有 Label Studio 同步记录，无法增量同步")
+        base_url = base_url or state.get_meta("base_url") or LS_BASE_URL_DEFAULT
+        token = token or LS_API_TOKEN_DEFAULT
+        if not base_url:
+            raise ValueError("Label Studio base_url 未配置")
+        class_names = list(state.get_meta("class_names", []))
+        infer_classes = not state.get_meta("class_names_fixed", False)
+        splits = tuple(state.get_meta("splits", (0.8, 0.2, 0.0)))
+        seed = state.get_meta("seed", 42)
+        sync_id = state.get_meta("sync_id", 0) + 1
+        # 早于 hash 划分的同步记录没有 split_strategy，沿用随机划分
+        split_strategy = state.get_meta("split_strategy", "random")
+        stratify = state.get_meta("stratify", False)
+        rng = random.Random(f"{seed}:{sync_id}")
+        splitter = None
+        if split_strategy == "hash":
+            splitter = HashSplitter(splits, seed=seed, stratify=stratify, counts=state.split_counts() if stratify else None)
+
+        for split_name in SPLIT_NAMES:
+            os.makedirs(os.path.join(dataset_dir, "images", split_name), exist_ok=True)
+            os.makedirs(os.path.join(dataset_dir, "labels", split_name), exist_ok=True)
+
+        def _label_path(split_name, pre_name):
+            return os.path.join(dataset_dir, "labels", split_name, f"{pre_name}.txt")
+
+        def _image_path(split_name, image_name):
+            return os.path.join(dataset_dir, "images", split_name, image_name)
+
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "failed": 0}
+        export_path = _spool_export(project_id, dataset_dir, "CSV", base_url, token)
+        downloader = None
+        if download_images:
+            downloader = ImageDownloader(max_workers=download_workers, base_url=base_url, base_url_headers=_build_auth_header(token))
 
-    return dataset_yaml
+        try:
+            for df in _read_export_chunks(export_path, chunk_rows):
+                tasks = task_records(df).drop_duplicates("task_key", keep="last")
+                existing = state.get_tasks(tasks["task_key"])
+                existing_hash = tasks["task_key"].map(lambda key: existing[key]["hash"] if key in existing else None)
+                unchanged = (existing_hash == tasks["hash"]).to_numpy()
+                state.touch_tasks(tasks["task_key"][unchanged], sync_id)
+                stats["unchanged"] += int(unchanged.sum())
+                changed = tasks[~unchanged]
+                if changed.empty:
+                    continue
+
+                # 先删除变化任务的旧标签；图片地址或文件主名变化时同时删除旧图片
+                for key, url, pre_name in changed[["task_key", "image", "pre_name"]].itertuples(index=False):
+                    old = existing.get(key)
+                    if old is None:
+                        continue
+                    _remove_file(_label_path(old["split"], old["pre_name"]))
+                    if old["image_url"] != url or old["pre_name"] != pre_name:
+                        _remove_file(_image_path(old["split"], old["image_name"]))
+
+                boxes = annotations_to_boxes(df.loc[changed.index])
+                if infer_classes:
+                    _append_new_classes(boxes, class_names)
+                yolo = boxes_to_yolo(boxes, class_names)
+                valid_names = set(yolo["pre_name"])
+
+                # 已有任务沿用原划分，新任务按划分策略分配
+                strata = {}
+                if stratify:
+                    class_counts = Counter(zip(yolo["pre_name"].tolist(), yolo["class_id"].tolist()))
+                    for (pre_name, cls), count in sorted(class_counts.items(), key=lambda item: (-item[1], item[0][1])):
+                        strata.setdefault(pre_name, cls)
+                split_of = {}
+                for key, pre_name in changed[["task_key", "pre_name"]].itertuples(index=False):
+                    if pre_name in valid_names:
+                        old = existing.get(key)
+                        if old is not None:
+                            split_of[key] = old["split"]
+                        elif splitter is not None:
+                            split_of[key] = splitter.assign(pre_name, strata.get(pre_name))
+                        else:
+                            split_of[key] = _draw_split(rng, splits)
+
+                pre_name_split = {pre_name: split_of[key] for key, pre_name in changed[["task_key", "pre_name"]].itertuples(index=False) if key in split_of}
+                yolo_split = yolo["pre_name"].map(pre_name_split)
+                for split_name in SPLIT_NAMES:
+                    write_yolo_labels(yolo[yolo_split == split_name], os.path.join(dataset_dir, "labels", split_name))
+
+                downloads = []
+                for key, url, pre_name in changed[["task_key", "image", "pre_name"]].itertuples(index=False):
+                    if key in split_of:
+                        dest = _image_path(split_of[key], _image_filename(url, pre_name))
+                        if downloader is not None and not os.path.exists(dest):
+                            downloads.append((url, dest))
+                if downloads:
+                    downloader.download_all(downloads)
+
+                # 只记录图片已就绪的任务；失败的任务删除标签，下次同步时重试
+                records = []
+                remove_keys = []
+                for key, url, pre_name, hash_, updated_at in changed[["task_key", "image", "pre_name", "hash", "updated_at"]].itertuples(index=False):
+                    if key not in split_of:
+                        if key in existing:
+                            # 不再有有效标注的任务连同图片一起移除，否则残留的图片会被当作负样本参与训练
+                            old = existing[key]
+                            _remove_file(_image_path(old["split"], old["image_name"]))
+                            remove_keys.append(key)
+                            stats["removed"] += 1
+                        continue
+                    image_name = _image_filename(url, pre_name)
+                    if not os.path.exists(_image_path(split_of[key], image_name)):
+                        _remove_file(_label_path(split_of[key], pre_name))
+                        if key in existing:
+                            remove_keys.append(key)
+                        stats["failed"] += 1
+                        continue
+                    records.append((key, pre_name, url, image_name, hash_, updated_at, split_of[key], strata.get(pre_name)))
+                    stats["updated" if key in existing else "added"] += 1
+                state.remove_tasks(remove_keys)
+                state.upsert_tasks(records, sync_id)
+                state.commit()
+        finally:
+            if downloader is not None:
+                downloader.close()
+            os.remove(export_path)
+
+        # Label Studio 中已删除的任务
+        stale = state.stale_tasks(sync_id)
+        for task in stale:
+            if task["split"]:
+                _remove_file(_label_path(task["split"], task["pre_name"]))
+                _remove_file(_image_path(task["split"], task["image_name"]))
+        state.remove_tasks(task["task_key"] for task in stale)
+        stats["removed"] += len(stale)
+
+        state.set_meta("class_names", class_names)
+        state.set_meta("sync_id", sync_id)
+        state.set_meta("synced_at", int(time.time()))
+        state.commit()
+    finally:
+        state.close()
+
+    has_test = any(True for _ in os.scandir(os.path.join(dataset_dir, "images", "test")))
+    write_dataset_yaml(dataset_dir, class_names, has_test=has_test)
+    return stats
 
 
 if __name__ == '__main__':
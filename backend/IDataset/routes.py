@@ -1,6 +1,6 @@
 from flask import Blueprint, request
 from tools.format_output import format_output
-from config import get_dataset_path
+from config import get_dataset_path, get_dataset_extract_workers, get_dataset_upload_chunk_size
 import os
 from glob import glob
 import yaml
@@ -9,36 +9,29 @@ import time
 import shutil
 import zipfile
 import json
+from concurrent.futures import ThreadPoolExecutor
+from IDataset.dataset_stats import get_dataset_stats_cache
+from IDataset.upload_sessions import get_upload_session_store
+import threading
 from IDataset.process_annotation_projects import (
     get_projects_name as ls_get_projects_name,
     build_yolo_dataset_from_label_studio,
+    sync_dataset_from_label_studio,
+    MATERIALIZE_MODES,
+    SPLIT_STRATEGIES,
 )
+from IDataset.ls_sync_state import sync_state_path
+from tools.request_args import parse_bool
 
 
 IDataset_bp = Blueprint('IDataset', __name__)
 
-def count_images_and_labels(root_path, image_dir, label_dir):
+def get_cached_images_and_labels_stats(root_path, image_dir, label_dir):
     """
-    统计 YOLO 格式下的图片数量和标签数量（跨平台兼容）
+    从 DatasetStatsCache 获取 YOLO 格式下的图片数量、标签数量及类别分布（root_path 下的 image_dir / label_dir）
     """
     root_path = Path(root_path)
-    image_dir = root_path / image_dir
-    label_dir = root_path / label_dir
-
-    image_paths = list(image_dir.glob("*.jpg")) + \
-                  list(image_dir.glob("*.png")) + \
-                  list(image_dir.glob("*.jpeg")) + \
-                  list(image_dir.glob("*.webp"))
-
-    num_labels = 0
-    for image_path in image_paths:
-        label_path = label_dir / (image_path.stem + ".txt")
-        if label_path.exists():
-            with open(label_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                num_labels += len(lines)
-
-    return len(image_paths), num_labels
+    return get_dataset_stats_cache().get(root_path / image_dir, root_path / label_dir)
 
 def count_images(image_dir):
     return len(glob(os.path.join(image_dir, "*.jpg")) + glob(os.path.join(image_dir, "*.png")) + glob(os.path.join(image_dir, "*.jpeg")) + glob(os.path.join(image_dir, "*.webp")))
@@ -65,8 +58,14 @@ def load_dataset_yoloinfofile(dataset_path, yaml_path, dataset_type):
     num_classes = data.get("nc", len(class_names))
     download_url_or_script = data.get("download", "")
 
+    train_class_histogram = None
+    stats_status = "fresh"
     if dataset_type.upper() == "YOLO":
-        train_img_count, train_label_count = count_images_and_labels(root_path, os.path.join(dataset_path, train_path), train_path.replace("/images", "/labels"))
+        stats = get_cached_images_and_labels_stats(root_path, os.path.join(dataset_path, train_path), train_path.replace("/images", "/labels"))
+        train_img_count = stats["image_count"]
+        train_label_count = stats["label_count"]
+        train_class_histogram = stats["class_histogram"]
+        stats_status = stats["status"]
     elif dataset_type.upper() == "COCO":
         train_img_count = count_images(os.path.join(dataset_path, train_path))
         ann_file = os.path.join(Path(train_path).parent.parent, "annotations", "instances_train.json")
@@ -83,6 +82,8 @@ def load_dataset_yoloinfofile(dataset_path, yaml_path, dataset_type):
         "num_classes": num_classes,
         "train_img_count": train_img_count,
         "train_label_count": train_label_count,
+        "train_class_histogram": train_class_histogram,
+        "stats_status": stats_status,
         "download_url_or_script": download_url_or_script
     }
 
@@ -103,23 +104,57 @@ def load_dataset_platforminfofile(info_file):
         "yaml_file_path": data.get("yaml_file_path", None)
     }
     
-def extract_zip_flat(zip_path, extract_to):
+ZIP_COPY_BUFFER_SIZE = 1024 * 1024
+
+def _flat_member_target(member, extract_to):
     """
-    将 zip 文件中的所有内容解压到指定目录，并移除 zip 包中的第一层目录
+    计算移除第一层目录后的解压路径；目录项或越界路径返回 None
     """
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        members = zip_ref.namelist()
-
-        for member in members:
-            if member.endswith("/"):
-                continue
+    if member.endswith("/"):
+        return None
+    parts = Path(member).parts
+    member_path = Path(*parts[1:]) if len(parts) > 1 else None  # 移除第一层目录
+    if member_path is None:
+        return None
+    target_path = (Path(extract_to) / member_path).resolve()
+    if Path(extract_to).resolve() not in target_path.parents:
+        return None
+    return target_path
+
+def _extract_members(zip_ref, members, extract_to):
+    for member in members:
+        target_path = _flat_member_target(member, extract_to)
+        if target_path is None:
+            continue
+        os.makedirs(target_path.parent, exist_ok=True)
+        # 分块复制，内存占用与单个文件大小无关
+        with zip_ref.open(member) as source, open(target_path, 'wb') as target:
+            shutil.copyfileobj(source, target, ZIP_COPY_BUFFER_SIZE)
+
+def extract_zip_flat(zip_source, extract_to, workers=None):
+    """
+    将 zip 文件中的所有内容解压到指定目录，并移除 zip 包中的第一层目录
 
-            parts = Path(member).parts
-            member_path = Path(*parts[1:])  # 移除第一层目录
-            target_path = Path(extract_to) / member_path
-            os.makedirs(target_path.parent, exist_ok=True)
-            with zip_ref.open(member) as source, open(target_path, 'wb') as target:
-                target.write(source.read())
+    - zip_source: zip 文件路径，或可随机读取的文件对象（如上传请求中的文件流，无需先另存一份）
+    - workers: 并行解压线程数（仅 zip_source 为路径时生效，每个线程独立打开 zip 文件）
+    """
+    if workers is None:
+        workers = get_dataset_extract_workers()
+
+    with zipfile.ZipFile(zip_source, 'r') as zip_ref:
+        members = [info.filename for info in zip_ref.infolist() if not info.is_dir()]
+        if workers <= 1 or not isinstance(zip_source, (str, os.PathLike)) or len(members) < 2:
+            _extract_members(zip_ref, members, extract_to)
+            return
+
+    def extract_group(group):
+        with zipfile.ZipFile(zip_source, 'r') as zip_ref:
+            _extract_members(zip_ref, group, extract_to)
+
+    groups = [members[i::workers] for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # list() 以便把子线程中的异常抛出
+        list(pool.map(extract_group, [g for g in groups if g]))
         
 @IDataset_bp.route('/getAllDatasets')
 def get_all_datasets():
@@ -147,51 +182,18 @@ def get_all_datasets():
                         "name": item,
                         "path": item_path,
                         "platform_info": info_file_data,
-                        "yaml_info": yaml_info
+                        "yaml_info": yaml_info,
+                        "label_studio_sync": os.path.exists(sync_state_path(item_path))
                     }
                     datasets.append(dataset_info)
     
     return format_output(data={"datasets": datasets})
 
-@IDataset_bp.route('/uploadDataset', methods=["POST"])
-def upload_dataset():
+def write_dataset_config(save_dir, params, name, description, version, dataset_type, include_yaml):
     """
-    创建新数据集
+    解压完成后写入数据集 YAML（或自动查找压缩包中的 YAML）及平台 Info 文件
+    params: 包含 train / val / test / nc / names 的表单或字典；返回错误信息，成功时返回 None
     """
-    dataset_path = get_dataset_path()
-
-    file = request.files.get("file")
-    if not file:
-        return format_output(code=400, msg="未上传文件")
-
-    name = request.form.get("name", None)
-    description = request.form.get("description", "")
-    version = request.form.get("version", "v1.0.0")
-    dataset_type = request.form.get("type", None)
-    include_yaml = request.form.get("include_yaml", None)
-    
-    if name == None or dataset_type == None or include_yaml == None:
-        return format_output(code=400, msg="缺少必要的参数")
-    
-    include_yaml = (include_yaml == "1")
-
-    save_dir = os.path.join(dataset_path, f"{name}_{version}")
-    print(save_dir)
-    if os.path.exists(save_dir) and os.listdir(save_dir):
-        return format_output(code=400, msg=f"名为 '{name}' 且版本为 '{version}' 的数据集已存在，请更换名称或版本。")
-
-    os.makedirs(save_dir, exist_ok=True)
-
-    # 保存压缩包
-    zip_path = os.path.join(save_dir, file.filename)
-    file.save(zip_path)
-
-    # 解压文件
-    extract_zip_flat(zip_path, save_dir)
-    
-    # 删除文件
-    os.remove(zip_path)
-
     yaml_path = ""
     if include_yaml:
         # 自动搜索 yaml 文件
@@ -201,14 +203,15 @@ def upload_dataset():
                     yaml_path = os.path.relpath(os.path.join(root, f), save_dir)
                     break
         if not yaml_path:
-            return format_output(code=400, msg="未在压缩包中找到 YAML 文件")
+            return "未在压缩包中找到 YAML 文件"
     else:
         # 用户手动填写
-        train = request.form.get("train", "")
-        val = request.form.get("val", "")
-        test = request.form.get("test", "")
-        nc = int(request.form.get("nc", "1"))
-        names = request.form.get("names", "").split(",")
+        train = params.get("train", "")
+        val = params.get("val", "")
+        test = params.get("test", "")
+        nc = int(params.get("nc", "1"))
+        names = params.get("names", "")
+        names = names.split(",") if isinstance(names, str) else list(names)
 
         yaml_data = {
             "train": train,
@@ -235,8 +238,214 @@ def upload_dataset():
     with open(os.path.join(save_dir, "yolo_training_visualization_info.yaml"), "w", encoding="utf-8") as f:
         yaml.safe_dump(info_data, f, allow_unicode=True)
         
+    return None
+
+@IDataset_bp.route('/uploadDataset', methods=["POST"])
+def upload_dataset():
+    """
+    创建新数据集
+    """
+    dataset_path = get_dataset_path()
+
+    file = request.files.get("file")
+    if not file:
+        return format_output(code=400, msg="未上传文件")
+
+    name = request.form.get("name", None)
+    description = request.form.get("description", "")
+    version = request.form.get("version", "v1.0.0")
+    dataset_type = request.form.get("type", None)
+    include_yaml = request.form.get("include_yaml", None)
+    
+    if name == None or dataset_type == None or include_yaml == None:
+        return format_output(code=400, msg="缺少必要的参数")
+    
+    include_yaml = (include_yaml == "1")
+
+    save_dir = os.path.join(dataset_path, f"{name}_{version}")
+    print(save_dir)
+    if os.path.exists(save_dir) and os.listdir(save_dir):
+        return format_output(code=400, msg=f"名为 '{name}' 且版本为 '{version}' 的数据集已存在，请更换名称或版本。")
+
+    os.makedirs(save_dir, exist_ok=True)
+
+    # 直接从上传的文件流解压，不再先在数据集目录中另存一份压缩包
+    try:
+        extract_zip_flat(file.stream, save_dir)
+    except zipfile.BadZipFile:
+        shutil.rmtree(save_dir, ignore_errors=True)
+        return format_output(code=400, msg="上传的文件不是有效的 zip 压缩包")
+
+    error = write_dataset_config(save_dir, request.form, name, description, version, dataset_type, include_yaml)
+    if error:
+        return format_output(code=400, msg=error)
+        
     return format_output(msg="数据集上传成功")
 
+@IDataset_bp.route('/initChunkedUpload', methods=["POST"])
+def init_chunked_upload():
+    """
+    初始化分块上传（大数据集压缩包使用，支持断点续传与并行上传）
+    Body JSON: name, description, version, type, include_yaml, filename, size
+               include_yaml 为 0 时还需 train, val, test, nc, names
+    若同名数据集存在未完成的上传会话（且文件大小一致），返回该会话以便续传
+    """
+    data = request.get_json(silent=True) or {}
+    name = data.get("name", None)
+    version = data.get("version", "v1.0.0")
+    dataset_type = data.get("type", None)
+    include_yaml = data.get("include_yaml", None)
+    filename = data.get("filename", "dataset.zip")
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return format_output(code=400, msg="缺少必要的参数: size")
+
+    if name == None or dataset_type == None or include_yaml == None or size <= 0:
+        return format_output(code=400, msg="缺少必要的参数")
+
+    save_dir = os.path.join(get_dataset_path(), f"{name}_{version}")
+    store = get_upload_session_store()
+
+    session = store.find(save_dir)
+    if session is not None and session.size == size and session.status == "uploading":
+        return format_output(msg="继续未完成的上传", data={
+            "uploadID": session.upload_id,
+            "chunkSize": get_dataset_upload_chunk_size(),
+            "missing": session.missing_ranges()
+        })
+
+    if os.path.exists(save_dir) and os.listdir(save_dir):
+        return format_output(code=400, msg=f"名为 '{name}' 且版本为 '{version}' 的数据集已存在，请更换名称或版本。")
+
+    params = {
+        "name": name,
+        "description": data.get("description", ""),
+        "version": version,
+        "type": dataset_type,
+        "include_yaml": str(include_yaml) == "1",
+        "train": data.get("train", ""),
+        "val": data.get("val", ""),
+        "test": data.get("test", ""),
+        "nc": data.get("nc", 1),
+        "names": data.get("names", ""),
+    }
+    try:
+        session = store.create(save_dir, filename, size, params)
+    except OSError as e:
+        return format_output(code=500, msg=f"创建上传会话失败: {e}")
+
+    return format_output(msg="上传会话已创建", data={
+        "uploadID": session.upload_id,
+        "chunkSize": get_dataset_upload_chunk_size(),
+        "missing": session.missing_ranges()
+    })
+
+@IDataset_bp.route('/uploadChunk', methods=["PUT"])
+def upload_chunk():
+    """
+    上传一个数据块（请求体为原始二进制数据，不经过 multipart 解析）
+    Query: uploadID, offset
+    """
+    session = get_upload_session_store().get(request.args.get("uploadID"))
+    offset = request.args.get("offset", None, type=int)
+    if session is None:
+        return format_output(code=404, msg="上传会话不存在")
+    if offset is None:
+        return format_output(code=400, msg="缺少必要的参数: offset")
+
+    try:
+        written = session.write_chunk(offset, request.stream, request.content_length)
+    except ValueError as e:
+        return format_output(code=400, msg=str(e))
+    except OSError as e:
+        return format_output(code=500, msg=f"写入数据块失败: {e}")
+
+    return format_output(data={
+        "written": written,
+        "received": session.received_bytes(),
+        "size": session.size
+    })
+
+@IDataset_bp.route('/getUploadStatus', methods=["GET"])
+def get_upload_status():
+    """
+    查询分块上传进度及缺失区间
+    Query: uploadID
+    """
+    session = get_upload_session_store().get(request.args.get("uploadID"))
+    if session is None:
+        return format_output(code=404, msg="上传会话不存在")
+
+    return format_output(data={
+        "status": session.status,
+        "error": session.error,
+        "size": session.size,
+        "received": session.received_bytes(),
+        "missing": session.missing_ranges()
+    })
+
+def finalize_upload_session(session):
+    """
+    后台解压已上传完成的压缩包并写入数据集配置
+    """
+    params = session.params
+    try:
+        extract_zip_flat(session.part_path, session.save_dir)
+        os.remove(session.part_path)
+        error = write_dataset_config(
+            session.save_dir, params, params["name"], params["description"], params["version"], params["type"], params["include_yaml"]
+        )
+    except zipfile.BadZipFile:
+        error = "上传的文件不是有效的 zip 压缩包"
+    except Exception as e:
+        error = f"解压失败: {e}"
+
+    if error:
+        shutil.rmtree(session.save_dir, ignore_errors=True)
+        session.set_status("failed", error)
+    else:
+        session.set_status("done")
+
+@IDataset_bp.route('/finalizeChunkedUpload', methods=["POST"])
+def finalize_chunked_upload():
+    """
+    所有数据块上传完成后触发解压（后台执行，通过 getUploadStatus 查询 status：extracting / done / failed）
+    Body JSON: uploadID
+    """
+    data = request.get_json(silent=True) or {}
+    session = get_upload_session_store().get(data.get("uploadID"))
+    if session is None:
+        return format_output(code=404, msg="上传会话不存在")
+    if session.status != "uploading":
+        return format_output(code=400, msg=f"上传会话当前状态为 {session.status}")
+    # 已接收区间只增不减，完整性检查之后无需再次确认
+    if not session.is_complete():
+        return format_output(code=400, msg="文件尚未上传完整", data={"missing": session.missing_ranges()})
+    if not session.try_transition("uploading", "extracting"):
+        return format_output(code=400, msg=f"上传会话当前状态为 {session.status} 或仍有数据块正在写入，请稍后重试")
+
+    threading.Thread(target=finalize_upload_session, args=(session,), daemon=True).start()
+    return format_output(msg="上传完成，正在解压", data={"status": session.status})
+
+@IDataset_bp.route('/abortChunkedUpload', methods=["POST"])
+def abort_chunked_upload():
+    """
+    放弃分块上传并清理已写入的数据
+    Body JSON: uploadID
+    """
+    data = request.get_json(silent=True) or {}
+    store = get_upload_session_store()
+    session = store.get(data.get("uploadID"))
+    if session is None:
+        return format_output(code=404, msg="上传会话不存在")
+    if not session.try_transition("uploading", "aborted"):
+        return format_output(code=400, msg=f"上传会话当前状态为 {session.status} 或仍有数据块正在写入，无法取消")
+
+    shutil.rmtree(session.save_dir, ignore_errors=True)
+    store.remove(session.upload_id)
+    return format_output(msg="已取消上传")
+
 @IDataset_bp.route("/deleteDataset", methods=['POST'])
 def delete_dataset():
     """
@@ -297,6 +506,10 @@ def build_dataset_from_label_studio():
     - seed: 随机种子，默认 42（可选）
     - download_images: 是否下载图片，默认 True（可选）
     - class_names: 指定类别名列表，若不传则从数据推断（可选）
+    - download_workers: 并发下载图片的线程数，默认 16（可选）
+    - materialize: 划分时文件的落地方式 move / hardlink / reflink / copy，默认 move（可选）
+    - split_strategy: 划分策略 hash（按文件名稳定哈希）/ random（整体 shuffle），默认 hash（可选）
+    - stratify: 是否按样本主类别分层划分（仅 hash 策略），默认 False（可选）
     """
     data = request.get_json(silent=True) or {}
     base_url = data.get("base_url", "")
@@ -308,11 +521,21 @@ def build_dataset_from_label_studio():
     export_type = data.get("exportType", "CSV")
     splits = data.get("splits", [0.8, 0.2, 0.0])
     seed = int(data.get("seed", 42))
-    download_images = bool(data.get("download_images", True))
+    download_images = parse_bool(data.get("download_images"), default=True)
     class_names = data.get("class_names", None)
+    download_workers = data.get("download_workers", None)
+    materialize = data.get("materialize", "move")
+    split_strategy = data.get("split_strategy", "hash")
+    stratify = parse_bool(data.get("stratify"), default=False)
 
     if not base_url or project_id is None or not name or not version:
         return format_output(code=400, msg="缺少必要的参数 base_url / project_id / name / version")
+    if download_images is None or stratify is None:
+        return format_output(code=400, msg="download_images / stratify 须为布尔值")
+    if materialize not in MATERIALIZE_MODES:
+        return format_output(code=400, msg=f"materialize 仅支持 {', '.join(MATERIALIZE_MODES)}")
+    if split_strategy not in SPLIT_STRATEGIES:
+        return format_output(code=400, msg=f"split_strategy 仅支持 {', '.join(SPLIT_STRATEGIES)}")
 
     # 输出目录：用户数据集根目录下 name_version
     dataset_root = get_dataset_path()
@@ -333,6 +556,10 @@ def build_dataset_from_label_studio():
             class_names=class_names,
             base_url=base_url,
             token=token,
+            download_workers=int(download_workers) if download_workers else None,
+            materialize=materialize,
+            split_strategy=split_strategy,
+            stratify=stratify,
         )
 
         # 写平台信息文件
@@ -360,4 +587,51 @@ def build_dataset_from_label_studio():
                 shutil.rmtree(save_dir)
         except Exception:
             pass
-        return format_output(code=500, msg=f"构建数据集失败: {e}")
\ No newline at end of file
+        return format_output(code=500, msg=f"构建数据集失败: {e}")
+
+_syncing_datasets = set()
+_syncing_lock = threading.Lock()
+
+@IDataset_bp.route('/syncDatasetFromLabelStudio', methods=["POST"])
+def sync_dataset_from_label_studio_route():
+    """
+    增量同步由 Label Studio 构建的数据集：只拉取新增 / 变化的任务并重写受影响的标签，已有样本保持原划分
+
+    Body JSON：
+    - path: 数据集目录（必填）
+    - base_url: Label Studio 服务地址，默认使用构建时的地址（可选）
+    - token: Label Studio API Token（可选）
+    - download_images: 是否下载图片，默认 True（可选）
+    - download_workers: 并发下载图片的线程数，默认 16（可选）
+    """
+    data = request.get_json(silent=True) or {}
+    path = data.get("path")
+    download_images = parse_bool(data.get("download_images"), default=True)
+    if not path:
+        return format_output(code=400, msg="缺少必要的参数 path")
+    if download_images is None:
+        return format_output(code=400, msg="download_images 须为布尔值")
+    if not os.path.exists(sync_state_path(path)):
+        return format_output(code=400, msg="该数据集不是从 Label Studio 构建的，或缺少同步记录")
+
+    path = os.path.abspath(path)
+    with _syncing_lock:
+        if path in _syncing_datasets:
+            return format_output(code=400, msg="该数据集正在同步中")
+        _syncing_datasets.add(path)
+
+    download_workers = data.get("download_workers", None)
+    try:
+        stats = sync_dataset_from_label_studio(
+            dataset_dir=path,
+            base_url=data.get("base_url") or None,
+            token=data.get("token") or None,
+            download_images=download_images,
+            download_workers=int(download_workers) if download_workers else None,
+        )
+        return format_output(msg="同步成功", data=stats)
+    except Exception as e:
+        return format_output(code=500, msg=f"同步数据集失败: {e}")
+    finally:
+        with _syncing_lock:
+            _syncing_datasets.discard(path)
@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+CHUNK_COPY_BUFFER_SIZE = 1024 * 1024
+TERMINAL_STATUSES = ("done", "failed")
+
+class UploadSession:
+    """
+    分块上传会话
+
+    数据直接写入目标数据集目录下的 .part 文件，已接收的字节区间持久化到会话文件中，
+    客户端中断后可通过 missing_ranges 查询缺失部分继续上传；不同区间可以并行上传。
+    """
+    def __init__(self, store, upload_id, save_dir, filename, size, params, ranges=None, status="uploading", error=None, created_at=None):
+        self._store = store
+        self._lock = threading.Lock()
+        self.upload_id = upload_id
+        self.save_dir = save_dir
+        self.filename = filename
+        self.size = size
+        self.params = params
+        self.ranges = ranges or []
+        self.status = status
+        self.error = error
+        self.created_at = created_at or int(time.time())
+        self.finished_at = None
+        self._writers = 0
+
+    @property
+    def part_path(self):
+        return os.path.join(self.save_dir, f".upload_{self.upload_id}.part")
+
+    def to_dict(self):
+        return {
+            "upload_id": self.upload_id,
+            "save_dir": self.save_dir,
+            "filename": self.filename,
+            "size": self.size,
+            "params": self.params,
+            "ranges": self.ranges,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+        }
+
+    def write_chunk(self, offset, stream, length=None):
+        """
+        从 stream 中分块读取数据写入 offset 处，返回写入的字节数
+
+        会话不处于 uploading 状态时抛出 ValueError；写入期间会话不能切换到解压或取消
+        """
+        if offset < 0 or offset > self.size:
+            raise ValueError("offset 超出文件范围")
+        if length is not None and offset + length > self.size:
+            raise ValueError("数据块超出文件范围")
+        with self._lock:
+            if self.status != "uploading":
+                raise ValueError(f"上传会话当前状态为 {self.status}，无法继续上传")
+            self._writers += 1
+
+        written = 0
+        try:
+            # 每个请求独立打开文件句柄，不同区间可并发写入
+            with open(self.part_path, "r+b") as f:
+                f.seek(offset)
+                while True:
+                    limit = CHUNK_COPY_BUFFER_SIZE if length is None else min(CHUNK_COPY_BUFFER_SIZE, length - written)
+                    if limit <= 0:
+                        break
+                    buf = stream.read(limit)
+                    if not buf:
+                        break
+                    if offset + written + len(buf) > self.size:
+                        raise ValueError("数据块超出文件范围")
+                    f.write(buf)
+                    written += len(buf)
+        finally:
+            if written:
+                self.add_range(offset, offset + written)
+            with self._lock:
+                self._writers -= 1
+        return written
+
+    def add_range(self, start, end):
+        """
+        记录已接收区间并与已有区间合并
+        """
+        with self._lock:
+            merged = []
+            for s, e in sorted(self.ranges + [[start, end]]):
+                if merged and s <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], e)
+                else:
+                    merged.append([s, e])
+            self.ranges = merged
+            self.save()
+
+    def received_bytes(self):
+        return sum(e - s for s, e in self.ranges)
+
+    def missing_ranges(self):
+        """
+        尚未接收的字节区间 [[start, end), ...]
+        """
+        missing = []
+        cursor = 0
+        for s, e in self.ranges:
+            if s > cursor:
+                missing.append([cursor, s])
+            cursor = max(cursor, e)
+        if cursor < self.size:
+            missing.append([cursor, self.size])
+        return missing
+
+    def is_complete(self):
+        return not self.missing_ranges()
+
+    def try_transition(self, from_status, to_status):
+        """
+        仅当会话处于 from_status 且没有正在写入的数据块时切换到 to_status，返回是否成功
+        """
+        with self._lock:
+            if self.status != from_status or self._writers:
+                return False
+            self.status = to_status
+            self.save()
+            return True
+
+    def set_status(self, status, error=None):
+        """
+        更新会话状态；结束（done / failed）后会话文件随即删除，状态只在内存中保留一段时间供查询
+        """
+        with self._lock:
+            self.status = status
+            self.error = error
+            if status in TERMINAL_STATUSES:
+                self.finished_at = time.time()
+                self._store.retire(self)
+            else:
+                self.save()
+
+    def save(self):
+        self._store.save(self)
+
+class UploadSessionStore:
+    """
+    上传会话存储（内存 + 会话目录下的 JSON 文件，服务重启后仍可续传）
+    """
+    def __init__(self, sessions_dir, retention=600):
+        self.sessions_dir = sessions_dir
+        self.retention = retention
+        os.makedirs(sessions_dir, exist_ok=True)
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session_file(self, upload_id):
+        return os.path.join(self.sessions_dir, f"{upload_id}.json")
+
+    def create(self, save_dir, filename, size, params):
+        upload_id = uuid.uuid4().hex
+        session = UploadSession(self, upload_id, save_dir, filename, size, params)
+        os.makedirs(save_dir, exist_ok=True)
+        # 预先创建目标大小的文件，分块按偏移量写入
+        with open(session.part_path, "wb") as f:
+            f.truncate(size)
+        with self._lock:
+            self._sessions[upload_id] = session
+        session.save()
+        return session
+
+    def get(self, upload_id):
+        if not upload_id or not all(c in "0123456789abcdef" for c in upload_id):
+            return None
+        with self._lock:
+            self._prune()
+            session = self._sessions.get(upload_id)
+            if session is not None:
+                return session
+            try:
+                with open(self._session_file(upload_id), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return None
+            session = UploadSession(self, **data)
+            # 旧版本遗留的已结束会话文件
+            if session.status in TERMINAL_STATUSES:
+                self._remove_file(upload_id)
+                return None
+            # 服务在解压过程中重启：数据已完整，允许客户端重新触发解压
+            if session.status == "extracting":
+                session.status = "uploading"
+            self._sessions[upload_id] = session
+            return session
+
+    def find(self, save_dir):
+        """
+        查找目标目录上未完成的会话（用于客户端重新发起 init 时续传）
+        """
+        for filename in os.listdir(self.sessions_dir):
+            if filename.endswith(".json"):
+                session = self.get(filename[:-5])
+                if session is not None and session.save_dir == save_dir and session.status == "uploading":
+                    return session
+        return None
+
+    def save(self, session):
+        tmp_path = self._session_file(session.upload_id) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(session.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, self._session_file(session.upload_id))
+
+    def _remove_file(self, upload_id):
+        try:
+            os.remove(self._session_file(upload_id))
+        except OSError:
+            pass
+
+    def _prune(self):
+        """
+        丢弃结束超过保留时间的会话，调用方需持有 self._lock
+        """
+        now = time.time()
+        for upload_id, session in list(self._sessions.items()):
+            if session.finished_at is not None and now - session.finished_at > self.retention:
+                del self._sessions[upload_id]
+
+    def retire(self, session):
+        """
+        会话结束：删除会话文件，内存中的状态由 _prune 到期清理
+        """
+        self._remove_file(session.upload_id)
+
+    def remove(self, upload_id):
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+        self._remove_file(upload_id)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_upload_session_store():
+    """
+    获取全局上传会话存储（首次调用时创建）
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            from config import get_upload_sessions_path, get_upload_session_retention
+            _store = UploadSessionStore(get_upload_sessions_path(), get_upload_session_retention())
+        return _store
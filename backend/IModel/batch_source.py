@@ -0,0 +1,104 @@
+import glob
+import os
+import zipfile
+
+# 批量测试支持的图片格式
+BATCH_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+
+# 视频测试支持的文件格式与流地址前缀
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v", ".wmv", ".flv", ".mpg", ".mpeg", ".ts")
+STREAM_PREFIXES = ("rtsp://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+def _is_image(name):
+    return name.lower().endswith(BATCH_IMAGE_EXTENSIONS)
+
+def is_stream_source(input_path):
+    """
+    输入是否为视频流：网络流地址或摄像头编号
+    """
+    return input_path.lower().startswith(STREAM_PREFIXES) or input_path.isdigit()
+
+def is_video_input(input_path):
+    return is_stream_source(input_path) or input_path.lower().endswith(VIDEO_EXTENSIONS)
+
+def is_glob_pattern(path):
+    return any(c in path for c in "*?[")
+
+def is_batch_input(input_path):
+    """
+    输入是否为批量测试来源：目录、通配符或 zip 压缩包
+    """
+    return os.path.isdir(input_path) or input_path.lower().endswith(".zip") or is_glob_pattern(input_path)
+
+def check_batch_input(input_path):
+    """
+    提交任务前检查批量输入是否可用，返回错误信息（可用时为 None）
+    """
+    if is_glob_pattern(input_path):
+        if not any(_is_image(p) for p in glob.iglob(input_path, recursive=True)):
+            return f"通配符未匹配到任何图片: {input_path}"
+        return None
+    if not os.path.exists(input_path):
+        return f"输入路径不存在: {input_path}"
+    if input_path.lower().endswith(".zip") and not zipfile.is_zipfile(input_path):
+        return f"不是有效的 zip 文件: {input_path}"
+    return None
+
+def _extract_zip_images(zip_path, extract_dir):
+    """
+    只解压 zip 中的图片，忽略目录穿越的成员，返回解压后的路径列表
+    """
+    root = os.path.realpath(extract_dir)
+    paths = []
+    with zipfile.ZipFile(zip_path) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not _is_image(info.filename):
+                continue
+            target = os.path.realpath(os.path.join(root, info.filename))
+            if not target.startswith(root + os.sep):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zf.open(info) as src, open(target, "wb") as dst:
+                while True:
+                    chunk = src.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+            paths.append(target)
+    return paths
+
+def collect_batch_images(input_path, extract_dir):
+    """
+    展开批量输入为排好序的图片路径列表
+
+    - 目录：递归查找图片
+    - 通配符：按 glob（支持 **）匹配
+    - zip：把图片解压到 extract_dir 后返回
+    """
+    if is_glob_pattern(input_path):
+        paths = [p for p in glob.iglob(input_path, recursive=True) if _is_image(p) and os.path.isfile(p)]
+    elif os.path.isdir(input_path):
+        paths = []
+        for root, dirs, files in os.walk(input_path):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            paths.extend(os.path.join(root, f) for f in files if _is_image(f))
+    elif input_path.lower().endswith(".zip"):
+        os.makedirs(extract_dir, exist_ok=True)
+        paths = _extract_zip_images(input_path, extract_dir)
+    else:
+        paths = [input_path] if _is_image(input_path) else []
+    return sorted(paths)
+
+def write_batch_source_list(paths, list_path):
+    """
+    把图片路径写入 .txt 清单（每行一个绝对路径），作为 predict 的 source
+
+    Ultralytics 会把 list 类型的 source 当作内存图片一次性全部解码并作为一个 batch，
+    而 .txt 清单走 LoadImagesAndVideos，按 batch 参数逐批读取
+    """
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            path = os.path.abspath(path)
+            # LoadImagesAndVideos 会对含 * 的行做 glob 展开
+            f.write((glob.escape(path) if "*" in path else path) + "\n")
+    return list_path
@@ -0,0 +1,301 @@
+import gc
+import os
+import sys
+import time
+import logging
+import threading
+from IModel.export_history import update_export_history
+
+# 导出产物的识别规则：(格式, 文件后缀或目录名后缀, 是否为目录)
+ARTIFACT_PATTERNS = (
+    ("torchscript", ".torchscript", False),
+    ("onnx", ".onnx", False),
+    ("openvino", "_openvino_model", True),
+    ("engine", ".engine", False),
+    ("coreml", ".mlpackage", True),
+    ("saved_model", "_saved_model", True),
+    ("pb", ".pb", False),
+    ("tflite", ".tflite", False),
+    ("paddle", "_paddle_model", True),
+    ("ncnn", "_ncnn_model", True),
+)
+
+# 只能在 GPU 上运行的格式，CPU 基准测试时跳过
+GPU_ONLY_FORMATS = ("engine",)
+
+def _path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def discover_artifacts(export_dir, formats=None):
+    """
+    列出 export_dir 下（仅第一层）可用于基准测试的导出产物，返回 [{format, path, size}]
+    formats: 只保留这些格式（可选）
+    """
+    if not os.path.isdir(export_dir):
+        return []
+    artifacts = []
+    for name in sorted(os.listdir(export_dir)):
+        path = os.path.join(export_dir, name)
+        for fmt, suffix, is_dir in ARTIFACT_PATTERNS:
+            if name.endswith(suffix) and os.path.isdir(path) == is_dir:
+                if not formats or fmt in formats:
+                    artifacts.append({"format": fmt, "path": path, "size": _path_size(path)})
+                break
+    return artifacts
+
+def _percentile(sorted_values, q):
+    """
+    线性插值百分位（与 numpy.percentile 默认方式一致）
+    """
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+def latency_stats(latencies_ms, batch_size):
+    """
+    单个 batch 大小的计时结果汇总：延迟（毫秒，每次调用）与吞吐（图片/秒）
+    """
+    values = sorted(latencies_ms)
+    mean = sum(values) / len(values)
+    return {
+        "batch": batch_size,
+        "iterations": len(values),
+        "mean_ms": round(mean, 3),
+        "p50_ms": round(_percentile(values, 50), 3),
+        "p95_ms": round(_percentile(values, 95), 3),
+        "p99_ms": round(_percentile(values, 99), 3),
+        "min_ms": round(values[0], 3),
+        "max_ms": round(values[-1], 3),
+        "throughput": round(batch_size * 1000 / mean, 2) if mean > 0 else None,
+    }
+
+class RssSampler:
+    """
+    后台线程按固定间隔采样当前进程的常驻内存，记录峰值（字节）
+
+    ru_maxrss 是整个进程生命周期的峰值，无法区分先后测试的多个产物，所以改为在每个产物的
+    加载与计时期间采样
+    """
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+
+    def rss(self):
+        if self._process is not None:
+            return self._process.memory_info().rss
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            return 0
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def __enter__(self):
+        self.peak = self.rss()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+def _make_images(batch_size, imgsz, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (imgsz, imgsz, 3), dtype=np.uint8) for _ in range(batch_size)]
+
+def benchmark_artifact(artifact, batch_sizes, imgsz, warmup, iterations, device, logger, loader=None):
+    """
+    对单个产物（或源 .pt）依次在各 batch 大小下预热后计时，返回该产物的结果
+    """
+    result = {"format": artifact["format"], "path": artifact["path"], "size": artifact["size"], "runs": []}
+    if loader is None:
+        from ultralytics import YOLO
+        loader = YOLO
+
+    sampler = RssSampler()
+    rss_before = sampler.rss()
+    model = None
+    try:
+        with sampler:
+            start = time.perf_counter()
+            model = loader(artifact["path"])
+            result["load_s"] = round(time.perf_counter() - start, 3)
+
+            for batch_size in batch_sizes:
+                images = _make_images(batch_size, imgsz)
+                predict_args = dict(imgsz=imgsz, device=device, batch=batch_size, save=False, verbose=False)
+                try:
+                    for _ in range(warmup):
+                        model.predict(images, **predict_args)
+                    latencies = []
+                    speed = {}
+                    for _ in range(iterations):
+                        start = time.perf_counter()
+                        results = model.predict(images, **predict_args)
+                        latencies.append((time.perf_counter() - start) * 1000)
+                        for key, value in (getattr(results[0], "speed", None) or {}).items():
+                            if value is not None:
+                                speed[key] = speed.get(key, 0.0) + value
+                    run = latency_stats(latencies, batch_size)
+                    # Ultralytics 统计的单张图片各阶段耗时（毫秒）
+                    run["speed_ms"] = {k: round(v / iterations, 3) for k, v in speed.items()}
+                    logger.info(
+                        f"[BENCH] {artifact['format']} batch={batch_size}: mean {run['mean_ms']} ms, "
+                        f"p95 {run['p95_ms']} ms, {run['throughput']} img/s"
+                    )
+                except Exception as e:
+                    # 固定 batch 导出的产物无法以其他 batch 大小推理，只记录错误
+                    run = {"batch": batch_size, "error": str(e)}
+                    logger.warning(f"[BENCH] {artifact['format']} batch={batch_size} 失败: {e}")
+                result["runs"].append(run)
+    except Exception as e:
+        result["error"] = str(e)
+        logger.warning(f"[BENCH] 加载 {artifact['path']} 失败: {e}")
+    finally:
+        del model
+        gc.collect()
+
+    result["rss_before_mb"] = round(rss_before / 1024 ** 2, 1)
+    result["peak_rss_mb"] = round(sampler.peak / 1024 ** 2, 1)
+    return result
+
+def compare_results(results):
+    """
+    以源 .pt 为基准生成对比表：每个 batch 大小下各格式的延迟、吞吐、加速比与峰值内存，
+    按平均延迟升序排列；fastest 为每个 batch 大小下最快的格式
+    """
+    baseline, baseline_rss = {}, None
+    for item in results:
+        if item["format"] == "pytorch":
+            baseline = {run["batch"]: run for run in item["runs"] if "error" not in run}
+            baseline_rss = item.get("peak_rss_mb")
+            break
+
+    rows = []
+    for item in results:
+        for run in item.get("runs", []):
+            if "error" in run:
+                continue
+            base = baseline.get(run["batch"])
+            rows.append({
+                "format": item["format"],
+                "batch": run["batch"],
+                "mean_ms": run["mean_ms"],
+                "p95_ms": run["p95_ms"],
+                "p99_ms": run["p99_ms"],
+                "throughput": run["throughput"],
+                "speedup": round(base["mean_ms"] / run["mean_ms"], 3) if base and run["mean_ms"] else None,
+                "peak_rss_mb": item.get("peak_rss_mb"),
+                "rss_ratio": round(item["peak_rss_mb"] / baseline_rss, 3) if baseline_rss and item.get("peak_rss_mb") else None,
+                "size": item.get("size"),
+            })
+    rows.sort(key=lambda row: (row["batch"], row["mean_ms"]))
+
+    fastest = {}
+    for row in rows:
+        fastest.setdefault(str(row["batch"]), row["format"])
+    return {"rows": rows, "fastest": fastest}
+
+def benchmark_exports(model_path,
+                      output_dir,
+                      export_key,
+                      formats=None,
+                      batch_sizes=None,
+                      imgsz=640,
+                      warmup=3,
+                      iterations=20,
+                      device="cpu",
+                      logger: logging.Logger | None = None,
+                      loader=None):
+    """
+    对 output_dir/export 下的导出产物做推理基准测试，并与源 .pt 对比。
+
+    参数:
+    - model_path: 源权重 .pt 文件路径（作为对比基准）
+    - output_dir: 训练结果目录，产物位于 output_dir/export 下
+    - export_key: 基准测试记录在 export_history.json 中的 exportKey
+    - formats: 只测试这些格式（可选，默认全部）
+    - batch_sizes: 测试的 batch 大小列表，默认 [1]
+    - imgsz: 输入尺寸
+    - warmup: 每个 batch 大小的预热次数（不计时）
+    - iterations: 每个 batch 大小的计时次数
+    - device: 推理设备，默认 "cpu"
+    - logger: 日志记录器
+
+    每测完一个产物就把当前结果写回 export_history.json，中途失败时已有结果仍然可见。
+    """
+    if logger is None:
+        logger = logging.getLogger("benchmark")
+        if not logger.handlers:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S"))
+            logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    output_dir = os.path.abspath(output_dir)
+    export_dir = os.path.join(output_dir, "export")
+    batch_sizes = sorted({int(b) for b in (batch_sizes or [1])})
+    artifacts = [{"format": "pytorch", "path": model_path, "size": _path_size(model_path)}]
+    for artifact in discover_artifacts(export_dir, formats):
+        if str(device) == "cpu" and artifact["format"] in GPU_ONLY_FORMATS:
+            logger.info(f"[BENCH] 跳过 {artifact['path']}：{artifact['format']} 只能在 GPU 上运行")
+            continue
+        artifacts.append(artifact)
+
+    logger.info(f"[INFO] 开始推理基准测试 exportKey={export_key}")
+    logger.info(f"[INFO] 设备: {device}，imgsz: {imgsz}，batch: {batch_sizes}，预热 {warmup} 次，计时 {iterations} 次")
+    logger.info(f"[INFO] 待测试: {[a['format'] for a in artifacts]}")
+
+    settings = {
+        "device": str(device),
+        "imgsz": imgsz,
+        "batch_sizes": batch_sizes,
+        "warmup": warmup,
+        "iterations": iterations,
+    }
+    results = []
+    update_export_history(output_dir, export_key, {"status": "running", "benchmark": {**settings, "results": results}})
+    try:
+        for artifact in artifacts:
+            logger.info(f"[BENCH] 正在测试 {artifact['format']}: {artifact['path']}")
+            results.append(benchmark_artifact(artifact, batch_sizes, imgsz, warmup, iterations, device, logger, loader))
+            update_export_history(output_dir, export_key, {"benchmark": {**settings, "results": results}})
+    except BaseException:
+        update_export_history(output_dir, export_key, {"status": "failed", "finishedAt": int(time.time())})
+        raise
+
+    comparison = compare_results(results)
+    update_export_history(output_dir, export_key, {
+        "status": "finished",
+        "finishedAt": int(time.time()),
+        "benchmark": {**settings, "results": results, "comparison": comparison},
+    })
+    for batch, fmt in comparison["fastest"].items():
+        logger.info(f"[BENCH] batch={batch} 最快的格式: {fmt}")
+    logger.info(f"[INFO] 推理基准测试结束，结果已写入 {os.path.join(export_dir, 'export_history.json')}")
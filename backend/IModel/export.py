@@ -1,12 +1,278 @@
 import os
 import sys
+import json
 import time
 import logging
 import shutil
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logging.handlers import QueueHandler
 from pathlib import Path
-from ultralytics import YOLO
+from model_cache import load_model, get_model_cache
+from config import get_export_max_parallel
+from IModel.export_history import update_export_history
 from .triton_integration import register_model_to_triton
 
+# 由其他格式的中间产物派生的格式：与来源格式放在同一条流水线中依次导出，
+# 以便复用来源产物（engine 由 ONNX 构建，tflite 直接取自 saved_model 目录）
+DERIVED_FORMATS = {
+    "engine": "onnx",
+    "pb": "saved_model",
+    "tflite": "saved_model",
+    "edgetpu": "saved_model",
+    "tfjs": "saved_model",
+}
+
+def plan_exports(formats):
+    """
+    把导出格式分组为互不依赖、可并行的流水线，返回 [[fmt, ...], ...]，每组中来源格式排在最前
+    """
+    lanes = {}
+    for fmt in dict.fromkeys(formats):
+        lanes.setdefault(DERIVED_FORMATS.get(fmt, fmt), []).append(fmt)
+    for root, lane in lanes.items():
+        lane.sort(key=lambda f: f != root)
+    return list(lanes.values())
+
+def _collect_artifact(ret, export_dir, fmt, logger):
+    """
+    确保产物最终位于 export_dir 下，返回产物路径（Path，不存在时为 None）
+    """
+    ret_path = Path(str(ret)).resolve() if ret else None
+    export_base = Path(export_dir).resolve()
+    if ret_path and ret_path.exists():
+        # 如果不在 export 目录下，则移动过去
+        if export_base not in ret_path.parents and export_base != ret_path:
+            target = export_base / ret_path.name
+            try:
+                if target.exists():
+                    if target.is_file():
+                        target.unlink()
+                    else:
+                        shutil.rmtree(target)
+            except Exception:
+                pass
+            shutil.move(str(ret_path), str(target))
+            logger.info(f"[EXPORT] {fmt} 产物已移动到: {target}")
+            ret_path = target.resolve()
+            # 处理伴随文件（如 OpenVINO .bin）
+            try:
+                if ret_path.suffix.lower() == ".xml":
+                    src_bin = Path(str(ret)).with_suffix(".bin")
+                    if src_bin.exists():
+                        dst_bin = export_base / src_bin.name
+                        if dst_bin.exists():
+                            dst_bin.unlink()
+                        shutil.move(str(src_bin), str(dst_bin))
+                        logger.info(f"[EXPORT] 附属文件已移动到: {dst_bin}")
+            except Exception:
+                pass
+    return ret_path if ret_path and ret_path.exists() else None
+
+def _build_engine_from_onnx(onnx_path, engine_path, half, logger):
+    """
+    用 TensorRT 直接从已导出的 ONNX 构建 engine，并按 Ultralytics 的格式在文件头写入模型元数据
+    （4 字节长度 + JSON），省去 engine 导出时重新导出一次 ONNX
+    """
+    import onnx
+    import tensorrt as trt
+
+    metadata = {p.key: p.value for p in onnx.load(str(onnx_path), load_external_data=False).metadata_props}
+    trt_logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(trt_logger)
+    config = builder.create_builder_config()
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, trt_logger)
+    if not parser.parse_from_file(str(onnx_path)):
+        errors = "; ".join(str(parser.get_error(i)) for i in range(parser.num_errors))
+        raise RuntimeError(f"解析 ONNX 失败: {errors}")
+    if half and builder.platform_has_fast_fp16:
+        config.set_flag(trt.BuilderFlag.FP16)
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError("TensorRT 构建 engine 失败")
+
+    meta = json.dumps(metadata)
+    with open(engine_path, "wb") as f:
+        f.write(len(meta).to_bytes(4, byteorder="little", signed=True))
+        f.write(meta.encode())
+        f.write(serialized)
+    logger.info(f"[EXPORT] engine 由 {onnx_path} 构建")
+    return Path(engine_path)
+
+def _reuse_intermediate(fmt, done, export_dir, export_kwargs, logger):
+    """
+    尝试用同一流水线中已导出的来源产物得到 fmt，成功返回产物路径，否则返回 None（回退到 model.export）
+    """
+    source = done.get(DERIVED_FORMATS.get(fmt))
+    if source is None:
+        return None
+    try:
+        if fmt == "engine" and str(export_kwargs["device"]) not in ("cpu", "mps"):
+            return _build_engine_from_onnx(source, Path(export_dir) / f"{source.stem}.engine", export_kwargs["half"], logger)
+        if fmt == "tflite":
+            # saved_model 导出时已经生成了 float32 / float16 的 tflite
+            stem = source.name[: -len("_saved_model")]
+            tflite = source / f"{stem}_{'float16' if export_kwargs['half'] else 'float32'}.tflite"
+            if tflite.exists():
+                target = Path(export_dir) / tflite.name
+                shutil.copy2(tflite, target)
+                return target
+    except Exception as e:
+        logger.warning(f"[EXPORT] 复用 {source.name} 生成 {fmt} 失败，改为重新导出: {e}")
+    return None
+
+def _run_lane(model, lane, export_dir, export_kwargs, logger):
+    """
+    在当前进程中依次导出一条流水线中的格式，返回每个格式的结果记录
+    """
+    records = []
+    done = {}
+    for fmt in lane:
+        record = {"format": fmt, "status": "failed", "path": None, "seconds": None, "reused": None}
+        start = time.perf_counter()
+        try:
+            logger.info(f"[EXPORT] 正在导出格式: {fmt}")
+            ret_path = _reuse_intermediate(fmt, done, export_dir, export_kwargs, logger)
+            if ret_path is not None:
+                record["reused"] = DERIVED_FORMATS[fmt]
+            else:
+                # Ultralytics export 参数说明:
+                #   format: onnx/openvino/torchscript/engine/xml/pb/coreml/…
+                #   imgsz: 输入尺寸
+                #   device: 导出设备
+                #   half: 半精度
+                #   simplify: 简化（ONNX）
+                #   opset: ONNX opset 版本
+                #   project/name: 输出路径控制
+                ret = model.export(
+                    format=fmt,
+                    **export_kwargs,
+                    project=os.path.dirname(export_dir),
+                    name="export",
+                    exist_ok=True,
+                )
+                # 确保产物最终位于 export_dir 下
+                try:
+                    ret_path = _collect_artifact(ret, export_dir, fmt, logger)
+                except Exception as move_e:
+                    logger.warning(f"[EXPORT] 产物位置调整失败（忽略）: {move_e}")
+                    ret_path = Path(str(ret)) if ret else None
+            if ret_path is not None:
+                done[fmt] = ret_path
+                record.update(status="ok", path=str(ret_path))
+            logger.info(f"[EXPORT] 导出完成: {fmt} -> {ret_path}")
+        except Exception as e:
+            record["error"] = str(e)
+            logger.exception(f"[EXPORT] 导出 {fmt} 失败: {e}")
+        record["seconds"] = round(time.perf_counter() - start, 2)
+        records.append(record)
+    return records
+
+_lane_log_queue = None
+
+def _lane_init(log_queue):
+    """
+    导出子进程初始化：日志（含 Ultralytics 的输出）经队列转发给父进程的任务日志
+    """
+    global _lane_log_queue
+    _lane_log_queue = log_queue
+
+def _lane_main(model_path, lane, export_dir, export_kwargs):
+    """
+    导出子进程入口：把权重复制到流水线私有目录后加载一份独立的模型，依次导出该流水线的格式
+
+    Ultralytics 把产物（以及 engine / saved_model 导出时的中间 ONNX）写在权重文件旁边，
+    各流水线使用各自的权重副本，避免并行导出时相互覆盖
+    """
+    from ultralytics import YOLO
+
+    handler = QueueHandler(_lane_log_queue)
+    handler.setFormatter(logging.Formatter(f"[{lane[0]}] %(message)s"))
+    logger = logging.getLogger(f"export.{lane[0]}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    ul_logger = logging.getLogger("ultralytics")
+    for lg in (logger, ul_logger):
+        lg.addHandler(handler)
+
+    # 放在 export 目录之外，产物才会被移动到 export 目录下
+    lane_dir = tempfile.mkdtemp(prefix=f".export_{lane[0]}_", dir=os.path.dirname(export_dir))
+    try:
+        lane_weights = shutil.copy2(model_path, os.path.join(lane_dir, os.path.basename(model_path)))
+        return _run_lane(YOLO(lane_weights), lane, export_dir, export_kwargs, logger)
+    finally:
+        shutil.rmtree(lane_dir, ignore_errors=True)
+        for lg in (logger, ul_logger):
+            lg.removeHandler(handler)
+
+def _forward_logs(log_queue, logger):
+    while True:
+        record = log_queue.get()
+        if record is None:
+            break
+        logger.handle(record)
+
+def _run_lanes_parallel(model_path, lanes, export_dir, export_kwargs, max_parallel, logger):
+    """
+    每条流水线在独立的 spawn 子进程中运行（各自加载模型），返回所有格式的结果记录
+    """
+    ctx = multiprocessing.get_context("spawn")
+    log_queue = ctx.Queue()
+    forwarder = threading.Thread(target=_forward_logs, args=(log_queue, logger), daemon=True)
+    forwarder.start()
+
+    records = []
+    try:
+        with ProcessPoolExecutor(max_workers=min(len(lanes), max_parallel), mp_context=ctx,
+                                 initializer=_lane_init, initargs=(log_queue,)) as pool:
+            futures = {pool.submit(_lane_main, model_path, lane, export_dir, export_kwargs): lane for lane in lanes}
+            for future in as_completed(futures):
+                try:
+                    records.extend(future.result())
+                except Exception as e:
+                    # 子进程崩溃（如显存不足被杀）时该流水线的格式全部记为失败
+                    logger.error(f"[EXPORT] 导出进程异常 {futures[future]}: {e}")
+                    records.extend({"format": fmt, "status": "failed", "path": None, "seconds": None,
+                                    "reused": None, "error": str(e)} for fmt in futures[future])
+    finally:
+        log_queue.put(None)
+        forwarder.join()
+    return records
+
+def _register_triton(record, model_path, imgsz, triton_repo_path, triton_model_name, logger):
+    """
+    把导出成功的产物注册到 Triton 模型仓库
+    """
+    fmt = record["format"]
+    try:
+        # 生成模型名称
+        if not triton_model_name:
+            base_name = Path(model_path).stem  # 去掉 .pt 扩展名
+            triton_model_name_final = f"{base_name}_{fmt}"
+        else:
+            triton_model_name_final = f"{triton_model_name}_{fmt}"
+
+        success = register_model_to_triton(
+            model_path=record["path"],
+            triton_repo_path=triton_repo_path,
+            model_name=triton_model_name_final,
+            model_format=fmt,
+            input_shape=[1, 3, imgsz, imgsz],
+            logger=logger
+        )
+
+        if success:
+            logger.info(f"[TRITON] {fmt} 模型已成功注册到 Triton 仓库: {triton_model_name_final}")
+        else:
+            logger.warning(f"[TRITON] {fmt} 模型注册到 Triton 仓库失败")
+
+    except Exception as triton_e:
+        logger.warning(f"[TRITON] {fmt} 模型 Triton 集成失败: {triton_e}")
+
+
 
 def export_model(model_path,
                  output_dir,
@@ -25,6 +291,10 @@ def export_model(model_path,
     """
     使用 Ultralytics YOLO 将 .pt 模型导出为多种部署格式。
 
+    格式按 plan_exports 分组为互不依赖的流水线：只有一条流水线时在当前进程中使用缓存的模型导出；
+    多条时各流水线在独立子进程中并行导出（至多 YOLO_TVP_EXPORT_MAX_PARALLEL 个），
+    总耗时接近最慢的一条。每个格式的耗时写入 export_history.json 中 task_id 对应的记录。
+
     参数:
     - model_path: 源权重 .pt 文件路径
     - output_dir: 导出输出根目录（将保存到 output_dir/export/ 下）
@@ -69,94 +339,42 @@ def export_model(model_path,
     if enable_triton and triton_repo_path:
         logger.info(f"[INFO] Triton 集成已启用，仓库路径: {triton_repo_path}")
 
-    model = YOLO(model_path)
+    lanes = plan_exports(formats)
+    max_parallel = get_export_max_parallel()
+    export_kwargs = {"imgsz": imgsz, "device": device, "half": half, "simplify": simplify, "opset": opset}
+    logger.info(f"[INFO] 导出流水线: {lanes}")
+
+    start = time.perf_counter()
+    if len(lanes) > 1 and max_parallel > 1:
+        logger.info(f"[INFO] {len(lanes)} 条流水线并行导出（最多 {max_parallel} 个进程）")
+        records = _run_lanes_parallel(model_path, lanes, export_dir, export_kwargs, max_parallel, logger)
+    else:
+        model = load_model(model_path, device)
+        logger.info(f"[CACHE] 模型缓存: {get_model_cache().stats()}")
+        records = []
+        for lane in lanes:
+            records.extend(_run_lane(model, lane, export_dir, export_kwargs, logger))
+    wall = round(time.perf_counter() - start, 2)
 
-    # 针对每个格式分别调用 export，输出统一到 output_dir/export 下
-    for fmt in formats:
+    # 按请求顺序输出每个格式的结果
+    order = {fmt: i for i, fmt in enumerate(formats)}
+    records.sort(key=lambda r: order.get(r["format"], len(order)))
+    for record in records:
+        reused = f"（复用 {record['reused']}）" if record.get("reused") else ""
+        logger.info(f"[EXPORT] {record['format']}: {record['status']} {record['seconds']}s{reused} {record['path'] or record.get('error', '')}")
+    serial = round(sum(r["seconds"] or 0 for r in records), 2)
+    logger.info(f"[EXPORT] 总耗时 {wall}s（各格式耗时合计 {serial}s）")
+
+    # Triton 模型仓库集成
+    if enable_triton and triton_repo_path:
+        for record in records:
+            if record["status"] == "ok":
+                _register_triton(record, model_path, imgsz, triton_repo_path, triton_model_name, logger)
+
+    if task_id:
         try:
-            logger.info(f"[EXPORT] 正在导出格式: {fmt}")
-            # Ultralytics export 参数说明:
-            #   format: onnx/openvino/torchscript/engine/xml/pb/coreml/…
-            #   imgsz: 输入尺寸
-            #   device: 导出设备
-            #   half: 半精度
-            #   simplify: 简化（ONNX）
-            #   opset: ONNX opset 版本
-            #   project/name: 输出路径控制
-            ret = model.export(
-                format=fmt,
-                imgsz=imgsz,
-                device=device,
-                half=half,
-                simplify=simplify,
-                opset=opset,
-                project=output_dir,
-                name="export",
-                exist_ok=True,
-            )
-            # 确保产物最终位于 export_dir 下
-            try:
-                ret_path = Path(str(ret)).resolve() if ret else None
-                export_base = Path(export_dir).resolve()
-                if ret_path and ret_path.exists():
-                    # 如果不在 export 目录下，则移动过去
-                    if export_base not in ret_path.parents and export_base != ret_path:
-                        target = export_base / ret_path.name
-                        try:
-                            if target.exists():
-                                if target.is_file():
-                                    target.unlink()
-                                else:
-                                    shutil.rmtree(target)
-                        except Exception:
-                            pass
-                        shutil.move(str(ret_path), str(target))
-                        logger.info(f"[EXPORT] {fmt} 产物已移动到: {target}")
-                        ret_path = target.resolve()
-                        # 处理伴随文件（如 OpenVINO .bin）
-                        try:
-                            if ret_path.suffix.lower() == ".xml":
-                                src_bin = Path(str(ret)).with_suffix(".bin")
-                                if src_bin.exists():
-                                    dst_bin = export_base / src_bin.name
-                                    if dst_bin.exists():
-                                        dst_bin.unlink()
-                                    shutil.move(str(src_bin), str(dst_bin))
-                                    logger.info(f"[EXPORT] 附属文件已移动到: {dst_bin}")
-                        except Exception:
-                            pass
-                logger.info(f"[EXPORT] 导出完成: {fmt} -> {ret_path}")
-            except Exception as move_e:
-                logger.warning(f"[EXPORT] 产物位置调整失败（忽略）: {move_e}")
-            
-            # Triton 模型仓库集成
-            if enable_triton and triton_repo_path and ret_path and ret_path.exists():
-                try:
-                    # 生成模型名称
-                    if not triton_model_name:
-                        base_name = Path(model_path).stem  # 去掉 .pt 扩展名
-                        triton_model_name_final = f"{base_name}_{fmt}"
-                    else:
-                        triton_model_name_final = f"{triton_model_name}_{fmt}"
-                    
-                    success = register_model_to_triton(
-                        model_path=str(ret_path),
-                        triton_repo_path=triton_repo_path,
-                        model_name=triton_model_name_final,
-                        model_format=fmt,
-                        input_shape=[1, 3, imgsz, imgsz],
-                        logger=logger
-                    )
-                    
-                    if success:
-                        logger.info(f"[TRITON] {fmt} 模型已成功注册到 Triton 仓库: {triton_model_name_final}")
-                    else:
-                        logger.warning(f"[TRITON] {fmt} 模型注册到 Triton 仓库失败")
-                        
-                except Exception as triton_e:
-                    logger.warning(f"[TRITON] {fmt} 模型 Triton 集成失败: {triton_e}")
-                    
+            update_export_history(output_dir, task_id, {"format_results": records, "wall_s": wall, "serial_s": serial})
         except Exception as e:
-            logger.exception(f"[EXPORT] 导出 {fmt} 失败: {e}")
+            logger.warning(f"[EXPORT] 写入导出历史失败（忽略）: {e}")
 
     logger.info(f"[INFO] 模型导出流程结束，产物目录: {export_dir}")
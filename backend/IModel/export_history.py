@@ -0,0 +1,79 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:     # Windows 下只做进程内加锁
+    fcntl = None
+
+_history_lock = threading.Lock()
+
+def export_history_file(output_dir):
+    return os.path.join(output_dir, "export", "export_history.json")
+
+def read_export_history(output_dir):
+    """
+    读取 output_dir/export/export_history.json，文件不存在或损坏时返回空列表
+    """
+    history_file = export_history_file(output_dir)
+    try:
+        if os.path.exists(history_file):
+            with open(history_file, 'r', encoding='utf-8') as hf:
+                data = json.load(hf) or []
+                return data if isinstance(data, list) else []
+    except Exception:
+        pass
+    return []
+
+@contextmanager
+def _locked(history_file):
+    with _history_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(history_file + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def modify_export_history(output_dir, modify):
+    """
+    加锁读取导出历史，交给 modify(history) 原地修改后原子写回
+
+    API 进程（新增 / 删除记录）与基准测试工作进程（回写结果）会同时修改该文件，
+    统一经过这里避免互相覆盖
+    """
+    history_file = export_history_file(output_dir)
+    os.makedirs(os.path.dirname(history_file), exist_ok=True)
+    with _locked(history_file):
+        history = read_export_history(output_dir)
+        modify(history)
+        tmp_file = f"{history_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as hf:
+            json.dump(history, hf, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, history_file)
+        return history
+
+def append_export_history(output_dir, entry):
+    return modify_export_history(output_dir, lambda history: history.append(entry))
+
+def update_export_history(output_dir, export_key, fields):
+    """
+    更新 exportKey 对应的记录（不存在时追加）
+    """
+    def modify(history):
+        for entry in history:
+            if entry.get("exportKey") == export_key:
+                entry.update(fields)
+                return
+        history.append({"exportKey": export_key, **fields})
+    return modify_export_history(output_dir, modify)
+
+def remove_export_history(output_dir, export_key):
+    def modify(history):
+        history[:] = [h for h in history if h.get("exportKey") != export_key]
+    return modify_export_history(output_dir, modify)
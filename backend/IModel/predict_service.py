@@ -0,0 +1,194 @@
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from model_cache import get_model_cache
+from config import get_predict_max_batch, get_predict_max_wait_ms, get_predict_max_batchers
+
+# 二进制结果每行的字段（float32 小端）
+BINARY_LAYOUT = ("image", "x1", "y1", "x2", "y2", "score", "class")
+
+def decode_image(data):
+    """
+    把图片字节解码为 BGR ndarray（与 Ultralytics 读取图片文件的格式一致），失败返回 None
+    """
+    import cv2
+    import numpy as np
+
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def result_to_dict(result):
+    """
+    单张图片的预测结果转为紧凑的 JSON 结构（坐标为原图像素 xyxy）
+    """
+    h, w = result.orig_shape[:2]
+    data = {
+        "shape": [int(h), int(w)],
+        "speed_ms": {k: round(float(v), 3) for k, v in (result.speed or {}).items() if v is not None},
+    }
+    if result.boxes is not None:
+        data["boxes"] = [[round(v, 1) for v in box] for box in result.boxes.xyxy.cpu().tolist()]
+        data["scores"] = [round(v, 4) for v in result.boxes.conf.cpu().tolist()]
+        data["classes"] = [int(v) for v in result.boxes.cls.cpu().tolist()]
+    if getattr(result, "probs", None) is not None:
+        data["top5"] = [int(i) for i in result.probs.top5]
+        data["top5_scores"] = [round(float(v), 4) for v in result.probs.top5conf.cpu().tolist()]
+    return data
+
+def results_to_binary(results):
+    """
+    多张图片的检测结果拼接为 float32 数组字节，每行为 BINARY_LAYOUT
+    """
+    import numpy as np
+
+    rows = []
+    for index, result in enumerate(results):
+        if result.boxes is None or len(result.boxes) == 0:
+            continue
+        boxes = result.boxes
+        block = np.empty((len(boxes), len(BINARY_LAYOUT)), dtype="<f4")
+        block[:, 0] = index
+        block[:, 1:5] = boxes.xyxy.cpu().numpy()
+        block[:, 5] = boxes.conf.cpu().numpy()
+        block[:, 6] = boxes.cls.cpu().numpy()
+        rows.append(block)
+    if not rows:
+        return b""
+    return np.concatenate(rows).tobytes()
+
+class PredictBatcher:
+    """
+    同一权重与设备的预测请求合批
+
+    请求线程把图片放入队列后等待结果；后台线程取到第一张图片后最多再等待 max_wait_ms
+    收集并发到达的请求（至多 max_batch 张），按推理参数分组后一次调用 predict，
+    以较小的延迟代价提高 CPU 推理吞吐。
+    """
+    _CLOSE = object()
+
+    def __init__(self, model_path, device, max_batch=8, max_wait_ms=5):
+        self.model_path = model_path
+        self.device = device
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.images = 0
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, images, params):
+        """
+        提交一组图片，返回与 images 一一对应的 Future 列表，结果为 Ultralytics Results
+        """
+        futures = []
+        for image in images:
+            future = Future()
+            self._queue.put((image, params, future))
+            futures.append(future)
+        return futures
+
+    def close(self):
+        """
+        已提交的图片处理完后结束后台线程
+        """
+        self._queue.put(self._CLOSE)
+
+    def _collect(self):
+        """
+        收集一批图片，第二个返回值表示是否收到了关闭信号
+        """
+        item = self._queue.get()
+        if item is self._CLOSE:
+            return [], True
+        items = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is self._CLOSE:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def _loop(self):
+        closed = False
+        while not closed:
+            items, closed = self._collect()
+            groups = {}
+            for item in items:
+                groups.setdefault(item[1], []).append(item)
+            for params, group in groups.items():
+                try:
+                    model = get_model_cache().get(self.model_path, self.device, reset_state=False)
+                    conf, iou, imgsz = params
+                    results = model.predict(
+                        source=[image for image, _, _ in group],
+                        conf=conf,
+                        iou=iou,
+                        imgsz=imgsz,
+                        device=self.device,
+                        save=False,
+                        verbose=False,
+                    )
+                    self.batches += 1
+                    self.images += len(group)
+                    for (_, _, future), result in zip(group, results):
+                        future.set_result(result)
+                except Exception as e:
+                    for _, _, future in group:
+                        if not future.done():
+                            future.set_exception(e)
+
+_batchers = OrderedDict()
+_batchers_lock = threading.Lock()
+
+def _get_batcher(model_path, device):
+    """
+    获取（或创建）指定权重与设备的合批器，调用方需持有 _batchers_lock
+
+    超出 YOLO_TVP_PREDICT_MAX_BATCHERS 时关闭最久未使用的合批器
+    """
+    key = (os.path.abspath(model_path), str(device))
+    batcher = _batchers.get(key)
+    if batcher is None:
+        batcher = PredictBatcher(key[0], device, get_predict_max_batch(), get_predict_max_wait_ms())
+        _batchers[key] = batcher
+        while len(_batchers) > get_predict_max_batchers():
+            _, evicted = _batchers.popitem(last=False)
+            evicted.close()
+    else:
+        _batchers.move_to_end(key)
+    return batcher
+
+def predict_images(model_path, images, device="cpu", conf=0.25, iou=0.7, imgsz=640, timeout=None):
+    """
+    同步预测：提交到合批器并等待结果，返回 Results 列表
+    """
+    # 在锁内提交，保证被淘汰的合批器关闭前已收到这批图片
+    with _batchers_lock:
+        futures = _get_batcher(model_path, device).submit(images, (float(conf), float(iou), int(imgsz)))
+    return [future.result(timeout=timeout) for future in futures]
+
+def batcher_stats():
+    """
+    各合批器的批次数与平均 batch 大小
+    """
+    with _batchers_lock:
+        items = list(_batchers.items())
+    return [
+        {
+            "model_path": path,
+            "device": device,
+            "batches": batcher.batches,
+            "images": batcher.images,
+            "avg_batch": round(batcher.images / batcher.batches, 2) if batcher.batches else None,
+        }
+        for (path, device), batcher in items
+    ]
@@ -1,8 +1,19 @@
-from flask import request, Blueprint, send_file
+from flask import request, Blueprint, send_file, Response
 from tools.format_output import format_output
+from tools.sse import sse_task_log_response
 from config import get_test_result_files_path, get_tasks_path, get_validation_result_files_path
-from run_in_thread import run_modeltest_in_thread, run_modelval_in_thread, run_modelexport_in_thread
+from run_in_thread import run_modeltest_in_thread, run_modelval_in_thread, run_modelexport_in_thread, run_benchmark_in_thread, register_restore_handler, register_finish_handler, get_executor
+from model_cache import get_model_cache
+from IModel.predict_service import decode_image, predict_images, result_to_dict, results_to_binary, batcher_stats, BINARY_LAYOUT
+from config import get_predict_device, get_predict_devices, get_predict_max_images, get_benchmark_warmup, get_benchmark_iterations, get_benchmark_max_iterations, get_test_stream_max_frames
+from metadata_store import get_metadata_store, register_collection, load_yaml_file, match_result_file
+from tools.result_log import result_log_path, strip_embedded_log, get_result_log, remove_result_log
+from tools.image_cache import parse_thumbnail_args, send_image
+from tools.request_args import parse_priority
+from IModel.batch_source import is_batch_input, check_batch_input, is_video_input, is_stream_source
 from IModel.validate import _to_plain_python
+from IModel.export_history import read_export_history, append_export_history, remove_export_history, modify_export_history
+from IModel.benchmark import discover_artifacts, compare_results
 import os
 import time
 import yaml
@@ -22,19 +33,107 @@ VAL_THREADS = {}
 VAL_LIST = []
 EXPORT_THREADS = {}
 
+def restore_test_job(job, handle, log_buffer):
+    """
+    服务重启后恢复排队中的测试任务
+    """
+    TEST_THREADS[job["job_key"]] = {
+        "thread": handle,
+        "log": log_buffer,
+    }
+
+def restore_val_job(job, handle, log_buffer):
+    """
+    服务重启后恢复排队中的验证任务
+    """
+    VAL_THREADS[job["job_key"]] = {
+        "thread": handle,
+        "log": log_buffer,
+    }
+
+def restore_export_job(job, handle, log_buffer):
+    """
+    服务重启后恢复排队中的导出任务
+    """
+    EXPORT_THREADS[job["job_key"]] = {
+        "thread": handle,
+        "log": log_buffer,
+        **job["meta"],
+    }
+
+register_restore_handler("test", restore_test_job)
+register_restore_handler("validation", restore_val_job)
+register_restore_handler("export", restore_export_job)
+register_restore_handler("benchmark", restore_export_job)
+
+def finish_benchmark_job(job, status):
+    """
+    基准测试任务结束后补写最终状态：任务被取消、工作进程被终止或服务重启时，任务自身来不及写入，
+    记录会一直停留在 queued / running
+    """
+    output_dir = job["meta"].get("output_dir")
+    if not output_dir:
+        return
+
+    def modify(history):
+        for entry in history:
+            if entry.get("exportKey") == job["job_key"] and entry.get("status") in ("queued", "running"):
+                # 进程正常退出却没有写入结果同样视为失败
+                entry["status"] = "failed" if status == "done" else status
+                entry["finishedAt"] = int(time.time())
+
+    modify_export_history(output_dir, modify)
+
+register_finish_handler("benchmark", finish_benchmark_job)
+
+def load_val_result_file(file_path):
+    """
+    读取验证结果文件并转换为纯 Python 类型
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    try:
+        data = yaml.safe_load(content)
+    except Exception:
+        # 兼容历史文件中包含的 numpy 等 Python 特殊标签
+        data = yaml.unsafe_load(content)
+
+    # 兼容空/非字典数据
+    if data is None:
+        return {}
+    data = _to_plain_python(data)
+    if not isinstance(data, dict):
+        data = {"data": data}
+    return data
+
+register_collection(
+    "test_result",
+    get_test_result_files_path,
+    match_result_file,
+    lambda file_path: strip_embedded_log(load_yaml_file(file_path)),
+)
+register_collection(
+    "val_result",
+    get_validation_result_files_path,
+    match_result_file,
+    lambda file_path: strip_embedded_log(load_val_result_file(file_path)),
+)
+
 def get_test_result_file(task_id):
     """
-    获取模型测试任务结果数据文件
+    获取模型测试任务结果数据 [(文件路径, 内容)]
     """
-    matched_files = []
-    pattern = re.compile(rf"^{re.escape(task_id)}_\d+\.yaml$")
+    try:
+        return get_metadata_store().query("test_result", task_id), False
+    except Exception as e:
+        return -1, e
 
+def get_val_result_file(task_id):
+    """
+    获取模型验证任务结果数据 [(文件路径, 内容)]
+    """
     try:
-        directory = get_test_result_files_path()
-        for filename in os.listdir(directory):
-            if pattern.match(filename):
-                matched_files.append(os.path.join(directory, filename))
-        return matched_files, False
+        return get_metadata_store().query("val_result", task_id), False
     except Exception as e:
         return -1, e
 
@@ -82,17 +181,48 @@ def load_val_list():
 def run_model_test():
     """
     启动模型测试任务
+    Body: inputType 为 "batch"（或 inputPath 为目录 / 通配符 / zip）时进入批量测试，batchSize 可选；
+          inputType 为 "video"（或 inputPath 为视频文件 / 流地址 / 摄像头编号）时进入视频测试，batchSize、maxFrames 可选；
+          视频流 / 摄像头未指定 maxFrames 时使用 YOLO_TVP_TEST_STREAM_MAX_FRAMES
     """
     data = request.json
     task_id = data.get("taskID")
     task_name = data.get("taskName")
     output_dir = data.get("outputDir")
-    input_type = data.get("inputType", "image") # image 或 video
+    input_type = data.get("inputType", "image") # image、video 或 batch
     input_path = data.get("inputPath")
     model_choice = data.get("modelType", "best")
+    priority = parse_priority(data.get("priority"))
+    batch_size = data.get("batchSize")
+    max_frames = data.get("maxFrames")
 
     if not task_id or not task_name or not output_dir or not input_path:
         return format_output(code=400, msg="缺少必要的参数(step:1)")
+    if priority is None:
+        return format_output(code=400, msg="参数非法: priority")
+
+    if input_type == "video" or is_video_input(input_path):
+        input_type = "video"
+        if not is_stream_source(input_path) and not os.path.isfile(input_path):
+            return format_output(code=400, msg=f"视频文件不存在: {input_path}")
+    elif input_type == "batch" or is_batch_input(input_path):
+        input_type = "batch"
+        error = check_batch_input(input_path)
+        if error:
+            return format_output(code=400, msg=error)
+    else:
+        input_type = "image"
+
+    try:
+        batch_size = int(batch_size) if batch_size not in (None, "") else None
+        max_frames = int(max_frames) if max_frames not in (None, "") else None
+    except (TypeError, ValueError):
+        return format_output(code=400, msg="batchSize / maxFrames 必须为整数")
+    if (batch_size is not None and batch_size < 1) or (max_frames is not None and max_frames < 1):
+        return format_output(code=400, msg="batchSize / maxFrames 必须大于 0")
+    if input_type == "video" and max_frames is None and is_stream_source(input_path):
+        # 视频流没有结尾，不设上限时任务永远不会结束
+        max_frames = get_test_stream_max_frames()
     
     timestamp = int(time.time())
 
@@ -102,15 +232,20 @@ def run_model_test():
     test_output_dir = os.path.join(base_output_dir, "test", f"test_{task_id}_{timestamp}_{model_choice}")
     os.makedirs(test_output_dir, exist_ok=True)
     
-    try:
-        input_filename = os.path.basename(input_path)
-        
-        input_file_target_path = os.path.join(test_output_dir, "t")
-        os.makedirs(input_file_target_path, exist_ok=True)
-        
-        shutil.copy(input_path, os.path.join(input_file_target_path, input_filename))
-    except Exception as e:
-        return format_output(code=500, msg=f"获取测试文件时失败: {str(e)}")
+    if input_type in ("batch", "video"):
+        # 批量与视频输入不复制，由工作进程直接读取（zip 在工作进程中解压到 t 目录）
+        test_input_path = input_path
+    else:
+        try:
+            input_filename = os.path.basename(input_path)
+
+            input_file_target_path = os.path.join(test_output_dir, "t")
+            os.makedirs(input_file_target_path, exist_ok=True)
+
+            shutil.copy(input_path, os.path.join(input_file_target_path, input_filename))
+            test_input_path = os.path.join(input_file_target_path, input_filename)
+        except Exception as e:
+            return format_output(code=500, msg=f"获取测试文件时失败: {str(e)}")
 
     weight_file = f"{model_choice}.pt"
     weight_path = ""
@@ -131,17 +266,23 @@ def run_model_test():
         result_info = {
             "model_path": weight_path,
             "input_type": input_type,
-            "input_path": os.path.join(input_file_target_path, input_filename),
+            "input_path": test_input_path,
             "output_dir": test_output_dir,
             "startedAt": timestamp,
             "completedAt": None,
-            "log": None
+            "logFile": result_log_path(test_result_file_path)
         }
+        if input_type in ("batch", "video"):
+            result_info["batch_size"] = batch_size
+        if input_type == "video" and max_frames:
+            result_info["max_frames"] = max_frames
         
         with open(test_result_file_path, "w", encoding="utf-8") as f:
             yaml.dump(result_info, f, allow_unicode=True)
+        get_metadata_store().upsert("test_result", test_result_file_path)
             
-        thread, log_stream = run_modeltest_in_thread(task_id, weight_path, os.path.join(input_file_target_path, input_filename), test_output_dir, test_result_file_path, "image")
+        thread, log_stream = run_modeltest_in_thread(task_id, weight_path, test_input_path, test_output_dir, test_result_file_path,
+                                                     input_type, priority=priority, batch_size=batch_size, max_frames=max_frames)
         
         # 保存
         TEST_THREADS[test_result_file_path] = {
@@ -158,7 +299,7 @@ def run_model_test():
         print("启动测试任务失败:", e)
         return format_output(code=500, msg=f"启动测试任务失败: {str(e)}")
 
-    return format_output(msg=f"任务 {task_id} 已启动", data={"output_dir": test_output_dir, "filename": test_result_file_path})
+    return format_output(msg=f"任务 {task_id} 已启动", data={"output_dir": test_output_dir, "filename": test_result_file_path, "jobID": thread.job_id})
 
 @IModel_bp.route("/getAllTest", methods=['GET'])
 def get_all_test():
@@ -175,15 +316,13 @@ def get_all_test():
     if e:
         return format_output(code=500, msg=f"获取文件数据时失败: {e}")
     
-    for item in matched_files:
-        with open(item, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f.read())
-            data["__testResultFilePath"] = item
+    for item, data in matched_files:
+        data["__testResultFilePath"] = item
         
         try:
             result_dir = os.path.join(data["output_dir"], "result")
             data["result_file_path"] = None
-            if os.path.isdir(result_dir):
+            if os.path.isdir(result_dir) and data.get("input_type") not in ("batch", "video"):
                 input_filename = os.path.basename(data["input_path"])
                 result_file_path = os.path.join(result_dir, input_filename)
 
@@ -213,6 +352,166 @@ def get_all_test():
         "test": r_data
     })
 
+def result_log_response(records, task_id, load):
+    """
+    按 resultFilePath 在结果记录中查找并读取日志
+    Query: resultFilePath, since（可选，起始行号，默认 0）, limit（可选，最多返回的行数）
+    """
+    result_file_path = request.args.get("resultFilePath")
+    since = request.args.get("since", 0, type=int)
+    limit = request.args.get("limit", None, type=int)
+    if not result_file_path:
+        return format_output(code=400, msg="缺少必要参数 resultFilePath")
+
+    data = dict(records).get(os.path.abspath(result_file_path))
+    if data is None:
+        return format_output(code=404, msg=f"未找到任务ID为 {task_id} 的结果文件")
+
+    try:
+        lines, next_line, eof = get_result_log(result_file_path, data, since, limit, load=load)
+    except Exception as e:
+        return format_output(code=500, msg=f"读取日志失败: {str(e)}")
+
+    return format_output(data={
+        "log": lines,
+        "next": next_line,
+        "eof": eof
+    })
+
+@IModel_bp.route("/getTestResultLog", methods=['GET'])
+def get_test_result_log():
+    """
+    获取一次测试的日志
+    Query: taskID, resultFilePath, since, limit
+    """
+    task_id = request.args.get("taskID")
+    if not task_id:
+        return format_output(code=400, msg="缺少必要的参数(step:1)")
+
+    matched_files, e = get_test_result_file(task_id)
+    if e:
+        return format_output(code=500, msg=f"获取文件数据时失败: {e}")
+    return result_log_response(matched_files, task_id, load_yaml_file)
+
+@IModel_bp.route("/getValResultLog", methods=['GET'])
+def get_val_result_log():
+    """
+    获取一次验证的日志
+    Query: taskID, resultFilePath, since, limit
+    """
+    task_id = request.args.get("taskID")
+    if not task_id:
+        return format_output(code=400, msg="缺少必要的参数(step:1)")
+
+    matched_files, e = get_val_result_file(task_id)
+    if e:
+        return format_output(code=500, msg=f"获取文件数据时失败: {e}")
+    return result_log_response(matched_files, task_id, load_val_result_file)
+
+@IModel_bp.route("/getModelCacheStats", methods=['GET'])
+def get_model_cache_stats():
+    """
+    获取模型缓存统计：常驻工作进程（测试 / 验证 / 导出）的汇总命中率、API 进程自身的模型缓存与同步预测合批情况
+    """
+    try:
+        return format_output(data={
+            "workers": get_executor().warm_stats(),
+            "api": get_model_cache().stats(),
+            "predict_batchers": batcher_stats(),
+        })
+    except Exception as e:
+        return format_output(code=500, msg=f"获取模型缓存统计失败: {str(e)}")
+
+def resolve_trained_weights(task_id, model_choice="best", folder=None):
+    """
+    定位训练任务的权重文件 tasks/training/task_{taskID}_{ts}/result/weights/{best|last}.pt，
+    未指定 folder 时使用该任务最近一次训练
+    """
+    training_dir = os.path.join(get_tasks_path(), "training")
+    if folder:
+        folders = [folder] if re.fullmatch(rf"task_{re.escape(str(task_id))}_\d+", folder) else []
+    else:
+        try:
+            folders = [f for f in os.listdir(training_dir) if re.fullmatch(rf"task_{re.escape(str(task_id))}_\d+", f)]
+        except FileNotFoundError:
+            folders = []
+        folders.sort(key=lambda f: int(f.rsplit("_", 1)[1]), reverse=True)
+
+    for f in folders:
+        weight_path = os.path.join(training_dir, f, "result", "weights", f"{model_choice}.pt")
+        if os.path.isfile(weight_path):
+            return weight_path
+    return None
+
+@IModel_bp.route("/predict", methods=['POST'])
+def predict():
+    """
+    同步预测：使用训练任务的权重对上传的图片推理，单次往返返回检测结果
+    Query: taskID, modelType（best / last，默认 best）, folder（可选，指定某次训练 task_{id}_{ts}）,
+           conf, iou, imgsz, device（默认 YOLO_TVP_PREDICT_DEVICE，只允许 YOLO_TVP_PREDICT_DEVICES 中的设备）, format（json / binary，默认 json）
+    Body: multipart/form-data 的 file（可多个），或直接以图片字节作为请求体
+    并发到达的请求会被合批推理；binary 格式返回 float32 数组，每行为 image, x1, y1, x2, y2, score, class
+    """
+    task_id = request.args.get("taskID")
+    model_choice = request.args.get("modelType", "best")
+    output_format = request.args.get("format", "json")
+    if not task_id:
+        return format_output(code=400, msg="缺少必要参数(step:1)")
+    if model_choice not in ("best", "last"):
+        return format_output(code=400, msg="modelType 仅支持 best / last")
+    if output_format not in ("json", "binary"):
+        return format_output(code=400, msg="format 仅支持 json / binary")
+    # type= 转换失败时返回 None 而不是抛出异常
+    invalid = [name for name, cast in (("conf", float), ("iou", float), ("imgsz", int))
+               if name in request.args and request.args.get(name, None, type=cast) is None]
+    if invalid:
+        return format_output(code=400, msg=f"参数无效: {', '.join(invalid)}")
+    conf = request.args.get("conf", 0.25, type=float)
+    iou = request.args.get("iou", 0.7, type=float)
+    imgsz = request.args.get("imgsz", 640, type=int)
+    device = request.args.get("device") or get_predict_device()
+    if device not in get_predict_devices():
+        return format_output(code=400, msg=f"device 仅支持: {', '.join(get_predict_devices())}")
+
+    weight_path = resolve_trained_weights(task_id, model_choice, request.args.get("folder"))
+    if weight_path is None:
+        return format_output(code=404, msg=f"模型权重文件未找到: {model_choice}.pt")
+
+    files = request.files.getlist("file") or request.files.getlist("files")
+    payloads = [f.read() for f in files] if files else [request.get_data()]
+    if not payloads or not payloads[0]:
+        return format_output(code=400, msg="未上传图片")
+    if len(payloads) > get_predict_max_images():
+        return format_output(code=400, msg=f"单次请求最多 {get_predict_max_images()} 张图片")
+
+    images = []
+    for index, payload in enumerate(payloads):
+        image = decode_image(payload)
+        if image is None:
+            return format_output(code=400, msg=f"第 {index + 1} 张图片无法解码")
+        images.append(image)
+
+    start = time.perf_counter()
+    try:
+        results = predict_images(weight_path, images, device=device, conf=conf, iou=iou, imgsz=imgsz, timeout=120)
+    except Exception as e:
+        return format_output(code=500, msg=f"预测失败: {str(e)}")
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    if output_format == "binary":
+        response = Response(results_to_binary(results), mimetype="application/octet-stream")
+        response.headers["X-Result-Layout"] = ",".join(BINARY_LAYOUT)
+        response.headers["X-Result-Dtype"] = "float32-le"
+        response.headers["X-Elapsed-Ms"] = str(elapsed_ms)
+        return response
+
+    return format_output(data={
+        "model": os.path.relpath(weight_path, get_tasks_path()),
+        "names": results[0].names if results else {},
+        "elapsed_ms": elapsed_ms,
+        "results": [result_to_dict(result) for result in results],
+    })
+
 @IModel_bp.route("/uploadTestInput", methods=['POST'])
 def upload_test_input():
     """
@@ -252,9 +551,12 @@ def run_model_validation():
     output_dir = data.get("outputDir")
     dataset_yaml_path = data.get("datasetYamlPath")
     model_choice = data.get("modelType", "best")
+    priority = parse_priority(data.get("priority"))
 
     if not task_id or not task_name or not output_dir or not dataset_yaml_path:
         return format_output(code=400, msg="缺少必要的参数(step:1)")
+    if priority is None:
+        return format_output(code=400, msg="参数非法: priority")
 
     timestamp = int(time.time())
 
@@ -285,12 +587,13 @@ def run_model_validation():
             "output_dir": val_output_dir,
             "startedAt": timestamp,
             "completedAt": None,
-            "log": None
+            "logFile": result_log_path(result_file_path)
         }
         with open(result_file_path, "w", encoding="utf-8") as f:
             yaml.dump(result_info, f, allow_unicode=True)
+        get_metadata_store().upsert("val_result", result_file_path)
 
-        thread, log_stream = run_modelval_in_thread(task_id, weight_path, dataset_yaml_path, val_output_dir, result_file_path)
+        thread, log_stream = run_modelval_in_thread(task_id, weight_path, dataset_yaml_path, val_output_dir, result_file_path, priority=priority)
 
         VAL_THREADS[result_file_path] = {
             "thread": thread,
@@ -306,7 +609,7 @@ def run_model_validation():
         print("启动验证任务失败:", e)
         return format_output(code=500, msg=f"启动验证任务失败: {str(e)}")
 
-    return format_output(msg=f"任务 {task_id} 验证已启动", data={"output_dir": val_output_dir, "filename": result_file_path})
+    return format_output(msg=f"任务 {task_id} 验证已启动", data={"output_dir": val_output_dir, "filename": result_file_path, "jobID": thread.job_id})
 
 @IModel_bp.route("/getAllValidation", methods=['GET'])
 def get_all_validation():
@@ -318,34 +621,12 @@ def get_all_validation():
     if not task_id:
         return format_output(code=400, msg="缺少必要的参数(step:1)")
 
-    # 匹配结果文件
-    matched_files = []
-    pattern = re.compile(rf"^{re.escape(task_id)}_\d+\.yaml$")
-    try:
-        directory = get_validation_result_files_path()
-        for filename in os.listdir(directory):
-            if pattern.match(filename):
-                matched_files.append(os.path.join(directory, filename))
-    except Exception as e:
+    # 匹配结果文件（索引中已是转换为纯 Python 类型的字典）
+    matched_files, e = get_val_result_file(task_id)
+    if e:
         return format_output(code=500, msg=f"获取文件数据时失败: {e}")
 
-    for item in matched_files:
-        # 1) 读取并解析 YAML
-        with open(item, 'r', encoding='utf-8') as f:
-            content = f.read()
-        try:
-            parsed = yaml.safe_load(content)
-        except Exception:
-            # 兼容历史文件中包含的 numpy 等 Python 特殊标签
-            parsed = yaml.unsafe_load(content)
-
-        # 2) 转换为纯 Python 类型
-        parsed = _to_plain_python(parsed)
-
-        # 3) 确保为字典，若不是则包一层，避免后续赋值时报错
-        if not isinstance(parsed, dict):
-            parsed = {"data": parsed}
-
+    for item, parsed in matched_files:
         # 基本字段
         parsed["__valResultFilePath"] = item
         parsed["task_id"] = task_id
@@ -398,6 +679,16 @@ def get_all_validation():
         "validation": r_data
     })
 
+def find_output_weight(output_dir, model_choice="best"):
+    """
+    在训练结果目录下递归查找 {model_choice}.pt，未找到时返回空字符串
+    """
+    weight_file = f"{model_choice}.pt"
+    for root, dirs, files in os.walk(output_dir):
+        if weight_file in files:
+            return os.path.join(root, weight_file)
+    return ""
+
 @IModel_bp.route("/runModelExport", methods=['POST'])
 def run_model_export():
     """
@@ -418,9 +709,12 @@ def run_model_export():
     simplify = bool(data.get("simplify", False))
     opset = data.get("opset", None)
     device = data.get("device", "cpu")
+    priority = parse_priority(data.get("priority"))
 
     if not task_id or not task_name or not output_dir:
         return format_output(code=400, msg="缺少必要的参数(step:1)")
+    if priority is None:
+        return format_output(code=400, msg="参数非法: priority")
 
     timestamp = int(time.time())
 
@@ -429,12 +723,7 @@ def run_model_export():
     base_output_dir = norm_output_dir
 
     # 定位权重文件
-    weight_file = f"{model_choice}.pt"
-    weight_path = ""
-    for root, dirs, files in os.walk(base_output_dir):
-        if weight_file in files:
-            weight_path = os.path.join(root, weight_file)
-            break
+    weight_path = find_output_weight(base_output_dir, model_choice)
 
     if not os.path.exists(weight_path):
         return format_output(code=404, msg=f"模型权重文件未找到: {model_choice}.pt, {weight_path}")
@@ -446,26 +735,8 @@ def run_model_export():
         triton_repo_path = data.get("tritonRepoPath")
         triton_model_name = data.get("tritonModelName")
         enable_triton = bool(data.get("enableTriton", False))
-        
-        thread, log_stream = run_modelexport_in_thread(
-            task_id=export_key,
-            model_path=weight_path,
-            output_dir=base_output_dir,
-            result_file_path=None,
-            formats=formats,
-            imgsz=imgsz,
-            half=half,
-            simplify=simplify,
-            opset=opset,
-            device=device,
-            triton_repo_path=triton_repo_path,
-            triton_model_name=triton_model_name,
-            enable_triton=enable_triton,
-        )
 
-        EXPORT_THREADS[export_key] = {
-            "thread": thread,
-            "log": log_stream,
+        export_meta = {
             "task_id": task_id,
             "task_name": task_name,
             "output_dir": base_output_dir,
@@ -478,12 +749,9 @@ def run_model_export():
             "enable_triton": enable_triton,
         }
 
-        # 写入导出历史记录到 output_dir/export/export_history.json
+        # 写入导出历史记录到 output_dir/export/export_history.json（先于提交任务，导出结束时会回写各格式的耗时）
         try:
-            export_dir = os.path.join(base_output_dir, "export")
-            os.makedirs(export_dir, exist_ok=True)
-            history_file = os.path.join(export_dir, "export_history.json")
-            entry = {
+            append_export_history(base_output_dir, {
                 "exportKey": export_key,
                 "task_id": task_id,
                 "task_name": task_name,
@@ -495,23 +763,38 @@ def run_model_export():
                 "triton_repo_path": triton_repo_path,
                 "triton_model_name": triton_model_name,
                 "enable_triton": enable_triton,
-            }
-            history = []
-            try:
-                if os.path.exists(history_file):
-                    with open(history_file, 'r', encoding='utf-8') as hf:
-                        history = json.load(hf) or []
-            except Exception:
-                history = []
-            history.append(entry)
-            with open(history_file, 'w', encoding='utf-8') as hf:
-                json.dump(history, hf, ensure_ascii=False, indent=2)
+            })
         except Exception:
             pass
 
+        thread, log_stream = run_modelexport_in_thread(
+            task_id=export_key,
+            model_path=weight_path,
+            output_dir=base_output_dir,
+            result_file_path=None,
+            formats=formats,
+            imgsz=imgsz,
+            half=half,
+            simplify=simplify,
+            opset=opset,
+            device=device,
+            triton_repo_path=triton_repo_path,
+            triton_model_name=triton_model_name,
+            enable_triton=enable_triton,
+            priority=priority,
+            meta=export_meta,
+        )
+
+        EXPORT_THREADS[export_key] = {
+            "thread": thread,
+            "log": log_stream,
+            **export_meta,
+        }
+
         return format_output(msg=f"导出任务 {export_key} 已启动", data={
             "exportKey": export_key,
             "output_dir": base_output_dir,
+            "jobID": thread.job_id,
         })
     except Exception as e:
         return format_output(code=500, msg=f"启动导出任务失败: {str(e)}")
@@ -520,9 +803,10 @@ def run_model_export():
 def get_export_task_log():
     """
     获取导出任务的终端输出
-    Query: exportKey
+    Query: exportKey, since（可选，上次返回的 next 游标）
     """
     export_key = request.args.get("exportKey")
+    since = request.args.get("since", None, type=int)
     if not export_key:
         return format_output(code=400, msg="缺少必要参数(step:1)")
 
@@ -530,20 +814,13 @@ def get_export_task_log():
     if not task_info:
         return format_output(code=404, msg="任务未在运行，或不存在")
 
-    log_q = task_info["log"]
-    logs = []
-    while not log_q.empty():
-        logs.append(log_q.get())
-
-    if "log_cache" not in task_info:
-        task_info["log_cache"] = []
-    task_info["log_cache"].extend(logs)
-
-    log_text = "\n".join(task_info["log_cache"])
+    lines, next_seq, truncated = task_info["log"].read(since)
     is_running = task_info["thread"].is_alive()
 
     return format_output(data={
-        "log": log_text,
+        "log": "\n".join(lines),
+        "next": next_seq,
+        "truncated": truncated,
         "is_running": is_running,
         "meta": {
             "task_id": task_info.get("task_id"),
@@ -556,6 +833,14 @@ def get_export_task_log():
         }
     })
 
+@IModel_bp.route("/streamExportTaskLog", methods=["GET"])
+def stream_export_task_log():
+    """
+    以 SSE 推送导出任务的终端输出
+    Query: exportKey, since（可选，起始游标；断线重连时以 Last-Event-ID 为准）
+    """
+    return sse_task_log_response(EXPORT_THREADS, "exportKey")
+
 @IModel_bp.route("/getExportHistoryLog", methods=["GET"])
 def get_export_history_log():
     """
@@ -589,16 +874,7 @@ def get_export_history():
     if not output_dir:
         return format_output(code=400, msg="缺少必要参数(step:1)")
 
-    export_dir = os.path.join(output_dir, "export")
-    history_file = os.path.join(export_dir, "export_history.json")
-    try:
-        if os.path.exists(history_file):
-            with open(history_file, 'r', encoding='utf-8') as hf:
-                data = json.load(hf) or []
-        else:
-            data = []
-    except Exception:
-        data = []
+    data = read_export_history(output_dir)
 
     # 按时间倒序
     if isinstance(data, list):
@@ -624,7 +900,6 @@ def delete_export_history():
     try:
         export_dir = os.path.join(output_dir, "export")
         os.makedirs(export_dir, exist_ok=True)
-        history_file = os.path.join(export_dir, "export_history.json")
         # 删除日志文件
         log_file = os.path.join(export_dir, f"{export_key}.log")
         try:
@@ -634,18 +909,8 @@ def delete_export_history():
             pass
 
         # 过滤历史记录
-        history = []
         try:
-            if os.path.exists(history_file):
-                with open(history_file, 'r', encoding='utf-8') as hf:
-                    history = json.load(hf) or []
-        except Exception:
-            history = []
-
-        new_history = [h for h in history if h.get("exportKey") != export_key]
-        try:
-            with open(history_file, 'w', encoding='utf-8') as hf:
-                json.dump(new_history, hf, ensure_ascii=False, indent=2)
+            remove_export_history(output_dir, export_key)
         except Exception:
             pass
 
@@ -653,6 +918,136 @@ def delete_export_history():
     except Exception as e:
         return format_output(code=500, msg=f"删除失败: {e}")
 
+def _parse_batch_sizes(value):
+    """
+    batchSizes 可以是整数、整数列表或逗号分隔的字符串
+    """
+    if value is None or value == "":
+        return [1]
+    if isinstance(value, str):
+        value = [v for v in value.split(",") if v.strip()]
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    return sorted({int(v) for v in value})
+
+@IModel_bp.route("/runExportBenchmark", methods=['POST'])
+def run_export_benchmark():
+    """
+    对 outputDir/export 下的导出产物做 CPU 推理基准测试，并与源 .pt 对比
+    Body JSON: taskID, taskName, outputDir, modelType（源权重，默认 best）, formats（可选，只测这些格式）,
+               batchSizes（默认 [1]）, imgsz（默认 640）, warmup, iterations, priority
+    结果写入 export_history.json 中 exportKey 对应的记录，日志可通过 getExportTaskLog / streamExportTaskLog 查看
+    """
+    data = request.json or {}
+    task_id = data.get("taskID")
+    task_name = data.get("taskName")
+    output_dir = data.get("outputDir")
+    model_choice = data.get("modelType", "best")
+    formats = data.get("formats") or None
+    priority = parse_priority(data.get("priority"))
+
+    if not task_id or not task_name or not output_dir:
+        return format_output(code=400, msg="缺少必要的参数(step:1)")
+    if priority is None:
+        return format_output(code=400, msg="参数非法: priority")
+
+    try:
+        batch_sizes = _parse_batch_sizes(data.get("batchSizes"))
+        imgsz = int(data.get("imgsz", 640))
+        warmup = int(data.get("warmup", get_benchmark_warmup()))
+        iterations = int(data.get("iterations", get_benchmark_iterations()))
+    except (TypeError, ValueError):
+        return format_output(code=400, msg="batchSizes / imgsz / warmup / iterations 必须为整数")
+    if not batch_sizes or min(batch_sizes) < 1 or imgsz < 32 or warmup < 0:
+        return format_output(code=400, msg="batchSizes 必须为正整数，imgsz 不能小于 32，warmup 不能为负数")
+    if not 1 <= iterations <= get_benchmark_max_iterations():
+        return format_output(code=400, msg=f"iterations 必须在 1 到 {get_benchmark_max_iterations()} 之间")
+
+    base_output_dir = os.path.normpath(output_dir)
+    weight_path = find_output_weight(base_output_dir, model_choice)
+    if not os.path.exists(weight_path):
+        return format_output(code=404, msg=f"模型权重文件未找到: {model_choice}.pt")
+
+    artifacts = discover_artifacts(os.path.join(base_output_dir, "export"), formats)
+    if not artifacts:
+        return format_output(code=404, msg="未找到可测试的导出产物，请先导出模型")
+
+    timestamp = int(time.time())
+    export_key = f"{task_id}_bench_{timestamp}"
+    benchmark_meta = {
+        "task_id": task_id,
+        "task_name": task_name,
+        "output_dir": base_output_dir,
+        "model_choice": model_choice,
+        "formats": [a["format"] for a in artifacts],
+        "imgsz": imgsz,
+        "startedAt": timestamp,
+    }
+
+    try:
+        append_export_history(base_output_dir, {
+            "exportKey": export_key,
+            "type": "benchmark",
+            **benchmark_meta,
+            "batch_sizes": batch_sizes,
+            "warmup": warmup,
+            "iterations": iterations,
+            "status": "queued",
+        })
+
+        thread, log_stream = run_benchmark_in_thread(
+            export_key=export_key,
+            model_path=weight_path,
+            output_dir=base_output_dir,
+            formats=formats,
+            batch_sizes=batch_sizes,
+            imgsz=imgsz,
+            warmup=warmup,
+            iterations=iterations,
+            priority=priority,
+            meta=benchmark_meta,
+        )
+        EXPORT_THREADS[export_key] = {
+            "thread": thread,
+            "log": log_stream,
+            **benchmark_meta,
+        }
+
+        return format_output(msg=f"基准测试任务 {export_key} 已启动", data={
+            "exportKey": export_key,
+            "output_dir": base_output_dir,
+            "formats": benchmark_meta["formats"],
+            "jobID": thread.job_id,
+        })
+    except Exception as e:
+        return format_output(code=500, msg=f"启动基准测试任务失败: {str(e)}")
+
+@IModel_bp.route("/getExportBenchmark", methods=["GET"])
+def get_export_benchmark():
+    """
+    获取导出产物基准测试结果与对比表
+    Query: outputDir, exportKey（可选，默认最近一次已完成的基准测试）
+    返回: { entry: 历史记录（含 benchmark.results）, comparison: { rows, fastest } }
+    """
+    output_dir = request.args.get("outputDir")
+    export_key = request.args.get("exportKey")
+    if not output_dir:
+        return format_output(code=400, msg="缺少必要参数(step:1)")
+
+    benchmarks = [h for h in read_export_history(output_dir) if h.get("type") == "benchmark"]
+    if export_key:
+        entry = next((h for h in benchmarks if h.get("exportKey") == export_key), None)
+    else:
+        finished = [h for h in benchmarks if h.get("status") == "finished"]
+        entry = max(finished, key=lambda h: h.get("startedAt") or 0) if finished else None
+    if entry is None:
+        return format_output(code=404, msg="未找到基准测试记录")
+
+    benchmark = entry.get("benchmark") or {}
+    # 运行中的任务只有部分结果，按已有结果现算对比表
+    comparison = benchmark.get("comparison") or compare_results(benchmark.get("results") or [])
+    return format_output(data={"entry": entry, "comparison": comparison})
+
 @IModel_bp.route("/listExportArtifacts", methods=["GET"])
 def list_export_artifacts():
     """
@@ -910,8 +1305,10 @@ def list_registered_export_artifacts():
 def get_val_task_log():
     """
     获取验证任务的终端输出
+    Query: filename, since（可选，上次返回的 next 游标）
     """
     filename = request.args.get("filename")
+    since = request.args.get("since", None, type=int)
     if not filename:
         return format_output(code=400, msg="缺少必要参数(step:1)")
 
@@ -919,20 +1316,13 @@ def get_val_task_log():
     if not task_info:
         return format_output(code=404, msg="任务未在运行，或不存在")
 
-    log_q = task_info["log"]
-    logs = []
-    while not log_q.empty():
-        logs.append(log_q.get())
-
-    if "log_cache" not in task_info:
-        task_info["log_cache"] = []
-    task_info["log_cache"].extend(logs)
-
-    log_text = "\n".join(task_info["log_cache"])
+    lines, next_seq, truncated = task_info["log"].read(since)
     is_running = task_info["thread"].is_alive()
 
     return format_output(data={
-        "log": log_text,
+        "log": "\n".join(lines),
+        "next": next_seq,
+        "truncated": truncated,
         "is_running": is_running
     })
     
@@ -940,34 +1330,43 @@ def get_val_task_log():
 def get_task_log():
     """
     获取测试任务的终端输出
+    Query: filename, since（可选，上次返回的 next 游标）
     """
     filename = request.args.get("filename")
+    since = request.args.get("since", None, type=int)
     if not filename:
         return format_output(code=400, msg="缺少必要参数(step:1)")
-    
-    print(TEST_THREADS)
 
     task_info = TEST_THREADS.get(filename)
     if not task_info:
         return format_output(code=404, msg="任务未在运行，或不存在")
 
-    log_q = task_info["log"]
-    logs = []
-    while not log_q.empty():
-        logs.append(log_q.get())
-
-    if "log_cache" not in task_info:
-        task_info["log_cache"] = []
-    task_info["log_cache"].extend(logs)
-
-    log_text = "\n".join(task_info["log_cache"])
+    lines, next_seq, truncated = task_info["log"].read(since)
     is_running = task_info["thread"].is_alive()
 
     return format_output(data={
-        "log": log_text,
+        "log": "\n".join(lines),
+        "next": next_seq,
+        "truncated": truncated,
         "is_running": is_running
     })
     
+@IModel_bp.route("/streamValTaskLog", methods=["GET"])
+def stream_val_task_log():
+    """
+    以 SSE 推送验证任务的终端输出
+    Query: filename, since（可选，起始游标；断线重连时以 Last-Event-ID 为准）
+    """
+    return sse_task_log_response(VAL_THREADS, "filename")
+
+@IModel_bp.route("/streamTaskLog", methods=["GET"])
+def stream_task_log():
+    """
+    以 SSE 推送测试任务的终端输出
+    Query: filename, since（可选，起始游标；断线重连时以 Last-Event-ID 为准）
+    """
+    return sse_task_log_response(TEST_THREADS, "filename")
+
 @IModel_bp.route("/getAllTrainedModel", methods=['GET'])
 def get_all_trained_models():
     """
@@ -1046,10 +1445,34 @@ def get_all_trained_models():
 
     return format_output(data={"models": trained_models})
 
+def resolve_test_result_image(task_id, file_path):
+    """
+    定位测试任务的结果图片（绝对路径或相对 output_dir 的路径），返回 (abs_file_path, code, msg)
+    """
+    matched_files, e = get_test_result_file(task_id)
+    if e or not matched_files:
+        return None, 404, f"未找到测试任务ID为 {task_id} 的结果文件"
+
+    for item, data in matched_files:
+        output_dir = data.get("output_dir")
+        if not output_dir:
+            continue
+
+        abs_file_path = file_path if os.path.isabs(file_path) else os.path.join(output_dir, file_path)
+        if not os.path.exists(abs_file_path):
+            continue
+
+        mime_type, _ = mimetypes.guess_type(abs_file_path)
+        if mime_type and mime_type.startswith("image"):
+            return abs_file_path, 200, ""
+        return None, 415, "目标文件不是图片类型"
+
+    return None, 404, "未找到匹配的输出路径或文件不存在"
+
 @IModel_bp.route("/getTestResultImageBase64", methods=["GET"])
 def get_test_result_image_base64():
     """
-    获取测试任务的结果图片的 Base64 内容
+    获取测试任务的结果图片的 Base64 内容（建议改用 getTestResultImage 以二进制获取）
     """
     task_id = request.args.get("taskID")
     file_path = request.args.get("filePath")
@@ -1057,38 +1480,42 @@ def get_test_result_image_base64():
     if not task_id or not file_path:
         return format_output(code=400, msg="缺少必要参数(step:1)")
 
-    matched_files, e = get_test_result_file(task_id)
-    if e or not matched_files:
-        return format_output(code=404, msg=f"未找到测试任务ID为 {task_id} 的结果文件")
-
     try:
-        for item in matched_files:
-            with open(item, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f.read())
-
-            output_dir = data.get("output_dir")
-            if not output_dir:
-                continue
+        abs_file_path, code, msg = resolve_test_result_image(task_id, file_path)
+        if abs_file_path is None:
+            return format_output(code=code, msg=msg)
+
+        mime_type, _ = mimetypes.guess_type(abs_file_path)
+        with open(abs_file_path, "rb") as img_file:
+            b64_data = base64.b64encode(img_file.read()).decode("utf-8")
+        return format_output(data={
+            "type": "image",
+            "mime": mime_type,
+            "base64": f"data:{mime_type};base64,{b64_data}"
+        })
 
-            # 支持传入绝对路径或相对 output_dir 的路径
-            abs_file_path = file_path if os.path.isabs(file_path) else os.path.join(output_dir, file_path)
-            if not os.path.exists(abs_file_path):
-                continue
+    except Exception as e:
+        return format_output(code=500, msg=f"读取图片文件失败: {str(e)}")
 
-            mime_type, _ = mimetypes.guess_type(abs_file_path)
-            if mime_type and mime_type.startswith("image"):
-                with open(abs_file_path, "rb") as img_file:
-                    b64_data = base64.b64encode(img_file.read()).decode("utf-8")
-                return format_output(data={
-                    "type": "image",
-                    "mime": mime_type,
-                    "base64": f"data:{mime_type};base64,{b64_data}"
-                })
+@IModel_bp.route("/getTestResultImage", methods=["GET"])
+def get_test_result_image():
+    """
+    以二进制返回测试任务的结果图片，支持 ETag / Last-Modified 缓存校验与 Range 请求
+    Query: taskID, filePath, thumbnail（可选，1 返回默认尺寸缩略图）, maxEdge（可选，缩略图最长边）, format（可选，webp / jpeg）
+    """
+    task_id = request.args.get("taskID")
+    file_path = request.args.get("filePath")
 
-            return format_output(code=415, msg="目标文件不是图片类型")
+    if not task_id or not file_path:
+        return format_output(code=400, msg="缺少必要参数(step:1)")
 
-        return format_output(code=404, msg="未找到匹配的输出路径或文件不存在")
+    try:
+        abs_file_path, code, msg = resolve_test_result_image(task_id, file_path)
+        if abs_file_path is None:
+            return format_output(code=code, msg=msg)
 
+        max_edge, fmt = parse_thumbnail_args(request.args)
+        return send_image(abs_file_path, max_edge, fmt)
     except Exception as e:
         return format_output(code=500, msg=f"读取图片文件失败: {str(e)}")
 
@@ -1111,6 +1538,8 @@ def delete_test_result():
 
         if os.path.exists(target):
             os.remove(target)
+        remove_result_log(target)
+        get_metadata_store().remove("test_result", target)
 
         # 从内存列表移除并保存
         global TEST_LIST
@@ -1146,6 +1575,8 @@ def delete_validation_result():
 
         if os.path.exists(target):
             os.remove(target)
+        remove_result_log(target)
+        get_metadata_store().remove("val_result", target)
 
         # 从内存列表移除并保存
         global VAL_LIST
@@ -1179,10 +1610,7 @@ def download_test_result():
         return format_output(code=404, msg=f"未找到测试任务ID为 {task_id} 的结果文件")
 
     try:
-        for item in matched_files:
-            with open(item, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f.read())
-
+        for item, data in matched_files:
             output_dir = data.get("output_dir")
             if not output_dir:
                 continue
@@ -1218,36 +1646,15 @@ def download_val_result_file():
         return format_output(code=400, msg="缺少必要参数(step:1)")
 
     # 匹配该 task 的验证结果文件
-    matched_files = []
-    pattern = re.compile(rf"^{re.escape(task_id)}_\d+\.yaml$")
-    try:
-        directory = get_validation_result_files_path()
-        for filename in os.listdir(directory):
-            if pattern.match(filename):
-                matched_files.append(os.path.join(directory, filename))
-    except Exception as e:
+    matched_files, e = get_val_result_file(task_id)
+    if e:
         return format_output(code=500, msg=f"获取验证文件时失败: {e}")
 
     if not matched_files:
         return format_output(code=404, msg=f"未找到验证任务ID为 {task_id} 的结果文件")
 
     try:
-        for item in matched_files:
-            with open(item, 'r', encoding='utf-8') as f:
-                content = f.read()
-            try:
-                data = yaml.safe_load(content)
-            except Exception:
-                data = yaml.unsafe_load(content)
-
-            # 兼容空/非字典数据
-            if data is None:
-                data = {}
-            else:
-                data = _to_plain_python(data)
-                if not isinstance(data, dict):
-                    data = {"data": data}
-
+        for item, data in matched_files:
             output_dir = data.get("output_dir")
             if not output_dir:
                 continue
@@ -1283,36 +1690,15 @@ def download_val_result_file_stream():
         return format_output(code=400, msg="缺少必要参数(step:1)")
 
     # 匹配该 task 的验证结果文件
-    matched_files = []
-    pattern = re.compile(rf"^{re.escape(task_id)}_\d+\.yaml$")
-    try:
-        directory = get_validation_result_files_path()
-        for filename in os.listdir(directory):
-            if pattern.match(filename):
-                matched_files.append(os.path.join(directory, filename))
-    except Exception as e:
+    matched_files, e = get_val_result_file(task_id)
+    if e:
         return format_output(code=500, msg=f"获取验证文件时失败: {e}")
 
     if not matched_files:
         return format_output(code=404, msg=f"未找到验证任务ID为 {task_id} 的结果文件")
 
     try:
-        for item in matched_files:
-            with open(item, 'r', encoding='utf-8') as f:
-                content = f.read()
-            try:
-                data = yaml.safe_load(content)
-            except Exception:
-                data = yaml.unsafe_load(content)
-
-            # 兼容空/非字典数据
-            if data is None:
-                data = {}
-            else:
-                data = _to_plain_python(data)
-                if not isinstance(data, dict):
-                    data = {"data": data}
-
+        for item, data in matched_files:
             output_dir = data.get("output_dir")
             if not output_dir:
                 continue
@@ -1335,10 +1721,44 @@ def download_val_result_file_stream():
     except Exception as e:
         return format_output(code=500, msg=f"下载文件失败: {str(e)}")
 
+def resolve_val_result_image(task_id, file_path):
+    """
+    定位验证任务产物图片（绝对路径，或相对 output_dir/result、output_dir 的路径），返回 (abs_file_path, code, msg)
+    """
+    matched_files, e = get_val_result_file(task_id)
+    if e:
+        return None, 500, f"获取验证文件时失败: {e}"
+
+    if not matched_files:
+        return None, 404, f"未找到验证任务ID为 {task_id} 的结果文件"
+
+    for item, data in matched_files:
+        output_dir = data.get("output_dir")
+        if not output_dir:
+            continue
+
+        if os.path.isabs(file_path):
+            abs_fp = file_path
+        else:
+            # 优先认为相对 result 目录
+            abs_fp = os.path.join(output_dir, "result", file_path)
+            if not os.path.exists(abs_fp):
+                abs_fp = os.path.join(output_dir, file_path)
+
+        if not os.path.exists(abs_fp):
+            continue
+
+        mime_type, _ = mimetypes.guess_type(abs_fp)
+        if mime_type and mime_type.startswith("image"):
+            return abs_fp, 200, ""
+        return None, 415, "目标文件不是图片类型"
+
+    return None, 404, "未找到匹配的输出路径或文件不存在"
+
 @IModel_bp.route("/getValResultImageBase64", methods=["GET"])
 def get_val_result_image_base64():
     """
-    获取验证任务产物图片（如混淆矩阵）的 Base64 内容
+    获取验证任务产物图片（如混淆矩阵）的 Base64 内容（建议改用 getValResultImage 以二进制获取）
     Query: taskID, filePath (绝对路径或相对 output_dir/result)
     """
     task_id = request.args.get("taskID")
@@ -1347,66 +1767,41 @@ def get_val_result_image_base64():
     if not task_id or not file_path:
         return format_output(code=400, msg="缺少必要参数(step:1)")
 
-    # 匹配该 task 的验证结果文件
-    matched_files = []
-    pattern = re.compile(rf"^{re.escape(task_id)}_\d+\.yaml$")
     try:
-        directory = get_validation_result_files_path()
-        for filename in os.listdir(directory):
-            if pattern.match(filename):
-                matched_files.append(os.path.join(directory, filename))
+        abs_fp, code, msg = resolve_val_result_image(task_id, file_path)
+        if abs_fp is None:
+            return format_output(code=code, msg=msg)
+
+        mime_type, _ = mimetypes.guess_type(abs_fp)
+        with open(abs_fp, "rb") as img_file:
+            b64_data = base64.b64encode(img_file.read()).decode("utf-8")
+        return format_output(data={
+            "type": "image",
+            "mime": mime_type,
+            "base64": f"data:{mime_type};base64,{b64_data}"
+        })
     except Exception as e:
-        return format_output(code=500, msg=f"获取验证文件时失败: {e}")
-
-    if not matched_files:
-        return format_output(code=404, msg=f"未找到验证任务ID为 {task_id} 的结果文件")
-
-    try:
-        for item in matched_files:
-            with open(item, 'r', encoding='utf-8') as f:
-                content = f.read()
-            try:
-                data = yaml.safe_load(content)
-            except Exception:
-                data = yaml.unsafe_load(content)
-
-            # 兼容空/非字典数据
-            if data is None:
-                data = {}
-            else:
-                data = _to_plain_python(data)
-                if not isinstance(data, dict):
-                    data = {"data": data}
-
-            output_dir = data.get("output_dir")
-            if not output_dir:
-                continue
-
-            # 允许传绝对路径或相对路径（相对 output_dir 或 output_dir/result）
-            if os.path.isabs(file_path):
-                abs_fp = file_path
-            else:
-                # 优先认为相对 result 目录
-                abs_fp = os.path.join(output_dir, "result", file_path)
-                if not os.path.exists(abs_fp):
-                    abs_fp = os.path.join(output_dir, file_path)
+        return format_output(code=500, msg=f"读取图片文件失败: {str(e)}")
 
-            if not os.path.exists(abs_fp):
-                continue
+@IModel_bp.route("/getValResultImage", methods=["GET"])
+def get_val_result_image():
+    """
+    以二进制返回验证任务产物图片，支持 ETag / Last-Modified 缓存校验与 Range 请求
+    Query: taskID, filePath, thumbnail（可选，1 返回默认尺寸缩略图）, maxEdge（可选，缩略图最长边）, format（可选，webp / jpeg）
+    """
+    task_id = request.args.get("taskID")
+    file_path = request.args.get("filePath")
 
-            mime_type, _ = mimetypes.guess_type(abs_fp)
-            if mime_type and mime_type.startswith("image"):
-                with open(abs_fp, "rb") as img_file:
-                    b64_data = base64.b64encode(img_file.read()).decode("utf-8")
-                return format_output(data={
-                    "type": "image",
-                    "mime": mime_type,
-                    "base64": f"data:{mime_type};base64,{b64_data}"
-                })
+    if not task_id or not file_path:
+        return format_output(code=400, msg="缺少必要参数(step:1)")
 
-            return format_output(code=415, msg="目标文件不是图片类型")
+    try:
+        abs_fp, code, msg = resolve_val_result_image(task_id, file_path)
+        if abs_fp is None:
+            return format_output(code=code, msg=msg)
 
-        return format_output(code=404, msg="未找到匹配的输出路径或文件不存在")
+        max_edge, fmt = parse_thumbnail_args(request.args)
+        return send_image(abs_fp, max_edge, fmt)
     except Exception as e:
         return format_output(code=500, msg=f"读取图片文件失败: {str(e)}")
 
@@ -1,12 +1,305 @@
-from ultralytics import YOLO
 from stream_to_logger import StreamToLogger
+from tools.result_log import ResultLogFile, result_log_path, finalize_result_log
+from IModel.batch_source import collect_batch_images, write_batch_source_list, is_stream_source
+from model_cache import load_model, get_model_cache
+from config import get_test_batch_size, get_progress_log_interval, get_test_stream_max_frames
+import numpy as np
+import json
+import queue
+import threading
 import logging
 import sys
 import os
 import yaml
 import time
 
-def test_model(model_path, input_path, output_dir, result_file_path, test_type="image", logger=None, task_id=None):
+def update_result_file(result_file_path, info):
+    """
+    合并更新测试结果文件
+    """
+    if os.path.exists(result_file_path):
+        with open(result_file_path, 'r', encoding='utf-8') as f:
+            existing_data = yaml.safe_load(f) or {}
+    else:
+        existing_data = {}
+
+    existing_data.update(info)
+
+    with open(result_file_path, 'w', encoding='utf-8') as f:
+        yaml.dump(existing_data, f, allow_unicode=True)
+
+def _prediction_record(result):
+    """
+    单张图片的预测摘要（写入 predictions.jsonl）
+    """
+    record = {
+        "image": result.path,
+        "speed_ms": {k: round(float(v), 3) for k, v in (result.speed or {}).items() if v is not None},
+    }
+    if result.boxes is not None:
+        classes = {}
+        for c in result.boxes.cls.tolist():
+            name = result.names.get(int(c), str(int(c)))
+            classes[name] = classes.get(name, 0) + 1
+        record["detections"] = len(result.boxes)
+        record["classes"] = classes
+    if getattr(result, "probs", None) is not None:
+        record["top1"] = result.names.get(int(result.probs.top1))
+        record["top1_conf"] = round(float(result.probs.top1conf), 4)
+    return record
+
+def batch_stats(latencies_ms, speeds, elapsed, images):
+    """
+    汇总批量测试的吞吐量与单张延迟分位数
+    """
+    stats = {
+        "images": images,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_img_s": round(images / elapsed, 3) if elapsed > 0 else None,
+    }
+    if latencies_ms:
+        values = np.asarray(latencies_ms, dtype=float)
+        stats["latency_ms"] = {
+            "mean": round(float(values.mean()), 3),
+            **{f"p{q}": round(float(np.percentile(values, q)), 3) for q in (50, 90, 95, 99)},
+            "max": round(float(values.max()), 3),
+        }
+        stats["speed_ms"] = {k: round(float(np.mean(v)), 3) for k, v in speeds.items() if v}
+    return stats
+
+def run_batch_test(model, input_path, output_dir, result_file_path, batch_size, device, logger):
+    """
+    批量测试：展开目录 / 通配符 / zip 后写成 .txt 清单，以 predict(stream=True) 按 batch_size 分批推理
+
+    权重只加载一次，结果逐张追加到 output_dir/predictions.jsonl，
+    进度定期写入结果文件，结束时记录吞吐量（img/s）与单张延迟分位数。
+    """
+    images = collect_batch_images(input_path, os.path.join(output_dir, "t"))
+    total = len(images)
+    if total == 0:
+        logger.info(f"[ERROR] 未找到可测试的图片: {input_path}")
+        sys.exit(1)
+
+    predictions_path = os.path.join(output_dir, "predictions.jsonl")
+    update_result_file(result_file_path, {
+        "predictionsFile": predictions_path,
+        "batch_progress": {"processed": 0, "total": total},
+    })
+    logger.info(f"[INFO] 批量测试: {total} 张图片, batch={batch_size}")
+    source_list = write_batch_source_list(images, os.path.join(output_dir, "batch_source.txt"))
+
+    progress_interval = max(get_progress_log_interval(), 1.0)
+    latencies_ms = []
+    speeds = {"preprocess": [], "inference": [], "postprocess": []}
+    processed = 0
+    start = time.perf_counter()
+    last_report = start
+
+    with open(predictions_path, "w", encoding="utf-8", buffering=1) as f:
+        results = model.predict(
+            source=source_list,
+            stream=True,
+            batch=batch_size,
+            save=True,
+            save_txt=True,
+            save_conf=True,
+            project=output_dir,
+            name="result",
+            device=device,
+            verbose=False,
+        )
+        for result in results:
+            record = _prediction_record(result)
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            speed = record["speed_ms"]
+            for k in speeds:
+                if k in speed:
+                    speeds[k].append(speed[k])
+            if speed:
+                latencies_ms.append(sum(speed.values()))
+            processed += 1
+
+            now = time.perf_counter()
+            if now - last_report >= progress_interval:
+                last_report = now
+                logger.info(f"[INFO] 批量测试进度: {processed}/{total} ({processed / (now - start):.1f} img/s)")
+                update_result_file(result_file_path, {"batch_progress": {"processed": processed, "total": total}})
+
+    stats = batch_stats(latencies_ms, speeds, time.perf_counter() - start, processed)
+    logger.info(f"[INFO] 批量测试完成: {processed} 张, {stats['throughput_img_s']} img/s, 延迟 {stats.get('latency_ms')}")
+    update_result_file(result_file_path, {
+        "batch_progress": {"processed": processed, "total": total},
+        "batch_stats": stats,
+    })
+
+def _stage_fps(frames, seconds):
+    return round(frames / seconds, 2) if seconds > 0 else None
+
+def run_video_test(model, input_path, output_dir, result_file_path, batch_size, device, logger, max_frames=None):
+    """
+    视频 / 视频流测试：解码、推理、绘制编码三个阶段流水线并行
+
+    - 读取线程用 OpenCV 解码帧放入有界队列（直接读取源文件，不复制）
+    - 主线程按 batch_size 攒帧后批量推理
+    - 写入线程绘制检测框并编码输出视频，与推理之间同样经有界队列背压
+    结束时在结果文件中记录各阶段 FPS（按各自的累计耗时计算）与整体 FPS。
+    视频流 / 摄像头没有结尾，未指定 max_frames 时最多处理 YOLO_TVP_TEST_STREAM_MAX_FRAMES 帧。
+    """
+    import cv2
+
+    if not max_frames and is_stream_source(input_path):
+        max_frames = get_test_stream_max_frames()
+        logger.info(f"[INFO] 视频流未指定 maxFrames，最多处理 {max_frames} 帧")
+
+    source = int(input_path) if input_path.isdigit() else input_path
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        logger.info(f"[ERROR] 无法打开视频: {input_path}")
+        sys.exit(1)
+
+    src_fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    if total <= 0:
+        total = None
+    if max_frames:
+        total = min(total, max_frames) if total else max_frames
+
+    result_dir = os.path.join(output_dir, "result")
+    os.makedirs(result_dir, exist_ok=True)
+    stem = "stream" if is_stream_source(input_path) else os.path.splitext(os.path.basename(input_path))[0]
+    video_path = os.path.join(result_dir, f"{stem}.mp4")
+    update_result_file(result_file_path, {
+        "resultVideo": video_path,
+        "video_progress": {"processed": 0, "total": total},
+    })
+    logger.info(f"[INFO] 视频测试: {input_path}, 源 FPS={src_fps:.2f}, 帧数={total or '未知'}, batch={batch_size}")
+
+    queue_size = max(2, batch_size * 4)
+    frames_q = queue.Queue(maxsize=queue_size)
+    results_q = queue.Queue(maxsize=4)
+    stop = threading.Event()
+    timings = {"decode": 0.0, "infer": 0.0, "encode": 0.0}
+    counts = {"decoded": 0, "encoded": 0}
+    errors = []
+
+    def reader():
+        try:
+            while not stop.is_set() and (not max_frames or counts["decoded"] < max_frames):
+                t = time.perf_counter()
+                ok, frame = cap.read()
+                timings["decode"] += time.perf_counter() - t
+                if not ok:
+                    break
+                counts["decoded"] += 1
+                while not stop.is_set():
+                    try:
+                        frames_q.put(frame, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:
+            errors.append(f"解码失败: {e}")
+        finally:
+            cap.release()
+            frames_q.put(None)
+
+    def writer():
+        out = None
+        failed = False
+        try:
+            while True:
+                results = results_q.get()
+                if results is None:
+                    break
+                if failed:
+                    continue
+                try:
+                    t = time.perf_counter()
+                    for result in results:
+                        frame = result.plot()
+                        if out is None:
+                            h, w = frame.shape[:2]
+                            out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), src_fps if src_fps > 0 else 25, (w, h))
+                        out.write(frame)
+                        counts["encoded"] += 1
+                    timings["encode"] += time.perf_counter() - t
+                except Exception as e:
+                    # 继续取走队列中的结果，避免推理线程阻塞
+                    errors.append(f"编码失败: {e}")
+                    failed = True
+        finally:
+            if out is not None:
+                out.release()
+
+    reader_thread = threading.Thread(target=reader, daemon=True)
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    reader_thread.start()
+    writer_thread.start()
+
+    progress_interval = max(get_progress_log_interval(), 1.0)
+    processed = 0
+    start = time.perf_counter()
+    last_report = start
+    finished = False
+    try:
+        batch = []
+        while not finished:
+            frame = frames_q.get()
+            if frame is None:
+                finished = True
+            else:
+                batch.append(frame)
+            if batch and (len(batch) >= batch_size or finished):
+                t = time.perf_counter()
+                results = model.predict(source=batch, device=device, save=False, verbose=False)
+                timings["infer"] += time.perf_counter() - t
+                results_q.put(results)
+                processed += len(batch)
+                batch = []
+
+                now = time.perf_counter()
+                if now - last_report >= progress_interval:
+                    last_report = now
+                    logger.info(f"[INFO] 视频测试进度: {processed}/{total or '?'} 帧 ({processed / (now - start):.1f} FPS)")
+                    update_result_file(result_file_path, {"video_progress": {"processed": processed, "total": total}})
+    finally:
+        stop.set()
+        # 推理异常退出时取空帧队列，让读取线程结束
+        while not finished:
+            finished = frames_q.get() is None
+        results_q.put(None)
+        reader_thread.join()
+        writer_thread.join()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "frames": processed,
+        "encoded_frames": counts["encoded"],
+        "source_fps": round(src_fps, 2) if src_fps else None,
+        "batch_size": batch_size,
+        "elapsed_s": round(elapsed, 3),
+        "pipeline_fps": _stage_fps(processed, elapsed),
+        "stage_fps": {
+            "decode": _stage_fps(counts["decoded"], timings["decode"]),
+            "infer": _stage_fps(processed, timings["infer"]),
+            "encode": _stage_fps(counts["encoded"], timings["encode"]),
+        },
+        "stage_seconds": {k: round(v, 3) for k, v in timings.items()},
+    }
+    stage_fps = {k: v for k, v in stats["stage_fps"].items() if v}
+    if stage_fps:
+        stats["bottleneck"] = min(stage_fps, key=stage_fps.get)
+    if errors:
+        stats["errors"] = errors
+        for error in errors:
+            logger.info(f"[ERROR] {error}")
+    logger.info(f"[INFO] 视频测试完成: {processed} 帧, 整体 {stats['pipeline_fps']} FPS, 各阶段 {stats['stage_fps']}")
+    update_result_file(result_file_path, {
+        "video_progress": {"processed": processed, "total": total},
+        "video_stats": stats,
+    })
+
+def test_model(model_path, input_path, output_dir, result_file_path, test_type="image", logger=None, task_id=None, device=None, batch_size=None, max_frames=None):
     if logger is None:
         logger = logging.getLogger("default")
         logger.setLevel(logging.INFO)
@@ -22,7 +315,8 @@ def test_model(model_path, input_path, output_dir, result_file_path, test_type="
         logger.info("未获取到Test Result File Path")
         sys.exit(1)
         
-    log_cache = []
+    # 日志逐行写入独立的日志文件，结果 YAML 中只记录路径
+    log_cache = ResultLogFile(result_log_path(result_file_path))
         
     stdout_backup = sys.stdout
     stderr_backup = sys.stderr
@@ -32,17 +326,28 @@ def test_model(model_path, input_path, output_dir, result_file_path, test_type="
     logger.info("[INFO] 启动测试任务...")
     
     try:
-        model = YOLO(model_path)
+        model = load_model(model_path, device)
+        logger.info(f"[CACHE] 模型缓存: {get_model_cache().stats()}")
 
-        model.predict(
-            source=input_path,
-            save=True,
-            save_txt=True,
-            save_conf=True,
-            project=output_dir,
-            name="result"
-        )
+        if test_type == "batch":
+            run_batch_test(model, input_path, output_dir, result_file_path,
+                           int(batch_size or get_test_batch_size()), device, logger)
+        elif test_type == "video":
+            run_video_test(model, input_path, output_dir, result_file_path,
+                           int(batch_size or get_test_batch_size()), device, logger, max_frames)
+        else:
+            model.predict(
+                source=input_path,
+                save=True,
+                save_txt=True,
+                save_conf=True,
+                project=output_dir,
+                name="result",
+                device=device,
+            )
     finally:
+        sys.stdout.close()
+        sys.stderr.close()
         sys.stdout = stdout_backup
         sys.stderr = stderr_backup    
     
@@ -52,19 +357,10 @@ def test_model(model_path, input_path, output_dir, result_file_path, test_type="
     
     result_info = {
         "completedAt": completed_time,
-        "log": log_cache
+        "logFile": finalize_result_log(log_cache)
     }
 
-    if os.path.exists(result_file_path):
-        with open(result_file_path, 'r', encoding='utf-8') as f:
-            existing_data = yaml.safe_load(f) or {}
-    else:
-        existing_data = {}
-
-    existing_data.update(result_info)
-
-    with open(result_file_path, 'w', encoding='utf-8') as f:
-        yaml.dump(existing_data, f, allow_unicode=True)
+    update_result_file(result_file_path, result_info)
      
     
 if __name__ == '__main__':
@@ -1,5 +1,7 @@
-from ultralytics import YOLO
 from stream_to_logger import StreamToLogger
+from tools.label_scanner import scan_label_dir
+from tools.result_log import ResultLogFile, result_log_path, finalize_result_log
+from model_cache import load_model, get_model_cache
 import logging
 import sys
 import os
@@ -101,7 +103,7 @@ def _to_plain_python(obj):
         return str(obj)
 
 
-def validate_model(model_path, dataset_yaml_path, output_dir, result_file_path, logger=None, task_id=None):
+def validate_model(model_path, dataset_yaml_path, output_dir, result_file_path, logger=None, task_id=None, device=None):
     if logger is None:
         logger = logging.getLogger("default")
         logger.setLevel(logging.INFO)
@@ -117,7 +119,8 @@ def validate_model(model_path, dataset_yaml_path, output_dir, result_file_path,
         logger.info("未获取到Validation Result File Path")
         sys.exit(1)
 
-    log_cache = []
+    # 日志逐行写入独立的日志文件，结果 YAML 中只记录路径
+    log_cache = ResultLogFile(result_log_path(result_file_path))
 
     stdout_backup = sys.stdout
     stderr_backup = sys.stderr
@@ -126,8 +129,13 @@ def validate_model(model_path, dataset_yaml_path, output_dir, result_file_path,
 
     logger.info("[INFO] 启动验证任务...")
 
+    model = None
+    original_names = None
     try:
-        model = YOLO(model_path)
+        model = load_model(model_path, device)
+        logger.info(f"[CACHE] 模型缓存: {get_model_cache().stats()}")
+        # 缓存中的模型会被后续任务复用，验证结束后还原类名
+        original_names = getattr(getattr(model, 'model', None), 'names', None)
         # 覆盖模型类名，确保绘图（包括混淆矩阵）使用数据集类别名
         save_json_flag = True  # 默认导出 JSON
         plots_flag = True      # 默认生成图表
@@ -186,8 +194,16 @@ def validate_model(model_path, dataset_yaml_path, output_dir, result_file_path,
             name="result",
             save_json=save_json_flag,
             plots=plots_flag,
+            device=device,
         )
     finally:
+        if original_names is not None:
+            try:
+                model.model.names = original_names
+            except Exception:
+                pass
+        sys.stdout.close()
+        sys.stderr.close()
         sys.stdout = stdout_backup
         sys.stderr = stderr_backup
 
@@ -199,7 +215,7 @@ def validate_model(model_path, dataset_yaml_path, output_dir, result_file_path,
 
     result_info = {
         "completedAt": completed_time,
-        "log": log_cache
+        "logFile": finalize_result_log(log_cache)
     }
 
     # 若类别数不一致，记入结果，供前端展示友好提示
@@ -284,31 +300,10 @@ def validate_model(model_path, dataset_yaml_path, output_dir, result_file_path,
                             if ds_names is not None and os.path.isdir(labels_dir):
                                 ncls_est = len(ds_names) if isinstance(ds_names, (list, dict)) else None
                                 if isinstance(ncls_est, int) and ncls_est > 0:
-                                    images_per_class = [0] * ncls_est
-                                    instances_per_class = [0] * ncls_est
-                                    # 遍历 labels 下所有 .txt
-                                    for root_d, _, files in os.walk(labels_dir):
-                                        for f in files:
-                                            if not f.lower().endswith('.txt'):
-                                                continue
-                                            fpath = os.path.join(root_d, f)
-                                            try:
-                                                with open(fpath, 'r', encoding='utf-8') as lf:
-                                                    lines = [ln.strip() for ln in lf.readlines() if ln.strip()]
-                                            except Exception:
-                                                lines = []
-                                            # 按图片统计是否出现过该类
-                                            has_class = set()
-                                            for ln in lines:
-                                                try:
-                                                    cls_idx = int(ln.split()[0])
-                                                except Exception:
-                                                    continue
-                                                if 0 <= cls_idx < ncls_est:
-                                                    instances_per_class[cls_idx] += 1
-                                                    has_class.add(cls_idx)
-                                            for cls_idx in has_class:
-                                                images_per_class[cls_idx] += 1
+                                    # 并行统计 labels 下所有 .txt（含子目录）
+                                    label_stats = scan_label_dir(labels_dir, num_classes=ncls_est, recursive=True)
+                                    images_per_class = label_stats["images_per_class"]
+                                    instances_per_class = label_stats["instances_per_class"]
                     except Exception:
                         images_per_class = None
                         instances_per_class = None
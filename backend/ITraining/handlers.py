@@ -1,5 +1,8 @@
 import logging
 import queue
+import threading
+import itertools
+from collections import deque
 
 class QueueHandler(logging.Handler):
     """
@@ -12,3 +15,65 @@ class QueueHandler(logging.Handler):
     def emit(self, record):
         log_entry = self.format(record)
         self.log_queue.put(log_entry)
+
+class LogBuffer:
+    """
+    带序号的日志环形缓冲区
+
+    每一行日志分配一个递增序号，客户端携带上次拿到的游标（since）轮询，
+    只返回新增的行；超出容量的旧日志会被丢弃。
+    max_events 不为 0 时附带同样结构的 events 缓冲区，存放工作进程上报的结构化事件（dict）。
+    """
+    def __init__(self, max_lines=50000, max_events=10000):
+        self._lines = deque(maxlen=max_lines)
+        self._next_seq = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self.events = LogBuffer(max_events, max_events=0) if max_events else None
+
+    def put(self, line):
+        """
+        追加一行日志（与 queue.Queue.put 接口一致，可直接交给 QueueHandler 使用）
+        """
+        with self._cond:
+            self._lines.append(line)
+            self._next_seq += 1
+            self._cond.notify_all()
+
+    def wait(self, since, timeout=None):
+        """
+        阻塞等待，直到游标 since 之后出现新日志或超时；返回是否有新日志
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: since is None or self._next_seq != since, timeout)
+
+    @property
+    def next_seq(self):
+        return self._next_seq
+
+    def read(self, since=None):
+        """
+        读取游标 since 之后的日志
+
+        返回 (lines, next_seq, truncated)：
+        - lines: 新增的日志行
+        - next_seq: 下一次轮询应携带的游标
+        - truncated: since 之后的部分日志已被环形缓冲区丢弃（或游标非法）
+        """
+        with self._lock:
+            next_seq = self._next_seq
+            first_seq = next_seq - len(self._lines)
+            truncated = False
+
+            if since is None:
+                since = first_seq
+            elif since < first_seq or since > next_seq:
+                truncated = True
+                since = first_seq
+
+            count = next_seq - since
+            # 从尾部倒序取 count 行，开销只与新增行数相关
+            lines = list(itertools.islice(reversed(self._lines), count))
+            lines.reverse()
+
+        return lines, next_seq, truncated
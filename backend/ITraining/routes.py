@@ -1,6 +1,12 @@
-from run_in_thread import run_main_in_thread
+from run_in_thread import run_main_in_thread, device_request_from_config, get_scheduler, register_restore_handler
 from flask import Blueprint, request
 from tools.format_output import format_output
+from tools.sse import sse_task_log_response
+from metadata_store import get_metadata_store, register_collection, load_yaml_file, match_result_file
+from tools.result_log import result_log_path, strip_embedded_log, get_result_log
+from tools.results_csv import get_results_csv_tail
+from tools.image_cache import parse_thumbnail_args, send_image
+from tools.request_args import parse_priority
 from config import get_tasks_path, get_tasks_result_files_path, get_tasks_yaml_file_path, get_yolo_model_list_url, get_models_path, get_yolo_model_cahce_expiration_time
 import yaml
 import json
@@ -10,45 +16,60 @@ import base64
 import os
 import mimetypes
 import random
-import re
 
 
 ITraining_bp = Blueprint('ITraining', __name__)
 TASK_THREADS = {}
 TASK_LIST = []
 
-def get_task_result_file(task_id):
+def restore_training_job(job, handle, log_buffer):
     """
-    获取模型训练结果数据文件
+    服务重启后恢复排队中的训练任务
     """
-    matched_files = []
-    pattern = re.compile(rf"^{re.escape(task_id)}_\d+\.yaml$")
+    filename = job["job_key"]
+    TASK_THREADS[filename] = {
+        "thread": handle,
+        "log": log_buffer,
+    }
+    TASK_LIST.append({
+        "task_id": job["meta"].get("task_id"),
+        "taskname": job["meta"].get("taskname"),
+        "filename": filename
+    })
 
+register_restore_handler("training", restore_training_job)
+
+register_collection(
+    "task",
+    get_tasks_path,
+    lambda filename: "" if filename.endswith((".yaml", ".yml")) else None,
+    load_yaml_file,
+    task_id_of=lambda data: data.get("taskID"),
+)
+register_collection(
+    "training_result",
+    get_tasks_result_files_path,
+    match_result_file,
+    lambda file_path: strip_embedded_log(load_yaml_file(file_path)),
+)
+
+def get_task_result_records(task_id):
+    """
+    获取模型训练结果数据 [(文件路径, 内容)]
+    """
     try:
-        directory = get_tasks_result_files_path()
-        for filename in os.listdir(directory):
-            if pattern.match(filename):
-                matched_files.append(os.path.join(directory, filename))
-        return matched_files, False
+        return get_metadata_store().query("training_result", task_id), False
     except Exception as e:
         return -1, e
 
 @ITraining_bp.route("/getAllTasks", methods=["GET"])
 def get_all_tasks():
-    tasks_path = get_tasks_path()
-    
     tasks = []
-    for filename in os.listdir(tasks_path):
-        if filename.endswith(".yaml") or filename.endswith(".yml"):
-            file_path = os.path.join(tasks_path, filename)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = yaml.safe_load(f)
-                    
-                    data['__filename'] = filename
-                    tasks.append(data)
-            except Exception as e:
-                print(f"读取文件出错: {filename}, 错误: {e}")
+    for file_path, data in get_metadata_store().query("task"):
+        if not isinstance(data, dict):
+            continue
+        data['__filename'] = os.path.basename(file_path)
+        tasks.append(data)
     
     return format_output(data={
         "tasks": tasks
@@ -198,6 +219,7 @@ def create_task():
 
     with open(file_path, "w", encoding="utf-8") as f:
         yaml.dump(yaml_data, f, allow_unicode=True)
+    get_metadata_store().upsert("task", file_path)
 
     return format_output(msg="任务已创建", data={"yaml_file": filename})
 
@@ -219,6 +241,7 @@ def delete_dataset():
     except OSError as e:
         print(f"删除文件 '{path}' 失败: {e}")
         return format_output(code=500, msg="删除失败")
+    get_metadata_store().remove("task", filePath)
     
     return format_output(msg="删除成功")
 
@@ -233,6 +256,9 @@ def start_task():
     task_id = data.get("taskID", None)
     filename = data.get("filename", None)
     taskname = data.get("taskname", None)
+    priority = parse_priority(data.get("priority"))
+    if priority is None:
+        return format_output(code=400, msg="参数非法: priority")
 
     if not task_id or not filename or not taskname:
         return format_output(code=400, msg="缺少必要参数(step:1)")
@@ -275,13 +301,21 @@ def start_task():
             "filename": filename,
             "taskID": task_id,
             "outputDir": None,
-            "log": None
+            "logFile": result_log_path(task_result_file_path)
         }
 
         with open(task_result_file_path, "w", encoding="utf-8") as f:
             yaml.dump(result_info, f, allow_unicode=True)
+        get_metadata_store().upsert("training_result", task_result_file_path)
 
-        thread, log_stream = run_main_in_thread(file_path, task_id, task_result_file_path)
+        thread, log_stream = run_main_in_thread(
+            file_path,
+            task_id,
+            task_result_file_path,
+            device_request=device_request_from_config(config),
+            priority=priority,
+            meta={"task_id": task_id, "taskname": taskname},
+        )
 
         # 保存
         TASK_THREADS[filename] = {
@@ -298,14 +332,16 @@ def start_task():
         print("启动训练任务失败:", e)
         return format_output(code=500, msg=f"启动训练任务失败: {str(e)}")
 
-    return format_output(msg=f"任务 {config.get('taskName')} 已启动", data={"taskName": config.get("taskName")})
+    return format_output(msg=f"任务 {config.get('taskName')} 已加入队列", data={"taskName": config.get("taskName"), "jobID": thread.job_id})
 
 @ITraining_bp.route("/getTaskLog", methods=["GET"])
 def get_task_log():
     """
     获取训练任务的终端输出
+    Query: filename, since（可选，上次返回的 next 游标；不传则返回缓冲区内全部日志）
     """
     filename = request.args.get("filename")
+    since = request.args.get("since", None, type=int)
     if not filename:
         return format_output(code=400, msg="缺少必要参数(step:1)")
 
@@ -313,23 +349,92 @@ def get_task_log():
     if not task_info:
         return format_output(code=404, msg="任务未在运行，或不存在")
 
-    log_q = task_info["log"]
-    logs = []
-    while not log_q.empty():
-        logs.append(log_q.get())
-
-    if "log_cache" not in task_info:
-        task_info["log_cache"] = []
-    task_info["log_cache"].extend(logs)
-
-    log_text = "\n".join(task_info["log_cache"])
+    lines, next_seq, truncated = task_info["log"].read(since)
     is_running = task_info["thread"].is_alive()
 
     return format_output(data={
-        "log": log_text,
+        "log": "\n".join(lines),
+        "next": next_seq,
+        "truncated": truncated,
         "is_running": is_running
     })
     
+@ITraining_bp.route("/getTaskEvents", methods=["GET"])
+def get_task_events():
+    """
+    获取训练任务上报的结构化事件（batch 进度、epoch 损失与学习率、验证指标、训练结束）
+    Query: filename, since（可选，上次返回的 next 游标；不传则返回缓冲区内全部事件）
+    """
+    filename = request.args.get("filename")
+    since = request.args.get("since", None, type=int)
+    if not filename:
+        return format_output(code=400, msg="缺少必要参数(step:1)")
+
+    task_info = TASK_THREADS.get(filename)
+    if not task_info:
+        return format_output(code=404, msg="任务未在运行，或不存在")
+
+    events_buffer = getattr(task_info["log"], "events", None)
+    if events_buffer is None:
+        events, next_seq, truncated = [], 0, False
+    else:
+        events, next_seq, truncated = events_buffer.read(since)
+
+    return format_output(data={
+        "events": events,
+        "next": next_seq,
+        "truncated": truncated,
+        "is_running": task_info["thread"].is_alive()
+    })
+
+@ITraining_bp.route("/streamTaskLog", methods=["GET"])
+def stream_task_log():
+    """
+    以 SSE 推送训练任务的终端输出
+    Query: filename, since（可选，起始游标；断线重连时以 Last-Event-ID 为准）
+    """
+    return sse_task_log_response(TASK_THREADS, "filename")
+
+@ITraining_bp.route("/getJobQueue", methods=["GET"])
+def get_job_queue():
+    """
+    获取任务队列（训练 / 测试 / 验证 / 导出）及设备占用情况
+    Query: status（可选：queued / running / done / failed / cancelled / interrupted）
+    """
+    status = request.args.get("status", None)
+    try:
+        scheduler = get_scheduler()
+        jobs = scheduler.list_jobs(status=status)
+        for job in jobs:
+            # 参数中可能包含较长的路径，列表接口只返回摘要信息
+            job.pop("kwargs", None)
+        return format_output(data={
+            "jobs": jobs,
+            "resources": scheduler.get_resources()
+        })
+    except Exception as e:
+        return format_output(code=500, msg=f"获取任务队列失败: {str(e)}")
+
+@ITraining_bp.route("/cancelJob", methods=["POST"])
+def cancel_job():
+    """
+    取消排队中或运行中的任务
+    Body JSON: jobID
+    """
+    data = request.get_json(silent=True) or {}
+    job_id = data.get("jobID", None)
+    if job_id is None:
+        return format_output(code=400, msg="缺少必要参数(step:1)")
+
+    try:
+        ok = get_scheduler().cancel(int(job_id))
+    except Exception as e:
+        return format_output(code=500, msg=f"取消任务失败: {str(e)}")
+
+    if not ok:
+        return format_output(code=404, msg="任务不存在或已结束")
+    return format_output(msg="任务已取消")
+
 @ITraining_bp.route("/getAllRunningTasks", methods=['GET'])
 def get_all_running_tasks():
     """
@@ -362,14 +467,12 @@ def get_training_tasks_history():
     if not task_id:
         return format_output(code=400, msg="缺少必要参数(step:1)")
     
-    matched_files, e = get_task_result_file(task_id)
+    records, e = get_task_result_records(task_id)
     if e:
         return format_output(code=500, msg=f"获取文件数据时失败: {e}")
     
-    for item in matched_files:
-        with open(item, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f.read())
-            data["__taskResultFilePath"] = item
+    for item, data in records:
+        data["__taskResultFilePath"] = item
 
         output_dir = data.get("outputDir", None)
         output_files = []
@@ -386,10 +489,101 @@ def get_training_tasks_history():
         "history": r_data
     })
     
+@ITraining_bp.route("/getTrainingTaskResultLog", methods=["GET"])
+def get_training_task_result_log():
+    """
+    获取一次训练的日志（从独立的日志文件按行读取）
+    Query: taskID, resultFilePath, since（可选，起始行号，默认 0）, limit（可选，最多返回的行数）
+    """
+    task_id = request.args.get("taskID")
+    result_file_path = request.args.get("resultFilePath")
+    since = request.args.get("since", 0, type=int)
+    limit = request.args.get("limit", None, type=int)
+
+    if not task_id or not result_file_path:
+        return format_output(code=400, msg="缺少必要参数(taskID / resultFilePath)")
+
+    records, e = get_task_result_records(task_id)
+    if e:
+        return format_output(code=500, msg=f"获取文件数据时失败: {e}")
+
+    data = dict(records).get(os.path.abspath(result_file_path))
+    if data is None:
+        return format_output(code=404, msg=f"未找到任务ID为 {task_id} 的结果文件")
+
+    try:
+        lines, next_line, eof = get_result_log(result_file_path, data, since, limit, load=load_yaml_file)
+    except Exception as e:
+        return format_output(code=500, msg=f"读取日志失败: {str(e)}")
+
+    return format_output(data={
+        "log": lines,
+        "next": next_line,
+        "eof": eof
+    })
+
+@ITraining_bp.route("/getTrainingMetrics", methods=["GET"])
+def get_training_metrics():
+    """
+    获取一次训练的逐 epoch 指标（增量读取 results.csv，训练过程中也可调用）
+    Query: taskID, resultFilePath, since（可选，只返回 epoch 大于该值的行，默认 0）
+    """
+    task_id = request.args.get("taskID")
+    result_file_path = request.args.get("resultFilePath")
+    since = request.args.get("since", 0, type=float)
+
+    if not task_id or not result_file_path:
+        return format_output(code=400, msg="缺少必要参数(taskID / resultFilePath)")
+
+    records, e = get_task_result_records(task_id)
+    if e:
+        return format_output(code=500, msg=f"获取文件数据时失败: {e}")
+
+    data = dict(records).get(os.path.abspath(result_file_path))
+    if data is None:
+        return format_output(code=404, msg=f"未找到任务ID为 {task_id} 的结果文件")
+
+    completed = data.get("completedAt") is not None
+    output_dir = data.get("outputDir")
+    if not output_dir:
+        # 任务尚在排队或未开始训练
+        return format_output(data={"columns": [], "metrics": {}, "next": int(since), "completed": completed})
+
+    try:
+        metrics = get_results_csv_tail(os.path.join(output_dir, "results.csv")).epochs_since(since)
+    except Exception as e:
+        return format_output(code=500, msg=f"读取训练指标失败: {str(e)}")
+
+    metrics["completed"] = completed
+    return format_output(data=metrics)
+
+def resolve_training_output_file(task_id, file_path, result_file_path):
+    """
+    根据任务ID、结果文件与相对路径定位训练输出文件，返回 (abs_file_path, code, msg)
+    """
+    records, e = get_task_result_records(task_id)
+    if e or not records:
+        return None, 404, f"未找到任务ID为 {task_id} 的结果文件"
+
+    data = dict(records).get(os.path.abspath(result_file_path))
+    if data is None:
+        return None, 404, f"结果文件不属于任务 {task_id}"
+
+    output_dir = data.get("outputDir")
+    if not output_dir:
+        return None, 500, "结果文件中缺少 outputDir 字段"
+
+    abs_file_path = os.path.join(output_dir, file_path)
+    if not os.path.exists(abs_file_path):
+        return None, 404, f"文件不存在: {file_path}"
+
+    return abs_file_path, 200, ""
+
 @ITraining_bp.route("/getTrainingTaskOutputFile", methods=["GET"])
 def get_training_task_output_file():
     """
     根据任务ID与文件路径，返回对应的训练结果文件内容（支持图片、yaml、csv）
+    图片建议改用 getTrainingTaskOutputImage 以二进制获取
     """
     task_id = request.args.get("taskID")
     file_path = request.args.get("filePath")
@@ -398,22 +592,10 @@ def get_training_task_output_file():
     if not task_id or not file_path or not result_file_path:
         return format_output(code=400, msg="缺少必要参数(taskID / filePath / result_file_path)")
 
-    matched_files, e = get_task_result_file(task_id)
-    if e or not matched_files:
-        return format_output(code=404, msg=f"未找到任务ID为 {task_id} 的结果文件")
-
     try:
-        with open(result_file_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f.read())
-
-        output_dir = data.get("outputDir")
-        if not output_dir:
-            return format_output(code=500, msg="结果文件中缺少 outputDir 字段")
-
-        abs_file_path = os.path.join(output_dir, file_path)
-
-        if not os.path.exists(abs_file_path):
-            return format_output(code=404, msg=f"文件不存在: {file_path}")
+        abs_file_path, code, msg = resolve_training_output_file(task_id, file_path, result_file_path)
+        if abs_file_path is None:
+            return format_output(code=code, msg=msg)
 
         mime_type, _ = mimetypes.guess_type(abs_file_path)
 
@@ -454,6 +636,33 @@ def get_training_task_output_file():
 
     except Exception as e:
         return format_output(code=500, msg=f"读取文件出错: {str(e)}")
+
+@ITraining_bp.route("/getTrainingTaskOutputImage", methods=["GET"])
+def get_training_task_output_image():
+    """
+    以二进制返回训练结果图片，支持 ETag / Last-Modified 缓存校验与 Range 请求
+    Query: taskID, filePath, resultFilePath, thumbnail（可选，1 返回默认尺寸缩略图）, maxEdge（可选，缩略图最长边）, format（可选，webp / jpeg）
+    """
+    task_id = request.args.get("taskID")
+    file_path = request.args.get("filePath")
+    result_file_path = request.args.get("resultFilePath")
+
+    if not task_id or not file_path or not result_file_path:
+        return format_output(code=400, msg="缺少必要参数(taskID / filePath / result_file_path)")
+
+    try:
+        abs_file_path, code, msg = resolve_training_output_file(task_id, file_path, result_file_path)
+        if abs_file_path is None:
+            return format_output(code=code, msg=msg)
+
+        mime_type, _ = mimetypes.guess_type(abs_file_path)
+        if not mime_type or not mime_type.startswith("image"):
+            return format_output(code=415, msg="目标文件不是图片类型")
+
+        max_edge, fmt = parse_thumbnail_args(request.args)
+        return send_image(abs_file_path, max_edge, fmt)
+    except Exception as e:
+        return format_output(code=500, msg=f"读取图片文件失败: {str(e)}")
     
 @ITraining_bp.route("/getAllBaseModelsFromGithub", methods=['GET'])
 def get_all_base_models_from_github():
@@ -6,9 +6,11 @@ import time
 import requests
 import logging
 from stream_to_logger import StreamToLogger
+from tools.result_log import ResultLogFile, result_log_path, finalize_result_log
 from tqdm import tqdm
 from ultralytics import YOLO
-from config import get_tasks_path, get_models_path
+from worker_pool import emit_event
+from config import get_tasks_path, get_models_path, get_batch_event_interval
 
 def load_task_config(task_file, logger):
     """
@@ -69,7 +71,114 @@ def download_model(model_name, model_browser_download_url, logger):
     
     return local_path
 
-def main(taskfile_path, task_result_file_path, logger=None, task_id=None):
+def update_task_result_file(task_result_file_path, info):
+    """
+    合并更新训练结果文件
+    """
+    if os.path.exists(task_result_file_path):
+        with open(task_result_file_path, 'r', encoding='utf-8') as f:
+            existing_data = yaml.safe_load(f) or {}
+    else:
+        existing_data = {}
+
+    existing_data.update(info)
+
+    with open(task_result_file_path, 'w', encoding='utf-8') as f:
+        yaml.dump(existing_data, f, allow_unicode=True)
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _float_dict(values):
+    return {str(k): _to_float(v) for k, v in (values or {}).items()}
+
+def register_event_callbacks(model, interval=None):
+    """
+    注册 Ultralytics 训练回调，把进度与指标作为结构化事件上报到任务的事件通道
+
+    batch 事件按 interval（秒）采样，每个 epoch 的最后一个 batch 总会上报；
+    回调异常只记录不抛出，不影响训练本身。
+    """
+    if interval is None:
+        interval = get_batch_event_interval()
+    state = {"batch": 0, "last": 0.0}
+
+    def safe(func):
+        def wrapper(trainer):
+            try:
+                func(trainer)
+            except Exception as e:
+                emit_event({"type": "error", "time": time.time(), "msg": f"{func.__name__}: {e}"})
+        wrapper.__name__ = func.__name__
+        return wrapper
+
+    def loss_items(trainer):
+        if trainer.tloss is None:
+            return {}
+        return _float_dict(trainer.label_loss_items(trainer.tloss, prefix="train"))
+
+    @safe
+    def on_train_epoch_start(trainer):
+        state["batch"] = 0
+
+    @safe
+    def on_train_batch_end(trainer):
+        state["batch"] += 1
+        batches = len(trainer.train_loader) if trainer.train_loader is not None else None
+        now = time.monotonic()
+        if now - state["last"] < interval and state["batch"] != batches:
+            return
+        state["last"] = now
+        emit_event({
+            "type": "batch",
+            "time": time.time(),
+            "epoch": trainer.epoch + 1,
+            "epochs": trainer.epochs,
+            "batch": state["batch"],
+            "batches": batches,
+            "loss": loss_items(trainer),
+        })
+
+    @safe
+    def on_train_epoch_end(trainer):
+        emit_event({
+            "type": "epoch",
+            "time": time.time(),
+            "epoch": trainer.epoch + 1,
+            "epochs": trainer.epochs,
+            "loss": loss_items(trainer),
+            "lr": _float_dict(trainer.lr),
+        })
+
+    @safe
+    def on_fit_epoch_end(trainer):
+        emit_event({
+            "type": "metrics",
+            "time": time.time(),
+            "epoch": trainer.epoch + 1,
+            "epochs": trainer.epochs,
+            "metrics": _float_dict(trainer.metrics),
+            "fitness": _to_float(trainer.fitness),
+            "best_fitness": _to_float(trainer.best_fitness),
+        })
+
+    @safe
+    def on_train_end(trainer):
+        emit_event({
+            "type": "train_end",
+            "time": time.time(),
+            "epoch": trainer.epoch + 1,
+            "best": str(trainer.best),
+            "best_fitness": _to_float(trainer.best_fitness),
+        })
+
+    for callback in (on_train_epoch_start, on_train_batch_end, on_train_epoch_end, on_fit_epoch_end, on_train_end):
+        model.add_callback(callback.__name__, callback)
+
+def main(taskfile_path, task_result_file_path, logger=None, task_id=None, assigned_device=None):
     start_time = int(time.time())
     
     if logger is None:
@@ -87,7 +196,8 @@ def main(taskfile_path, task_result_file_path, logger=None, task_id=None):
         logger.info("未获取到Task Result File Path")
         sys.exit(1)
         
-    log_cache = []
+    # 日志逐行写入独立的日志文件，结果 YAML 中只记录路径
+    log_cache = ResultLogFile(result_log_path(task_result_file_path))
         
     stdout_backup = sys.stdout
     stderr_backup = sys.stderr
@@ -179,6 +289,14 @@ def main(taskfile_path, task_result_file_path, logger=None, task_id=None):
             device_arg = "mps"
         case _:
             device_arg = "cpu"
+
+    # 调度器已分配具体设备时以其为准（"cpu"、"mps" 或 "0,1" 形式的 CUDA 编号）
+    if assigned_device is not None:
+        if assigned_device in ("cpu", "mps"):
+            device_arg = assigned_device
+        else:
+            device_arg = [int(i) for i in str(assigned_device).split(",")]
+        logger.info(f"[INFO] 调度分配设备: {device_arg}")
     
     project_path = os.path.join(get_tasks_path(), "training", f"task_{task_id}_{start_time}")
     if cache == "disk":
@@ -186,11 +304,15 @@ def main(taskfile_path, task_result_file_path, logger=None, task_id=None):
     else:
         _cache = True
             
+    # 训练开始前记录输出目录，训练过程中即可按 epoch 读取 results.csv
+    update_task_result_file(task_result_file_path, {"outputDir": os.path.join(project_path, "result")})
+
     logger.info(f"[INFO] 开始训练模型...")
     
     try:
         print(model_path)
         model = YOLO(model_path)
+        register_event_callbacks(model)
         model.train(
             data=dataset_yamlfile_path,
             project=project_path,
@@ -205,6 +327,8 @@ def main(taskfile_path, task_result_file_path, logger=None, task_id=None):
             # save_period=5
         )
     finally:
+        sys.stdout.close()
+        sys.stderr.close()
         sys.stdout = stdout_backup
         sys.stderr = stderr_backup
     
@@ -215,17 +339,8 @@ def main(taskfile_path, task_result_file_path, logger=None, task_id=None):
     result_info = {
         "completedAt": completed_time,
         "outputDir": os.path.join(project_path, "result"),
-        "log": log_cache
+        "logFile": finalize_result_log(log_cache)
     }
 
-    if os.path.exists(task_result_file_path):
-        with open(task_result_file_path, 'r', encoding='utf-8') as f:
-            existing_data = yaml.safe_load(f) or {}
-    else:
-        existing_data = {}
-
-    existing_data.update(result_info)
-
-    with open(task_result_file_path, 'w', encoding='utf-8') as f:
-        yaml.dump(existing_data, f, allow_unicode=True)
+    update_task_result_file(task_result_file_path, result_info)
      
\ No newline at end of file
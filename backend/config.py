@@ -1,4 +1,29 @@
 import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _env_number(name, default, cast):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning(f"环境变量 {name}={value!r} 不是有效的数值，使用默认值 {default}")
+        return default
+
+def env_int(name, default):
+    """
+    读取整数环境变量，未设置或无法解析时返回 default（后者记录警告，而不是在启动时抛出异常）
+    """
+    return _env_number(name, default, int)
+
+def env_float(name, default):
+    """
+    读取浮点数环境变量，规则同 env_int
+    """
+    return _env_number(name, default, float)
 
 USER_HOME = os.path.expanduser("~")   # 用户主目录
 
@@ -9,11 +34,47 @@ TASKS_RESULT_FILES_PATH = os.path.join(USER_HOME, ".yolo_training_visualization_
 TASKS_RESULT_YAML_FILES_PATH = os.path.join(USER_HOME, ".yolo_training_visualization_platform", "tasks", "t")
 TEST_RESULT_FILES_PATH = os.path.join(USER_HOME, ".yolo_training_visualization_platform", "test_result_files")
 VALIDATION_RESULT_FILES_PATH = os.path.join(USER_HOME, ".yolo_training_visualization_platform", "validation_result_files")
+JOBS_DB_PATH = os.path.join(USER_HOME, ".yolo_training_visualization_platform", "jobs.db")   # 任务队列数据库
+METADATA_DB_PATH = os.path.join(USER_HOME, ".yolo_training_visualization_platform", "metadata.db")   # 元数据索引数据库
+DATASET_STATS_DB_PATH = os.path.join(USER_HOME, ".yolo_training_visualization_platform", "dataset_stats.db")   # 数据集统计缓存
+UPLOAD_SESSIONS_PATH = os.path.join(USER_HOME, ".yolo_training_visualization_platform", "upload_sessions")   # 分块上传会话
+THUMBNAIL_CACHE_PATH = os.path.join(USER_HOME, ".yolo_training_visualization_platform", "thumbnail_cache")   # 结果图片缩略图缓存（可随时清空）
 
 YOLO_MODEL_LIST_URL = "https://api.github.com/repos/ultralytics/assets/releases/latest"
 
 YOLO_MODEL_CACHE_EXPIRATION_TIME = 3600
 
+TASK_LOG_BUFFER_MAX_LINES = 50000   # 每个任务在内存中保留的最大日志行数
+TASK_EVENT_BUFFER_MAX_EVENTS = 10000   # 每个任务在内存中保留的最大结构化事件数
+
+WORKER_MAX_PROCESSES = env_int("YOLO_TVP_WORKER_MAX_PROCESSES", 2)   # 同时运行的训练/测试/验证/导出工作进程数
+WORKER_WARM_IDLE_TIMEOUT = env_float("YOLO_TVP_WORKER_IDLE_TIMEOUT", 600)   # 测试/验证/导出常驻工作进程的空闲保留时间（秒），0 表示不保留
+MODEL_CACHE_MAX_MODELS = env_int("YOLO_TVP_MODEL_CACHE_MAX_MODELS", 4)       # 每个进程的模型缓存最多保留的模型数
+MODEL_CACHE_MAX_MB = env_int("YOLO_TVP_MODEL_CACHE_MAX_MB", 2048)            # 每个进程的模型缓存内存预算（MB）
+SCHEDULER_MAX_JOBS_PER_GPU = env_int("YOLO_TVP_MAX_JOBS_PER_GPU", 1)   # 每张显卡同时运行的任务数
+SCHEDULER_MAX_CPU_JOBS = env_int("YOLO_TVP_MAX_CPU_JOBS", 1)           # 同时运行的 CPU 任务数
+RESULT_LOG_COMPRESS = os.environ.get("YOLO_TVP_COMPRESS_RESULT_LOGS", "0") == "1"   # 任务结束后是否 gzip 压缩结果日志
+DATASET_EXTRACT_WORKERS = env_int("YOLO_TVP_EXTRACT_WORKERS", 4)         # 数据集压缩包并行解压线程数
+DATASET_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024                                              # 分块上传建议的块大小
+UPLOAD_SESSION_RETENTION = 600                                                           # 分块上传结束（done / failed）后会话状态在内存中保留的时间（秒）
+PROGRESS_LOG_INTERVAL = env_float("YOLO_TVP_PROGRESS_LOG_INTERVAL", 2.0)    # 进度条（\r 刷新）写入日志的最小间隔（秒）
+BATCH_EVENT_INTERVAL = env_float("YOLO_TVP_BATCH_EVENT_INTERVAL", 1.0)      # 训练 batch 进度事件的最小间隔（秒）
+TEST_BATCH_SIZE = env_int("YOLO_TVP_TEST_BATCH_SIZE", 8)                   # 批量测试默认推理 batch 大小
+TEST_STREAM_MAX_FRAMES = env_int("YOLO_TVP_TEST_STREAM_MAX_FRAMES", 9000)    # 视频流 / 摄像头测试未指定 maxFrames 时最多处理的帧数
+PREDICT_DEVICE = os.environ.get("YOLO_TVP_PREDICT_DEVICE", "cpu")                      # 同步预测接口使用的设备
+PREDICT_DEVICES = os.environ.get("YOLO_TVP_PREDICT_DEVICES", "")                         # 同步预测接口允许请求指定的设备（逗号分隔），为空时只允许默认设备
+PREDICT_MAX_BATCHERS = env_int("YOLO_TVP_PREDICT_MAX_BATCHERS", 4)          # 同步预测最多保留的合批器（权重 + 设备）数，超出时关闭最久未使用的
+PREDICT_MAX_BATCH = env_int("YOLO_TVP_PREDICT_MAX_BATCH", 8)                # 同步预测合批的最大图片数
+PREDICT_MAX_WAIT_MS = env_float("YOLO_TVP_PREDICT_MAX_WAIT_MS", 5)          # 同步预测合批的最长等待时间（毫秒）
+PREDICT_MAX_IMAGES = 32                                                                  # 单次同步预测请求的最大图片数
+THUMBNAIL_MAX_EDGE = env_int("YOLO_TVP_THUMBNAIL_MAX_EDGE", 512)           # 缩略图默认最长边（像素）
+THUMBNAIL_FORMAT = os.environ.get("YOLO_TVP_THUMBNAIL_FORMAT", "webp")                  # 缩略图格式：webp / jpeg
+THUMBNAIL_QUALITY = env_int("YOLO_TVP_THUMBNAIL_QUALITY", 80)               # 缩略图编码质量
+EXPORT_MAX_PARALLEL = env_int("YOLO_TVP_EXPORT_MAX_PARALLEL", 3)           # 多格式导出时并行的子进程数，1 表示依次导出
+BENCHMARK_WARMUP = env_int("YOLO_TVP_BENCHMARK_WARMUP", 3)                  # 导出产物基准测试的默认预热次数
+BENCHMARK_ITERATIONS = env_int("YOLO_TVP_BENCHMARK_ITERATIONS", 20)         # 导出产物基准测试的默认计时次数
+BENCHMARK_MAX_ITERATIONS = 1000                                                          # 基准测试单个 batch 大小允许的最大计时次数
+
 def get_dataset_path():
     """
     获取数据集存放路径
@@ -87,4 +148,217 @@ def get_yolo_model_cahce_expiration_time():
     """
     获取Yolo模型缓存文件过期时间
     """
-    return YOLO_MODEL_CACHE_EXPIRATION_TIME
\ No newline at end of file
+    return YOLO_MODEL_CACHE_EXPIRATION_TIME
+
+def get_task_log_buffer_max_lines():
+    """
+    获取任务日志环形缓冲区的最大行数
+    """
+    return TASK_LOG_BUFFER_MAX_LINES
+
+def get_task_event_buffer_max_events():
+    """
+    获取任务结构化事件缓冲区的最大事件数
+    """
+    return TASK_EVENT_BUFFER_MAX_EVENTS
+
+def get_progress_log_interval():
+    """
+    获取进度条写入日志的最小间隔（秒），0 表示每次刷新都写入
+    """
+    return max(0.0, PROGRESS_LOG_INTERVAL)
+
+def get_batch_event_interval():
+    """
+    获取训练 batch 进度事件的最小间隔（秒）
+    """
+    return max(0.0, BATCH_EVENT_INTERVAL)
+
+def get_worker_max_processes():
+    """
+    获取任务工作进程的最大并发数
+    """
+    return max(1, WORKER_MAX_PROCESSES)
+
+def get_jobs_db_path():
+    """
+    获取任务队列数据库路径
+    """
+    return JOBS_DB_PATH
+
+def get_metadata_db_path():
+    """
+    获取元数据索引数据库路径
+    """
+    return METADATA_DB_PATH
+
+def get_dataset_stats_db_path():
+    """
+    获取数据集统计缓存数据库路径
+    """
+    return DATASET_STATS_DB_PATH
+
+def get_worker_warm_idle_timeout():
+    """
+    获取常驻工作进程的空闲保留时间（秒）
+    """
+    return max(0.0, WORKER_WARM_IDLE_TIMEOUT)
+
+def get_model_cache_max_models():
+    """
+    获取每个进程的模型缓存最多保留的模型数
+    """
+    return max(1, MODEL_CACHE_MAX_MODELS)
+
+def get_model_cache_max_bytes():
+    """
+    获取每个进程的模型缓存内存预算（字节）
+    """
+    return max(0, MODEL_CACHE_MAX_MB) * 1024 * 1024
+
+def get_scheduler_max_jobs_per_gpu():
+    """
+    获取每张显卡同时运行的最大任务数
+    """
+    return max(1, SCHEDULER_MAX_JOBS_PER_GPU)
+
+def get_scheduler_max_cpu_jobs():
+    """
+    获取同时运行的最大 CPU 任务数
+    """
+    return max(1, SCHEDULER_MAX_CPU_JOBS)
+
+def get_result_log_compress():
+    """
+    获取任务结束后是否压缩结果日志文件
+    """
+    return RESULT_LOG_COMPRESS
+
+def get_dataset_extract_workers():
+    """
+    获取数据集压缩包并行解压线程数
+    """
+    return max(1, DATASET_EXTRACT_WORKERS)
+
+def get_upload_sessions_path():
+    """
+    获取分块上传会话存放路径
+    """
+    return UPLOAD_SESSIONS_PATH
+
+def get_test_batch_size():
+    """
+    获取批量测试默认推理 batch 大小
+    """
+    return max(1, TEST_BATCH_SIZE)
+
+def get_test_stream_max_frames():
+    """
+    获取视频流 / 摄像头测试默认最多处理的帧数
+    """
+    return max(1, TEST_STREAM_MAX_FRAMES)
+
+def get_predict_device():
+    """
+    获取同步预测接口使用的设备
+    """
+    return PREDICT_DEVICE
+
+def get_predict_devices():
+    """
+    获取同步预测接口允许使用的设备列表（总是包含默认设备）
+    """
+    devices = [PREDICT_DEVICE]
+    for device in PREDICT_DEVICES.split(","):
+        device = device.strip()
+        if device and device not in devices:
+            devices.append(device)
+    return devices
+
+def get_predict_max_batchers():
+    """
+    获取同步预测最多保留的合批器数
+    """
+    return max(1, PREDICT_MAX_BATCHERS)
+
+def get_predict_max_batch():
+    """
+    获取同步预测合批的最大图片数
+    """
+    return max(1, PREDICT_MAX_BATCH)
+
+def get_predict_max_wait_ms():
+    """
+    获取同步预测合批的最长等待时间（毫秒）
+    """
+    return max(0.0, PREDICT_MAX_WAIT_MS)
+
+def get_predict_max_images():
+    """
+    获取单次同步预测请求的最大图片数
+    """
+    return PREDICT_MAX_IMAGES
+
+def get_thumbnail_cache_path():
+    """
+    获取缩略图缓存路径
+    """
+    if not os.path.exists(THUMBNAIL_CACHE_PATH):
+        os.makedirs(THUMBNAIL_CACHE_PATH, exist_ok=True)
+
+    return THUMBNAIL_CACHE_PATH
+
+def get_thumbnail_max_edge():
+    """
+    获取缩略图默认最长边（像素）
+    """
+    return max(16, THUMBNAIL_MAX_EDGE)
+
+def get_thumbnail_format():
+    """
+    获取缩略图格式（webp / jpeg），无效值按 webp 处理
+    """
+    fmt = THUMBNAIL_FORMAT.lower()
+    return "jpeg" if fmt in ("jpg", "jpeg") else "webp"
+
+def get_thumbnail_quality():
+    """
+    获取缩略图编码质量（1-95）
+    """
+    return min(95, max(1, THUMBNAIL_QUALITY))
+
+def get_dataset_upload_chunk_size():
+    """
+    获取分块上传建议的块大小
+    """
+    return DATASET_UPLOAD_CHUNK_SIZE
+
+def get_upload_session_retention():
+    """
+    获取分块上传结束后会话状态的保留时间（秒）
+    """
+    return UPLOAD_SESSION_RETENTION
+
+def get_export_max_parallel():
+    """
+    获取多格式导出时并行的子进程数
+    """
+    return max(1, EXPORT_MAX_PARALLEL)
+
+def get_benchmark_warmup():
+    """
+    获取导出产物基准测试的默认预热次数
+    """
+    return max(0, BENCHMARK_WARMUP)
+
+def get_benchmark_iterations():
+    """
+    获取导出产物基准测试的默认计时次数
+    """
+    return max(1, BENCHMARK_ITERATIONS)
+
+def get_benchmark_max_iterations():
+    """
+    获取基准测试单个 batch 大小允许的最大计时次数
+    """
+    return BENCHMARK_MAX_ITERATIONS
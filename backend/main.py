@@ -1,5 +1,6 @@
 import os
 import sys
+import multiprocessing
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -39,4 +40,10 @@ app.register_blueprint(
 )
 
 if __name__ == '__main__':
+    # 工作进程使用 spawn 启动，打包（PyInstaller）后需要该调用
+    multiprocessing.freeze_support()
+    # 恢复上次退出时仍在排队的任务（debug 模式下仅在实际提供服务的 reloader 子进程中启动调度器）
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        from run_in_thread import get_scheduler
+        get_scheduler().start()
     app.run(debug=True, port=10799, host='0.0.0.0')
\ No newline at end of file
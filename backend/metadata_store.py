@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import yaml
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    task_id TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL DEFAULT -1,
+    data TEXT,
+    PRIMARY KEY (kind, path)
+);
+CREATE INDEX IF NOT EXISTS idx_records_task ON records (kind, task_id);
+CREATE TABLE IF NOT EXISTS collections (
+    kind TEXT PRIMARY KEY,
+    dir_mtime_ns INTEGER NOT NULL
+);
+"""
+
+RESULT_FILE_PATTERN = re.compile(r"^(.+)_\d+\.yaml$")
+
+logger = logging.getLogger(__name__)
+
+_COLLECTIONS = {}
+_store = None
+_store_lock = threading.Lock()
+
+def load_yaml_file(file_path):
+    """
+    读取 YAML 文件
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+def match_result_file(filename):
+    """
+    结果文件名形如 {task_id}_{timestamp}.yaml，返回其中的 task_id
+    """
+    match = RESULT_FILE_PATTERN.match(filename)
+    return match.group(1) if match else None
+
+def register_collection(kind, directory, match, load, task_id_of=None):
+    """
+    登记一类需要索引的元数据文件
+
+    - directory: 无参可调用对象，返回文件所在目录
+    - match: match(filename) -> task_id（文件名即可确定时）、""（需从内容中获取）或 None（不属于该类）
+    - load: load(path) -> dict，解析文件内容
+    - task_id_of: task_id_of(data) -> task_id，match 返回 "" 时用于从内容中获取 task_id
+    """
+    _COLLECTIONS[kind] = {
+        "directory": directory,
+        "match": match,
+        "load": load,
+        "task_id_of": task_id_of,
+    }
+
+def get_metadata_store():
+    """
+    获取全局元数据索引（首次调用时创建）
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            from config import get_metadata_db_path
+            _store = MetadataStore(get_metadata_db_path())
+        return _store
+
+class MetadataStore:
+    """
+    元数据索引
+
+    把任务配置、训练 / 测试 / 验证结果等 YAML 文件的解析结果按 (kind, task_id) 缓存在 SQLite 中，
+    查询时只需索引查找 + 对命中的文件做一次 stat（mtime 或大小变化时才重新解析）。
+    目录本身的 mtime 变化（有文件在 API 之外被新增或删除）时才会重新列目录做一次对账。
+    """
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(records)")}
+        if "size" not in columns:
+            # 旧版本的索引没有 size 列，默认值 -1 使已有记录在下次查询时重新解析
+            self._db.execute("ALTER TABLE records ADD COLUMN size INTEGER NOT NULL DEFAULT -1")
+        self._db.commit()
+
+    def query(self, kind, task_id=None):
+        """
+        查询某类记录，返回 [(path, data)]（按文件名排序）；task_id 为 None 时返回全部
+        """
+        with self._lock:
+            self._reconcile(kind)
+            if task_id is None:
+                rows = self._db.execute(
+                    "SELECT path, mtime_ns, size, data FROM records WHERE kind = ? ORDER BY path", (kind,)
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT path, mtime_ns, size, data FROM records WHERE kind = ? AND task_id = ? ORDER BY path", (kind, str(task_id))
+                ).fetchall()
+
+            results = []
+            for path, mtime_ns, size, data in rows:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    self._db.execute("DELETE FROM records WHERE kind = ? AND path = ?", (kind, path))
+                    continue
+                # mtime 精度较粗的文件系统上，同一时间片内的改写只能靠大小变化发现
+                if (st.st_mtime_ns, st.st_size) != (mtime_ns, size):
+                    data = self._index_file(kind, path)
+                    # 重新解析后 task_id 可能变化（如任务配置文件被改写）
+                    if task_id is not None and data is not None and self._task_id(kind, path, data) != str(task_id):
+                        continue
+                else:
+                    data = json.loads(data) if data is not None else None
+                if data is not None:
+                    results.append((path, data))
+            self._db.commit()
+            return results
+
+    def paths(self, kind, task_id=None):
+        """
+        仅返回匹配的文件路径
+        """
+        return [path for path, _ in self.query(kind, task_id)]
+
+    def upsert(self, kind, path):
+        """
+        文件写入后同步索引
+        """
+        with self._lock:
+            self._index_file(kind, os.path.abspath(path))
+            self._db.commit()
+
+    def remove(self, kind, path):
+        """
+        文件删除后同步索引
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM records WHERE kind = ? AND path = ?", (kind, os.path.abspath(path)))
+            self._db.commit()
+
+    def _task_id(self, kind, path, data):
+        spec = _COLLECTIONS[kind]
+        task_id = spec["match"](os.path.basename(path))
+        if task_id == "" and spec["task_id_of"] is not None and isinstance(data, dict):
+            task_id = spec["task_id_of"](data)
+        return None if task_id is None else str(task_id)
+
+    def _index_file(self, kind, path):
+        """
+        解析单个文件并写入索引；解析失败时记录为空，避免每次查询都重复解析
+        """
+        spec = _COLLECTIONS[kind]
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._db.execute("DELETE FROM records WHERE kind = ? AND path = ?", (kind, path))
+            return None
+
+        try:
+            data = spec["load"](path)
+        except Exception as e:
+            logger.warning(f"读取文件出错: {path}, 错误: {e}")
+            data = None
+
+        task_id = self._task_id(kind, path, data) if data is not None else None
+        self._db.execute(
+            "INSERT OR REPLACE INTO records (kind, path, task_id, mtime_ns, size, data) VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, path, task_id, st.st_mtime_ns, st.st_size, json.dumps(data, ensure_ascii=False, default=str) if data is not None else None),
+        )
+        return data
+
+    def _reconcile(self, kind):
+        """
+        目录 mtime 变化时与磁盘对账：补充新文件、删除已不存在的记录
+        """
+        spec = _COLLECTIONS[kind]
+        directory = os.path.abspath(spec["directory"]())
+        try:
+            dir_mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return
+
+        row = self._db.execute("SELECT dir_mtime_ns FROM collections WHERE kind = ?", (kind,)).fetchone()
+        if row is not None and row[0] == dir_mtime:
+            return
+
+        on_disk = set()
+        for entry in os.scandir(directory):
+            if entry.is_file() and spec["match"](entry.name) is not None:
+                on_disk.add(os.path.join(directory, entry.name))
+
+        indexed = {
+            path for (path,) in self._db.execute("SELECT path FROM records WHERE kind = ?", (kind,)).fetchall()
+        }
+        for path in indexed - on_disk:
+            self._db.execute("DELETE FROM records WHERE kind = ? AND path = ?", (kind, path))
+        for path in on_disk - indexed:
+            self._index_file(kind, path)
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO collections (kind, dir_mtime_ns) VALUES (?, ?)", (kind, dir_mtime)
+        )
+        self._db.commit()
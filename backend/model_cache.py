@@ -0,0 +1,117 @@
+import os
+import threading
+from collections import OrderedDict
+from config import get_model_cache_max_models, get_model_cache_max_bytes
+
+def _model_nbytes(model, model_path):
+    """
+    估算模型占用的内存：PyTorch 模型按参数与 buffer 计算，其他格式按权重文件大小
+    """
+    module = getattr(model, "model", None)
+    try:
+        params = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in params)
+    except Exception:
+        try:
+            return os.path.getsize(model_path)
+        except OSError:
+            return 0
+
+class ModelCache:
+    """
+    进程内的模型 LRU 缓存
+
+    以 (权重绝对路径, 修改时间, 设备) 为键缓存已加载的 YOLO 模型，权重文件被覆盖后自动重新加载；
+    超出模型数量或内存预算时淘汰最久未使用的模型。记录命中 / 未命中次数用于统计命中率。
+    """
+    def __init__(self, max_models=4, max_bytes=2 * 1024 ** 3, loader=None):
+        self.max_models = max(1, max_models)
+        self.max_bytes = max_bytes
+        self._loader = loader
+        self._models = OrderedDict()    # key -> (model, nbytes)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load(self, model_path):
+        if self._loader is not None:
+            return self._loader(model_path)
+        from ultralytics import YOLO
+        return YOLO(model_path)
+
+    def get(self, model_path, device=None, reset_state=True):
+        """
+        获取模型，未命中时加载并放入缓存
+
+        reset_state: 丢弃上次任务留下的 predictor（其中保存了上次 predict 的参数与输出目录），
+        权重本身仍然复用
+        """
+        model_path = os.path.abspath(model_path)
+        key = (model_path, os.stat(model_path).st_mtime_ns, str(device))
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                model = entry[0]
+                if reset_state and hasattr(model, "predictor"):
+                    model.predictor = None
+                return model
+            self.misses += 1
+
+            # 同一权重的旧版本不会再被命中，先行释放
+            for stale in [k for k in self._models if k[0] == model_path and k[2] == key[2]]:
+                self._evict(stale)
+
+            model = self._load(model_path)
+            nbytes = _model_nbytes(model, model_path)
+            self._models[key] = (model, nbytes)
+            self._bytes += nbytes
+            while len(self._models) > 1 and (len(self._models) > self.max_models or self._bytes > self.max_bytes):
+                self._evict(next(iter(self._models)))
+            return model
+
+    def _evict(self, key):
+        model, nbytes = self._models.pop(key)
+        self._bytes -= nbytes
+        self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "models": len(self._models),
+                "bytes": self._bytes,
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+            }
+
+_model_cache = None
+_model_cache_lock = threading.Lock()
+
+def get_model_cache():
+    """
+    获取当前进程的模型缓存（首次调用时创建）
+    """
+    global _model_cache
+    with _model_cache_lock:
+        if _model_cache is None:
+            _model_cache = ModelCache(get_model_cache_max_models(), get_model_cache_max_bytes())
+        return _model_cache
+
+def load_model(model_path, device=None, reset_state=True):
+    """
+    从当前进程的模型缓存中获取模型（未命中时加载）
+    """
+    return get_model_cache().get(model_path, device, reset_state)
@@ -1,66 +1,125 @@
-from threading import Thread
-import logging
 import os
-from ITraining.handlers import QueueHandler
-import queue
-from ITraining.train import main
-from IModel.test import test_model
-from IModel.validate import validate_model
-from IModel.export import export_model
+from ITraining.handlers import LogBuffer
+from worker_pool import TaskExecutor
+from scheduler import JobScheduler, detect_gpu_count
+from config import (
+    get_task_log_buffer_max_lines,
+    get_task_event_buffer_max_events,
+    get_worker_max_processes,
+    get_worker_warm_idle_timeout,
+    get_jobs_db_path,
+    get_scheduler_max_jobs_per_gpu,
+    get_scheduler_max_cpu_jobs,
+)
 
-def run_main_in_thread(taskfile_path, task_id, task_result_file_path):
+_executor = None
+_scheduler = None
+_restore_handlers = {}
+_finish_handlers = {}
+
+def get_executor():
     """
-    在新线程中运行 main，并捕获所有输出（stdout/stderr）
+    获取全局任务执行器（首次调用时创建）
     """
-    log_q = queue.Queue()
-    
-    logger = logging.getLogger(f"training-{taskfile_path}")
-    logger.setLevel(logging.INFO)
+    global _executor
+    if _executor is None:
+        _executor = TaskExecutor(max_workers=get_worker_max_processes(), warm_idle_timeout=get_worker_warm_idle_timeout())
+    return _executor
 
-    logger.handlers.clear()
+def get_scheduler():
+    """
+    获取全局任务调度器（首次调用时创建并注册各类任务）
+    """
+    global _scheduler
+    if _scheduler is None:
+        scheduler = JobScheduler(
+            get_jobs_db_path(),
+            get_executor(),
+            max_processes=get_worker_max_processes(),
+            gpu_count=detect_gpu_count(),
+            max_jobs_per_gpu=get_scheduler_max_jobs_per_gpu(),
+            max_cpu_jobs=get_scheduler_max_cpu_jobs(),
+        )
+        scheduler.register_kind("training", "ITraining.train:main", device_kwarg="assigned_device",
+                                start_msg="开始任务", end_msg="🎉 训练任务结束", error_msg="训练进程发生异常")
+        scheduler.register_kind("export", "IModel.export:export_model", device_kwarg="device",
+                                start_msg="开始任务", end_msg="🎉 导出任务结束", error_msg="导出进程发生异常", warm=True)
+        scheduler.register_kind("test", "IModel.test:test_model", device_kwarg="device",
+                                start_msg="开始任务", end_msg="🎉 测试任务结束", error_msg="测试进程发生异常", warm=True)
+        scheduler.register_kind("validation", "IModel.validate:validate_model", device_kwarg="device",
+                                start_msg="开始任务", end_msg="🎉 验证任务结束", error_msg="验证进程发生异常", warm=True)
+        # 基准测试要统计每个产物的峰值内存，使用全新进程而不是常驻进程
+        scheduler.register_kind("benchmark", "IModel.benchmark:benchmark_exports", device_kwarg="device",
+                                start_msg="开始任务", end_msg="🎉 基准测试任务结束", error_msg="基准测试进程发生异常")
+        for kind, handler in _restore_handlers.items():
+            scheduler.set_restore_handler(kind, handler)
+        for kind, handler in _finish_handlers.items():
+            scheduler.set_finish_handler(kind, handler)
+        _scheduler = scheduler
+    return _scheduler
 
-    q_handler = QueueHandler(log_q)
-    formatter = logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S")
-    q_handler.setFormatter(formatter)
-    logger.addHandler(q_handler)
+def register_restore_handler(kind, handler):
+    """
+    登记服务重启后恢复排队任务时的回调（路由模块导入时调用，不会创建调度器）
+    """
+    _restore_handlers[kind] = handler
+    if _scheduler is not None:
+        _scheduler.set_restore_handler(kind, handler)
 
-    # Persist export logs to file
-    try:
-        if output_dir:
-            export_dir = os.path.join(output_dir, "export")
-            os.makedirs(export_dir, exist_ok=True)
-            logfile = os.path.join(export_dir, f"{task_id}.log")
-            f_handler = logging.FileHandler(logfile, encoding="utf-8")
-            f_handler.setFormatter(formatter)
-            logger.addHandler(f_handler)
-    except Exception:
-        pass
+def register_finish_handler(kind, handler):
+    """
+    登记任务进入终态时的回调（路由模块导入时调用，不会创建调度器）
+    """
+    _finish_handlers[kind] = handler
+    if _scheduler is not None:
+        _scheduler.set_finish_handler(kind, handler)
 
-    # File log handler for persistence
-    try:
-        if output_dir:
-            export_dir = os.path.join(output_dir, "export")
-            os.makedirs(export_dir, exist_ok=True)
-            logfile = os.path.join(export_dir, f"{task_id}.log")
-            f_handler = logging.FileHandler(logfile, encoding="utf-8")
-            f_handler.setFormatter(formatter)
-            logger.addHandler(f_handler)
-    except Exception:
-        # Ignore file logging failures; still stream via queue
-        pass
+def device_request_from_config(config):
+    """
+    从训练任务配置（device / gpuCUDAIndex / gpuCUDANum）构造调度器的设备需求
+    """
+    device = config.get("device", "cpu")
+    request = {"device": device}
+    match device:
+        case "gpu":
+            request["gpuCUDAIndex"] = str(config.get("gpuCUDAIndex", "0"))
+        case "gpu_idlefirst":
+            request["gpuCUDANum"] = int(config.get("gpuCUDANum", 1))
+        case _:
+            pass
+    return request
 
-    def target():
-        try:
-            logger.info(f"开始任务: {taskfile_path}")
-            main(taskfile_path, logger=logger, task_id=task_id, task_result_file_path=task_result_file_path)
-            logger.info("🎉 训练任务结束")
-        except Exception as e:
-            logger.exception(f"训练线程发生异常: {e}")
+def device_request_from_str(device):
+    """
+    将导出接口的 device 参数（"cpu"、"mps"、"0"、"0,1"）转换为调度器的设备需求
+    """
+    device = str(device or "cpu").strip()
+    if device in ("cpu", "mps"):
+        return {"device": device}
+    return {"device": "gpu", "gpuCUDAIndex": device}
+
+def run_main_in_thread(taskfile_path, task_id, task_result_file_path, device_request=None, priority=0, meta=None):
+    """
+    提交训练任务到调度队列，在独立工作进程中运行 main，并捕获所有输出（stdout/stderr）；
+    训练回调上报的结构化事件写入 log_buffer.events
+    """
+    log_buffer = LogBuffer(get_task_log_buffer_max_lines(), get_task_event_buffer_max_events())
 
-    t = Thread(target=target, args=(), daemon=True)
-    t.start()
+    _, t, log_buffer = get_scheduler().submit(
+        "training",
+        taskfile_path,
+        {
+            "taskfile_path": taskfile_path,
+            "task_id": task_id,
+            "task_result_file_path": task_result_file_path,
+        },
+        device_request=device_request or {"device": "cpu"},
+        priority=priority,
+        meta=meta,
+        log_buffer=log_buffer,
+    )
 
-    return t, log_q
+    return t, log_buffer
 
 def run_modelexport_in_thread(task_id,
                               model_path,
@@ -74,104 +133,142 @@ def run_modelexport_in_thread(task_id,
                               device="cpu",
                               triton_repo_path=None,
                               triton_model_name=None,
-                              enable_triton=False):
+                              enable_triton=False,
+                              priority=0,
+                              meta=None):
     """
-    在新线程中运行模型导出（转换），并捕获所有输出（stdout/stderr）。
+    提交导出任务到调度队列，在独立工作进程中运行模型导出（转换），并捕获所有输出（stdout/stderr）。
+    日志同时持久化到 output_dir/export/{task_id}.log
     """
-    log_q = queue.Queue()
-
-    logger = logging.getLogger(f"export-{task_id}")
-    logger.setLevel(logging.INFO)
-
-    logger.handlers.clear()
+    log_buffer = LogBuffer(get_task_log_buffer_max_lines())
 
-    q_handler = QueueHandler(log_q)
-    formatter = logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S")
-    q_handler.setFormatter(formatter)
-    logger.addHandler(q_handler)
-
-    def target():
-        try:
-            logger.info(f"开始任务: {task_id}")
-            export_model(
-                model_path=model_path,
-                output_dir=output_dir,
-                result_file_path=result_file_path,
-                formats=formats,
-                imgsz=imgsz,
-                half=half,
-                simplify=simplify,
-                opset=opset,
-                device=device,
-                logger=logger,
-                task_id=task_id,
-                triton_repo_path=triton_repo_path,
-                triton_model_name=triton_model_name,
-                enable_triton=enable_triton,
-            )
-            logger.info("🎉 导出任务结束")
-        except Exception as e:
-            logger.exception(f"导出线程发生异常: {e}")
+    logfile = None
+    try:
+        if output_dir:
+            export_dir = os.path.join(output_dir, "export")
+            os.makedirs(export_dir, exist_ok=True)
+            logfile = os.path.join(export_dir, f"{task_id}.log")
+    except Exception:
+        # 日志文件不可用时仍通过缓冲区输出
+        logfile = None
 
-    t = Thread(target=target, args=(), daemon=True)
-    t.start()
+    _, t, log_buffer = get_scheduler().submit(
+        "export",
+        task_id,
+        {
+            "model_path": model_path,
+            "output_dir": output_dir,
+            "result_file_path": result_file_path,
+            "formats": formats,
+            "imgsz": imgsz,
+            "half": half,
+            "simplify": simplify,
+            "opset": opset,
+            "task_id": task_id,
+            "triton_repo_path": triton_repo_path,
+            "triton_model_name": triton_model_name,
+            "enable_triton": enable_triton,
+        },
+        device_request=device_request_from_str(device),
+        priority=priority,
+        meta=meta,
+        log_buffer=log_buffer,
+        logfile=logfile,
+    )
 
-    return t, log_q
+    return t, log_buffer
 
-def run_modeltest_in_thread(task_id, model_path, input_path, output_dir, result_file_path, test_type="image"):
+def run_benchmark_in_thread(export_key,
+                            model_path,
+                            output_dir,
+                            formats=None,
+                            batch_sizes=None,
+                            imgsz=640,
+                            warmup=3,
+                            iterations=20,
+                            priority=0,
+                            meta=None):
     """
-    在新线程中运行 ModelTest，并捕获所有输出（stdout/stderr）
+    提交导出产物基准测试任务到调度队列，在独立工作进程中（CPU）运行，并捕获所有输出（stdout/stderr）。
+    日志同时持久化到 output_dir/export/{export_key}.log，结果写回 export_history.json
     """
-    log_q = queue.Queue()
-    
-    logger = logging.getLogger(f"testing-{task_id}")
-    logger.setLevel(logging.INFO)
+    log_buffer = LogBuffer(get_task_log_buffer_max_lines())
 
-    logger.handlers.clear()
+    export_dir = os.path.join(output_dir, "export")
+    os.makedirs(export_dir, exist_ok=True)
+    logfile = os.path.join(export_dir, f"{export_key}.log")
 
-    q_handler = QueueHandler(log_q)
-    formatter = logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S")
-    q_handler.setFormatter(formatter)
-    logger.addHandler(q_handler)
+    _, t, log_buffer = get_scheduler().submit(
+        "benchmark",
+        export_key,
+        {
+            "model_path": model_path,
+            "output_dir": output_dir,
+            "export_key": export_key,
+            "formats": formats,
+            "batch_sizes": batch_sizes,
+            "imgsz": imgsz,
+            "warmup": warmup,
+            "iterations": iterations,
+        },
+        device_request={"device": "cpu"},
+        priority=priority,
+        meta=meta,
+        log_buffer=log_buffer,
+        logfile=logfile,
+    )
 
-    def target():
-        try:
-            logger.info(f"开始任务: {task_id}")
-            test_model(model_path, input_path, output_dir, result_file_path, test_type, logger=logger, task_id=task_id)
-            logger.info("🎉 测试任务结束")
-        except Exception as e:
-            logger.exception(f"测试线程发生异常: {e}")
+    return t, log_buffer
 
-    t = Thread(target=target, args=(), daemon=True)
-    t.start()
-
-    return t, log_q
-
-def run_modelval_in_thread(task_id, model_path, dataset_yaml_path, output_dir, result_file_path):
+def run_modeltest_in_thread(task_id, model_path, input_path, output_dir, result_file_path, test_type="image", priority=0, meta=None, batch_size=None, max_frames=None):
     """
-    在新线程中运行 Model Validation，并捕获所有输出（stdout/stderr）
+    提交测试任务到调度队列，在独立工作进程中运行 ModelTest，并捕获所有输出（stdout/stderr）
+    test_type 为 "batch" 时 input_path 可以是目录、通配符或 zip；为 "video" 时可以是视频文件、流地址或摄像头编号，
+    max_frames 限制处理的帧数；batch_size 为推理 batch 大小
     """
-    log_q = queue.Queue()
-
-    logger = logging.getLogger(f"validation-{task_id}")
-    logger.setLevel(logging.INFO)
+    log_buffer = LogBuffer(get_task_log_buffer_max_lines())
 
-    logger.handlers.clear()
+    _, t, log_buffer = get_scheduler().submit(
+        "test",
+        result_file_path,
+        {
+            "model_path": model_path,
+            "input_path": input_path,
+            "output_dir": output_dir,
+            "result_file_path": result_file_path,
+            "test_type": test_type,
+            "task_id": task_id,
+            "batch_size": batch_size,
+            "max_frames": max_frames,
+        },
+        device_request={"device": "auto"},
+        priority=priority,
+        meta=meta,
+        log_buffer=log_buffer,
+    )
 
-    q_handler = QueueHandler(log_q)
-    formatter = logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S")
-    q_handler.setFormatter(formatter)
-    logger.addHandler(q_handler)
+    return t, log_buffer
 
-    def target():
-        try:
-            logger.info(f"开始任务: {task_id}")
-            validate_model(model_path, dataset_yaml_path, output_dir, result_file_path, logger=logger, task_id=task_id)
-            logger.info("🎉 验证任务结束")
-        except Exception as e:
-            logger.exception(f"验证线程发生异常: {e}")
+def run_modelval_in_thread(task_id, model_path, dataset_yaml_path, output_dir, result_file_path, priority=0, meta=None):
+    """
+    提交验证任务到调度队列，在独立工作进程中运行 Model Validation，并捕获所有输出（stdout/stderr）
+    """
+    log_buffer = LogBuffer(get_task_log_buffer_max_lines())
 
-    t = Thread(target=target, args=(), daemon=True)
-    t.start()
+    _, t, log_buffer = get_scheduler().submit(
+        "validation",
+        result_file_path,
+        {
+            "model_path": model_path,
+            "dataset_yaml_path": dataset_yaml_path,
+            "output_dir": output_dir,
+            "result_file_path": result_file_path,
+            "task_id": task_id,
+        },
+        device_request={"device": "auto"},
+        priority=priority,
+        meta=meta,
+        log_buffer=log_buffer,
+    )
 
-    return t, log_q
\ No newline at end of file
+    return t, log_buffer
@@ -0,0 +1,408 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from ITraining.handlers import LogBuffer
+from worker_pool import TaskHandle
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_DONE = "done"
+JOB_STATUS_FAILED = "failed"
+JOB_STATUS_CANCELLED = "cancelled"
+JOB_STATUS_INTERRUPTED = "interrupted"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    job_key TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    kwargs TEXT NOT NULL,
+    device_request TEXT NOT NULL,
+    assigned_device TEXT,
+    meta TEXT,
+    created_at INTEGER NOT NULL,
+    started_at INTEGER,
+    finished_at INTEGER,
+    exitcode INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, priority DESC, id);
+"""
+
+def detect_gpu_count():
+    """
+    探测可用的 CUDA 设备数量（可通过环境变量 YOLO_TVP_GPU_COUNT 覆盖）
+    """
+    env_count = os.environ.get("YOLO_TVP_GPU_COUNT")
+    if env_count is not None:
+        try:
+            return max(0, int(env_count))
+        except ValueError:
+            pass
+    try:
+        import torch
+        return int(torch.cuda.device_count())
+    except Exception:
+        return 0
+
+class JobScheduler:
+    """
+    持久化任务队列与调度器
+
+    任务写入 SQLite（重启后排队中的任务会继续执行），按优先级从高到低、同优先级先进先出调度。
+    调度时根据任务的设备需求分配具体的 CUDA 编号或 CPU 槽位：
+    - gpu: 使用指定的 gpuCUDAIndex，全部空闲时才启动
+    - gpu_idlefirst: 选择负载最低的 gpuCUDANum 张卡
+    - auto: 有空闲 GPU 时使用 GPU，否则占用 CPU 槽位
+    - cpu / mps: 占用对应槽位
+    """
+    def __init__(self, db_path, executor, max_processes=2, gpu_count=0, max_jobs_per_gpu=1, max_cpu_jobs=1, poll_interval=1.0):
+        self.executor = executor
+        self.max_processes = max(1, max_processes)
+        self.gpu_count = gpu_count
+        self.max_jobs_per_gpu = max(1, max_jobs_per_gpu)
+        self.max_cpu_jobs = max(1, max_cpu_jobs)
+        self.poll_interval = poll_interval
+
+        self._kinds = {}
+        self._jobs = {}         # job_id -> {"handle", "log", "resources"}
+        self._gpu_load = {}     # CUDA 编号 -> 运行中任务数
+        self._slot_load = {"cpu": 0, "mps": 0}
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._started = False
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def register_kind(self, kind, target, device_kwarg="device",
+                      start_msg="开始任务", end_msg="任务结束", error_msg="任务发生异常", warm=False):
+        """
+        注册一种任务类型
+
+        - target: 工作进程中执行的函数，形如 "ITraining.train:main"
+        - device_kwarg: 调度分配到的设备以该参数名传给 target
+        - warm: 在常驻工作进程中运行，复用进程内已加载的模型
+        """
+        with self._lock:
+            self._kinds[kind] = {
+                "target": target,
+                "device_kwarg": device_kwarg,
+                "on_restore": None,
+                "on_finish": None,
+                "start_msg": start_msg,
+                "end_msg": end_msg,
+                "error_msg": error_msg,
+                "warm": warm,
+            }
+
+    def set_restore_handler(self, kind, on_restore):
+        """
+        on_restore(job, handle, log_buffer)：服务重启后恢复排队中的任务时回调，
+        供路由层把任务重新登记到各自的任务表中以便查询日志
+        """
+        with self._lock:
+            self._kinds[kind]["on_restore"] = on_restore
+
+    def set_finish_handler(self, kind, on_finish):
+        """
+        on_finish(job, status)：任务进入终态（done / failed / cancelled / interrupted）后回调（不持有调度锁），
+        供任务类型在自己的结果记录中写入最终状态（如工作进程被终止时任务自身来不及写入）
+        """
+        with self._lock:
+            self._kinds[kind]["on_finish"] = on_finish
+
+    def _notify_finished(self, finished):
+        for job, status in finished:
+            spec = self._kinds.get(job["kind"])
+            if spec and spec["on_finish"]:
+                try:
+                    spec["on_finish"](job, status)
+                except Exception:
+                    logger.exception(f"任务 #{job['id']} 结束回调出错")
+
+    def _job(self, job_id):
+        return self._row_to_job(self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def start(self):
+        """
+        启动调度线程（重复调用无副作用）；上次退出时仍在运行的任务标记为 interrupted
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            interrupted = [
+                (self._row_to_job(row), JOB_STATUS_INTERRUPTED)
+                for row in self._db.execute("SELECT * FROM jobs WHERE status = ?", (JOB_STATUS_RUNNING,)).fetchall()
+            ]
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE status = ?",
+                (JOB_STATUS_INTERRUPTED, int(time.time()), JOB_STATUS_RUNNING),
+            )
+            self._db.commit()
+            for row in self._db.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (JOB_STATUS_QUEUED,)).fetchall():
+                job = self._row_to_job(row)
+                if job["kind"] not in self._kinds:
+                    continue
+                log_buffer = LogBuffer()
+                handle = self._attach(job, log_buffer)
+                log_buffer.put(f"[QUEUE] 服务重启后恢复排队中的任务 #{job['id']}")
+                on_restore = self._kinds[job["kind"]]["on_restore"]
+                if on_restore:
+                    try:
+                        on_restore(job, handle, log_buffer)
+                    except Exception as e:
+                        log_buffer.put(f"[QUEUE] 恢复任务登记失败: {e}")
+
+        self._notify_finished(interrupted)
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, kind, job_key, kwargs, device_request=None, priority=0, meta=None, log_buffer=None, logfile=None):
+        """
+        提交任务到队列，返回 (job_id, handle, log_buffer)
+        handle.is_alive() 在排队和运行期间均为 True
+        """
+        if kind not in self._kinds:
+            raise ValueError(f"未注册的任务类型: {kind}")
+        self.start()
+
+        if device_request is None:
+            device_request = {"device": "auto"}
+        if log_buffer is None:
+            log_buffer = LogBuffer()
+        if logfile:
+            kwargs = dict(kwargs)
+            kwargs["__logfile"] = logfile
+
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO jobs (kind, job_key, priority, status, kwargs, device_request, meta, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, job_key, int(priority), JOB_STATUS_QUEUED, json.dumps(kwargs, ensure_ascii=False),
+                 json.dumps(device_request, ensure_ascii=False), json.dumps(meta or {}, ensure_ascii=False), int(time.time())),
+            )
+            self._db.commit()
+            job = self._row_to_job(self._db.execute("SELECT * FROM jobs WHERE id = ?", (cur.lastrowid,)).fetchone())
+            handle = self._attach(job, log_buffer)
+            log_buffer.put(f"[QUEUE] 任务 #{job['id']} 已进入队列（优先级 {job['priority']}，设备需求 {device_request}）")
+
+        self._wakeup.set()
+        return job["id"], handle, log_buffer
+
+    def cancel(self, job_id):
+        """
+        取消任务：排队中的直接移出队列，运行中的终止工作进程
+        """
+        finished = []
+        with self._lock:
+            row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] not in (JOB_STATUS_QUEUED, JOB_STATUS_RUNNING):
+                return False
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?",
+                (JOB_STATUS_CANCELLED, int(time.time()), job_id),
+            )
+            self._db.commit()
+            entry = self._jobs.get(job_id)
+            if entry:
+                entry["handle"].terminate()
+                entry["log"].put(f"[QUEUE] 任务 #{job_id} 已取消")
+                if row["status"] == JOB_STATUS_QUEUED:
+                    entry["handle"]._done.set()
+                    self._jobs.pop(job_id, None)
+            # 运行中的任务在工作进程退出后由 _reap 回调
+            if row["status"] == JOB_STATUS_QUEUED:
+                finished.append((self._job(job_id), JOB_STATUS_CANCELLED))
+        self._notify_finished(finished)
+        self._wakeup.set()
+        return True
+
+    def list_jobs(self, status=None, limit=200):
+        """
+        列出任务（按 id 倒序）
+        """
+        with self._lock:
+            if status:
+                rows = self._db.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)).fetchall()
+            else:
+                rows = self._db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def get_resources(self):
+        """
+        当前资源占用情况
+        """
+        with self._lock:
+            return {
+                "gpu_count": self.gpu_count,
+                "max_jobs_per_gpu": self.max_jobs_per_gpu,
+                "max_cpu_jobs": self.max_cpu_jobs,
+                "max_processes": self.max_processes,
+                "gpu_load": {str(k): v for k, v in sorted(self._gpu_load.items())},
+                "slot_load": dict(self._slot_load),
+                "running": sum(1 for e in self._jobs.values() if e["resources"] is not None),
+            }
+
+    def _row_to_job(self, row):
+        job = dict(row)
+        job["kwargs"] = json.loads(job["kwargs"])
+        job["device_request"] = json.loads(job["device_request"])
+        job["meta"] = json.loads(job["meta"] or "{}")
+        return job
+
+    def _attach(self, job, log_buffer):
+        handle = TaskHandle()
+        handle.job_id = job["id"]
+        self._jobs[job["id"]] = {"handle": handle, "log": log_buffer, "resources": None}
+        return handle
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                self._tick()
+            except Exception:
+                logger.exception("任务调度出错")
+
+    def _tick(self):
+        with self._lock:
+            finished = self._reap()
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY priority DESC, id",
+                (JOB_STATUS_QUEUED,),
+            ).fetchall()
+            for row in rows:
+                job = self._row_to_job(row)
+                if job["id"] not in self._jobs:
+                    continue
+                allocation = self._allocate(job["device_request"])
+                if allocation is None:
+                    # 资源不足时继续尝试后面的任务，让需求更小的任务先跑满空闲设备
+                    continue
+                self._launch(job, *allocation)
+        self._notify_finished(finished)
+
+    def _reap(self):
+        """
+        回收已结束的任务并释放资源，返回 [(job, 最终状态)]
+        """
+        finished = []
+        for job_id, entry in list(self._jobs.items()):
+            if entry["resources"] is None or entry["handle"].is_alive():
+                continue
+            self._release(entry["resources"])
+            self._jobs.pop(job_id, None)
+            exitcode = entry["handle"].exitcode
+            status = JOB_STATUS_DONE if exitcode == 0 else JOB_STATUS_FAILED
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, exitcode = ? WHERE id = ? AND status = ?",
+                (status, int(time.time()), exitcode, job_id, JOB_STATUS_RUNNING),
+            )
+            # 已取消的任务保持 cancelled
+            job = self._job(job_id)
+            finished.append((job, job["status"]))
+        self._db.commit()
+        return finished
+
+    def _running_count(self):
+        return sum(1 for e in self._jobs.values() if e["resources"] is not None)
+
+    def _gpu_free(self, index):
+        return self._gpu_load.get(index, 0) < self.max_jobs_per_gpu
+
+    def _allocate(self, request):
+        """
+        根据设备需求分配资源，返回 (assigned_device, resources)；资源不足时返回 None
+        """
+        if self._running_count() >= self.max_processes:
+            return None
+
+        device = str(request.get("device", "cpu"))
+        if device == "gpu":
+            try:
+                indices = [int(i) for i in str(request.get("gpuCUDAIndex", "0")).split(",") if str(i).strip() != ""]
+            except ValueError:
+                indices = [0]
+            if not all(self._gpu_free(i) for i in indices):
+                return None
+            return ",".join(str(i) for i in indices), [("gpu", i) for i in indices]
+
+        if device == "gpu_idlefirst":
+            num = max(1, int(request.get("gpuCUDANum", 1)))
+            if self.gpu_count < num:
+                # 探测不到足够的显卡时沿用原有行为，交给 Ultralytics 自动选择空闲显卡
+                return ",".join(["-1"] * num), []
+            free = sorted((i for i in range(self.gpu_count) if self._gpu_free(i)), key=lambda i: (self._gpu_load.get(i, 0), i))
+            if len(free) < num:
+                return None
+            chosen = sorted(free[:num])
+            return ",".join(str(i) for i in chosen), [("gpu", i) for i in chosen]
+
+        if device == "auto":
+            free = sorted((i for i in range(self.gpu_count) if self._gpu_free(i)), key=lambda i: (self._gpu_load.get(i, 0), i))
+            if free:
+                return str(free[0]), [("gpu", free[0])]
+            if self._slot_load["cpu"] < self.max_cpu_jobs:
+                return "cpu", [("slot", "cpu")]
+            return None
+
+        slot = "mps" if device == "mps" else "cpu"
+        limit = self.max_jobs_per_gpu if slot == "mps" else self.max_cpu_jobs
+        if self._slot_load[slot] >= limit:
+            return None
+        return slot, [("slot", slot)]
+
+    def _acquire(self, resources):
+        for kind, key in resources:
+            if kind == "gpu":
+                self._gpu_load[key] = self._gpu_load.get(key, 0) + 1
+            else:
+                self._slot_load[key] += 1
+
+    def _release(self, resources):
+        for kind, key in resources:
+            if kind == "gpu":
+                self._gpu_load[key] = max(0, self._gpu_load.get(key, 0) - 1)
+            else:
+                self._slot_load[key] = max(0, self._slot_load[key] - 1)
+
+    def _launch(self, job, assigned_device, resources):
+        spec = self._kinds[job["kind"]]
+        entry = self._jobs[job["id"]]
+
+        kwargs = dict(job["kwargs"])
+        logfile = kwargs.pop("__logfile", None)
+        if spec["device_kwarg"]:
+            kwargs[spec["device_kwarg"]] = assigned_device
+
+        self._acquire(resources)
+        entry["resources"] = resources
+        self._db.execute(
+            "UPDATE jobs SET status = ?, assigned_device = ?, started_at = ? WHERE id = ?",
+            (JOB_STATUS_RUNNING, assigned_device, int(time.time()), job["id"]),
+        )
+        self._db.commit()
+        entry["log"].put(f"[QUEUE] 任务 #{job['id']} 开始运行，分配设备: {assigned_device}")
+
+        self.executor.submit(
+            spec["target"],
+            kwargs,
+            entry["log"],
+            logger_name=f"{job['kind']}-{job['job_key']}",
+            start_msg=f"{spec['start_msg']}: {job['job_key']}",
+            end_msg=spec["end_msg"],
+            error_msg=spec["error_msg"],
+            logfile=logfile,
+            handle=entry["handle"],
+            warm=spec["warm"],
+        )
@@ -1,18 +1,84 @@
 import sys
+import time
 import logging
 
 class StreamToLogger:
-    def __init__(self, logger, log_level=logging.INFO, log_cache=None):
+    """
+    将 stdout/stderr 的输出逐行写入 logger
+
+    以 \\r 原地刷新的进度条（tqdm）只保留最新状态，按 progress_interval 节流写入，
+    进度条结束（换行）时再写入最终状态，避免每次刷新都产生一行日志。
+    """
+    def __init__(self, logger, log_level=logging.INFO, log_cache=None, progress_interval=None):
+        if progress_interval is None:
+            from config import get_progress_log_interval
+            progress_interval = get_progress_log_interval()
         self.logger = logger
         self.log_level = log_level
         self.linebuf = ''
         self.log_cache = log_cache if log_cache is not None else []
+        self.progress_interval = progress_interval
+        self._progress = None
+        self._last_progress = None
+        self._last_progress_at = 0.0
+
+    def _emit(self, line):
+        line = line.rstrip()
+        if not line.strip():
+            return
+        self.logger.log(self.log_level, line)
+        self.log_cache.append(line)
+
+    def _emit_progress(self, text):
+        if text != self._last_progress:
+            self._emit(text)
+            self._last_progress = text
+        self._last_progress_at = time.monotonic()
 
     def write(self, buf):
-        for line in buf.rstrip().splitlines():
-            line = line.rstrip()
-            self.logger.log(self.log_level, line)
-            self.log_cache.append(line)
+        if not buf:
+            return
+        *lines, self.linebuf = (self.linebuf + buf).split("\n")
+
+        for line in lines:
+            if "\r" in line:
+                # 进度条结束：写入最终状态
+                segments = [s for s in line.split("\r") if s.strip()]
+                text = segments[-1] if segments else self._progress
+                if text:
+                    self._emit_progress(text)
+                self._progress = None
+                self._last_progress = None
+            else:
+                self._emit(line)
+
+        if "\r" in self.linebuf:
+            # 只保留最后一次刷新的内容，缓冲区不随刷新次数增长
+            head, _, current = self.linebuf.rpartition("\r")
+            if current.strip():
+                self._progress = current
+            else:
+                segments = [s for s in head.split("\r") if s.strip()]
+                if segments:
+                    self._progress = segments[-1]
+            self.linebuf = "\r" + current
+            if self._progress and time.monotonic() - self._last_progress_at >= self.progress_interval:
+                self._emit_progress(self._progress)
 
     def flush(self):
-        pass
\ No newline at end of file
+        # 进度条的刷新由 write 节流处理，这里只输出未换行的普通文本
+        if self.linebuf and "\r" not in self.linebuf:
+            self._emit(self.linebuf)
+            self.linebuf = ''
+
+    def close(self):
+        """
+        输出缓冲区中剩余的内容（包括尚未写入的进度条状态）
+        """
+        if "\r" in self.linebuf:
+            if self._progress:
+                self._emit_progress(self._progress)
+        elif self.linebuf:
+            self._emit(self.linebuf)
+        self.linebuf = ''
+        self._progress = None
@@ -0,0 +1,91 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# 后端模块以 backend/ 为根目录导入（与 main.py 的运行方式一致）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    本地替身 HTTP 服务：server.files 为路径到内容的映射，server.failures 为路径在返回内容前
+    依次返回的状态码，server.truncated 中的路径只发送一半内容后断开；请求记录在 server.seen 中
+    """
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, head):
+        srv = self.server
+        with srv.lock:
+            srv.seen.append((self.command, self.path, self.headers.get("Authorization")))
+            status = None
+            if not head and srv.failures.get(self.path):
+                status = srv.failures[self.path].pop(0)
+            srv.inflight += 1
+            srv.max_inflight = max(srv.max_inflight, srv.inflight)
+        try:
+            time.sleep(srv.delay)
+            body = srv.files.get(self.path)
+            if status is None and body is None:
+                status = 404
+            if status is not None:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if head:
+                return
+            if self.path in srv.truncated:
+                # 声明的长度大于实际发送的内容后断开连接
+                self.wfile.write(body[: len(body) // 2])
+                self.close_connection = True
+                return
+            self.wfile.write(body)
+        finally:
+            with srv.lock:
+                srv.inflight -= 1
+
+    def do_GET(self):
+        self._respond(head=False)
+
+    def do_HEAD(self):
+        self._respond(head=True)
+
+
+def _start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.files = {}
+    server.failures = {}
+    server.truncated = set()
+    server.seen = []
+    server.delay = 0
+    server.inflight = 0
+    server.max_inflight = 0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def server():
+    srv = _start_server()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def other_server():
+    srv = _start_server()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
@@ -0,0 +1,16 @@
+"""
+调度器测试在工作进程中运行的任务函数
+"""
+import time
+
+
+def succeed(logger=None, device=None):
+    logger.info("ok")
+
+
+def crash(logger=None, device=None):
+    raise RuntimeError("boom")
+
+
+def sleep(seconds=30, logger=None, device=None):
+    time.sleep(seconds)
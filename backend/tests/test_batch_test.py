@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+
+import pytest
+
+from IModel.batch_source import collect_batch_images, write_batch_source_list
+from IModel.test import run_batch_test
+
+
+class FakeResult:
+    def __init__(self, path, batch_len):
+        self.path = path
+        # 与 Ultralytics 一致：单张耗时为整个 batch 的耗时均分
+        self.speed = {"preprocess": 1.0 / batch_len, "inference": 10.0 / batch_len, "postprocess": 1.0 / batch_len}
+        self.boxes = None
+        self.probs = None
+        self.names = {}
+
+
+class FakeModel:
+    """
+    按 .txt 清单与 batch 参数分批产出结果，记录每批的大小
+    """
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, source, stream, batch, **kwargs):
+        assert isinstance(source, str) and source.endswith(".txt")
+        with open(source, encoding="utf-8") as f:
+            paths = f.read().splitlines()
+        for i in range(0, len(paths), batch):
+            chunk = paths[i:i + batch]
+            self.batches.append(len(chunk))
+            for path in chunk:
+                yield FakeResult(path, len(chunk))
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    folder = tmp_path / "images"
+    folder.mkdir()
+    for i in range(5):
+        (folder / f"{i}.jpg").write_bytes(b"jpg")
+    return folder
+
+
+def test_batch_test_streams_in_batch_size_chunks(tmp_path, image_dir):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    model = FakeModel()
+
+    run_batch_test(model, str(image_dir), str(output_dir), str(output_dir / "result.yaml"), 2, "cpu", logging.getLogger("test"))
+
+    assert model.batches == [2, 2, 1]
+    with open(output_dir / "predictions.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [os.path.basename(r["image"]) for r in records] == [f"{i}.jpg" for i in range(5)]
+
+
+def test_source_list_is_batched_by_ultralytics_loader(tmp_path, image_dir):
+    pytest.importorskip("cv2")
+    loaders = pytest.importorskip("ultralytics.data.loaders")
+    from PIL import Image
+
+    for path in image_dir.iterdir():
+        Image.new("RGB", (32, 32)).save(path)
+    list_path = write_batch_source_list(collect_batch_images(str(image_dir), str(tmp_path / "t")), str(tmp_path / "source.txt"))
+
+    dataset = loaders.LoadImagesAndVideos(list_path, batch=2)
+    assert [len(paths) for paths, _, _ in dataset] == [2, 2, 1]
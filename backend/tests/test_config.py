@@ -0,0 +1,24 @@
+import logging
+
+from config import env_float, env_int
+
+
+def test_env_numbers(monkeypatch):
+    monkeypatch.setenv("YOLO_TVP_TEST_INT", "7")
+    monkeypatch.setenv("YOLO_TVP_TEST_FLOAT", "0.5")
+    monkeypatch.delenv("YOLO_TVP_TEST_MISSING", raising=False)
+
+    assert env_int("YOLO_TVP_TEST_INT", 2) == 7
+    assert env_float("YOLO_TVP_TEST_FLOAT", 1.0) == 0.5
+    assert env_int("YOLO_TVP_TEST_MISSING", 2) == 2
+
+
+def test_invalid_env_number_falls_back_with_warning(monkeypatch, caplog):
+    monkeypatch.setenv("YOLO_TVP_WORKER_MAX_PROCESSES", "two")
+    monkeypatch.setenv("YOLO_TVP_PREDICT_MAX_WAIT_MS", "5ms")
+
+    with caplog.at_level(logging.WARNING, logger="config"):
+        assert env_int("YOLO_TVP_WORKER_MAX_PROCESSES", 2) == 2
+        assert env_float("YOLO_TVP_PREDICT_MAX_WAIT_MS", 5) == 5
+    assert "YOLO_TVP_WORKER_MAX_PROCESSES" in caplog.text
+    assert "YOLO_TVP_PREDICT_MAX_WAIT_MS" in caplog.text
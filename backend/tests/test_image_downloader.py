@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from IDataset.image_downloader import ImageDownloader
+
+
+def _downloader(**kwargs):
+    kwargs.setdefault("backoff_factor", 0.01)
+    kwargs.setdefault("timeout", 5)
+    return ImageDownloader(**kwargs)
+
+
+def test_download_all_concurrent(server, tmp_path):
+    server.delay = 0.05
+    items = []
+    for i in range(20):
+        server.files[f"/img/{i}.jpg"] = f"image-{i}".encode() * 100
+        items.append((f"{server.url}/img/{i}.jpg", str(tmp_path / f"{i}.jpg")))
+
+    with _downloader(max_workers=8) as downloader:
+        result = downloader.download_all(items)
+
+    assert result == {"downloaded": 20, "skipped": 0, "failed": []}
+    for i in range(20):
+        assert (tmp_path / f"{i}.jpg").read_bytes() == f"image-{i}".encode() * 100
+    assert server.max_inflight > 1
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_retries_transient_status(server, tmp_path, status):
+    server.files["/a.jpg"] = b"payload"
+    server.failures["/a.jpg"] = [status, status]
+    dest = tmp_path / "a.jpg"
+
+    with _downloader(retries=3) as downloader:
+        assert downloader.download(f"{server.url}/a.jpg", str(dest)) == "downloaded"
+
+    assert dest.read_bytes() == b"payload"
+    assert [m for m, p, _ in server.seen if p == "/a.jpg"].count("GET") == 3
+
+
+def test_gives_up_after_retries(server, tmp_path):
+    server.files["/a.jpg"] = b"payload"
+    server.failures["/a.jpg"] = [503] * 10
+
+    with _downloader(retries=2) as downloader:
+        result = downloader.download_all([(f"{server.url}/a.jpg", str(tmp_path / "a.jpg"))])
+
+    assert result["downloaded"] == 0 and len(result["failed"]) == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_skip_existing_size(server, tmp_path):
+    server.files["/same.jpg"] = b"0123456789"
+    server.files["/changed.jpg"] = b"new content"
+    (tmp_path / "same.jpg").write_bytes(b"abcdefghij")
+    (tmp_path / "changed.jpg").write_bytes(b"old")
+
+    with _downloader(skip_existing="size") as downloader:
+        result = downloader.download_all([
+            (f"{server.url}/same.jpg", str(tmp_path / "same.jpg")),
+            (f"{server.url}/changed.jpg", str(tmp_path / "changed.jpg")),
+        ])
+
+    assert result == {"downloaded": 1, "skipped": 1, "failed": []}
+    # 大小一致时不重新下载
+    assert (tmp_path / "same.jpg").read_bytes() == b"abcdefghij"
+    assert (tmp_path / "changed.jpg").read_bytes() == b"new content"
+    assert ("GET", "/same.jpg", None) not in server.seen
+
+
+def test_part_file_removed_on_failure(server, tmp_path):
+    server.files["/broken.jpg"] = b"x" * 100000
+    server.truncated.add("/broken.jpg")
+    dest = tmp_path / "broken.jpg"
+
+    with _downloader(retries=0) as downloader:
+        with pytest.raises(Exception):
+            downloader.download(f"{server.url}/broken.jpg", str(dest))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_authorization_only_sent_to_base_url(server, other_server, tmp_path):
+    server.files["/data/upload/1/a.jpg"] = b"local"
+    other_server.files["/b.jpg"] = b"external"
+    headers = {"Authorization": "Token secret"}
+
+    with _downloader(base_url=server.url, base_url_headers=headers) as downloader:
+        result = downloader.download_all([
+            ("/data/upload/1/a.jpg", str(tmp_path / "a.jpg")),
+            (f"{other_server.url}/b.jpg", str(tmp_path / "b.jpg")),
+        ])
+
+    assert result["downloaded"] == 2
+    assert {auth for _, _, auth in server.seen} == {"Token secret"}
+    assert {auth for _, _, auth in other_server.seen} == {None}
+
+
+def test_headers_for_compares_origin():
+    downloader = _downloader(base_url="http://ls.local:8080", base_url_headers={"Authorization": "Token x"})
+    try:
+        assert downloader._headers_for("http://ls.local:8080/data/a.jpg") == {"Authorization": "Token x"}
+        assert downloader._headers_for("http://ls.local:80801/a.jpg") is None
+        assert downloader._headers_for("http://ls.local:8080.evil.com/a.jpg") is None
+        assert downloader._headers_for("https://ls.local:8080/a.jpg") is None
+    finally:
+        downloader.close()
@@ -0,0 +1,83 @@
+import pytest
+
+from tools.label_scanner import MAX_CLASS_ID, find_label_files, scan_label_files
+
+LABEL_FILES = {
+    "a.txt": "0 0.5 0.5 0.1 0.1\n1 0.2 0.2 0.1 0.1\n0 0.3 0.3 0.1 0.1\n",
+    "blank_lines.txt": "\n2 0.5 0.5 0.1 0.1\n\n   \n1 0.1 0.1 0.1 0.1",
+    "float_ids.txt": "0.0 0.5 0.5 0.1 0.1\n2.0 0.5 0.5 0.1 0.1\n  1.0\t0.5 0.5 0.1 0.1\n",
+    "malformed.txt": "cat 0.5 0.5 0.1 0.1\n-1 0.5 0.5 0.1 0.1\ninf 0.1\n1 0.5 0.5 0.1 0.1\n",
+    "out_of_range.txt": "3 0.5 0.5 0.1 0.1\n7 0.5 0.5 0.1 0.1\n2 0.5 0.5 0.1 0.1\n",
+    "empty.txt": "",
+    "crlf.txt": "1 0.5 0.5 0.1 0.1\r\n1 0.5 0.5 0.1 0.1\r\n",
+}
+
+
+def reference_counts(paths, num_classes):
+    """
+    逐文件 readlines() 的朴素统计，类别字段按 Ultralytics 的方式 int(float(x)) 解析
+    """
+    upper = num_classes if num_classes is not None else MAX_CLASS_ID + 1
+    label_count = 0
+    instances, images = {}, {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            lines = f.readlines()
+        label_count += len(lines)
+        seen = set()
+        for line in lines:
+            parts = line.split()
+            if not parts:
+                continue
+            try:
+                cls = int(float(parts[0]))
+            except (ValueError, OverflowError):
+                continue
+            if 0 <= cls < upper:
+                instances[cls] = instances.get(cls, 0) + 1
+                seen.add(cls)
+        for cls in seen:
+            images[cls] = images.get(cls, 0) + 1
+
+    length = num_classes if num_classes is not None else max(instances, default=-1) + 1
+    return label_count, [instances.get(i, 0) for i in range(length)], [images.get(i, 0) for i in range(length)]
+
+
+@pytest.fixture
+def label_paths(tmp_path):
+    for name, content in LABEL_FILES.items():
+        (tmp_path / name).write_bytes(content.encode("utf-8"))
+    return sorted(find_label_files(tmp_path))
+
+
+@pytest.mark.parametrize("num_classes", [None, 3, 1])
+@pytest.mark.parametrize("chunk_size", [512, 2])
+def test_scan_matches_readlines_counts(label_paths, num_classes, chunk_size):
+    label_count, instances, images = reference_counts(label_paths, num_classes)
+
+    result = scan_label_files(label_paths, num_classes=num_classes, chunk_size=chunk_size)
+
+    assert result["num_files"] == len(LABEL_FILES)
+    assert result["label_count"] == label_count
+    assert result["instances_per_class"] == instances
+    assert result["images_per_class"] == images
+
+
+def test_per_file_counts(label_paths, tmp_path):
+    files = scan_label_files(label_paths, num_classes=3, per_file=True)["files"]
+
+    assert files[str(tmp_path / "empty.txt")] == {"num_labels": 0, "class_counts": {}}
+    assert files[str(tmp_path / "blank_lines.txt")] == {"num_labels": 5, "class_counts": {1: 1, 2: 1}}
+    assert files[str(tmp_path / "out_of_range.txt")] == {"num_labels": 3, "class_counts": {2: 1}}
+
+
+def test_non_finite_numeric_ids_are_ignored(tmp_path):
+    # 整批都是数值时走 NumPy 的浮点转换路径
+    path = tmp_path / "numeric.txt"
+    path.write_text("inf 0.1\n1 0.5 0.5 0.1 0.1\n1e30 0.1\nnan 0.1\n-inf 0.1\n", encoding="utf-8")
+
+    result = scan_label_files([str(path)])
+
+    assert result["label_count"] == 5
+    assert result["instances_per_class"] == [0, 1]
+    assert result["images_per_class"] == [0, 1]
@@ -0,0 +1,134 @@
+import json
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from IDataset.process_annotation_projects import (
+    HashSplitter,
+    annotations_to_boxes,
+    boxes_to_yolo,
+    write_yolo_labels,
+)
+
+
+def _box(label, x, y, w, h):
+    return {"x": x, "y": y, "width": w, "height": h, "rectanglelabels": [label]}
+
+
+def _export(rows):
+    return pd.DataFrame({
+        "image": [image for image, _ in rows],
+        "object": [obj if isinstance(obj, str) or obj is None else json.dumps(obj) for _, obj in rows],
+    })
+
+
+def test_annotations_to_boxes_flattens_rows():
+    df = _export([
+        ('["http://ls/data/upload/1/cat.jpg"]', [_box("cat", 10, 20, 30, 40), _box("dog", 0, 0, 50, 50)]),
+        ("http://ls/data/upload/1/empty.png", []),
+        ("http://ls/data/upload/1/bad.png", "not json"),
+        ("http://ls/data/upload/1/dog.png", str([_box("dog", 5, 5, 10, 10)])),   # Python 字面量写法
+    ])
+
+    boxes = annotations_to_boxes(df)
+
+    assert list(boxes.columns) == ["row", "image", "pre_name", "label", "x", "y", "width", "height"]
+    assert boxes["pre_name"].tolist() == ["cat", "cat", "dog"]
+    assert boxes["label"].tolist() == ["cat", "dog", "dog"]
+    assert boxes["image"].iloc[0] == "http://ls/data/upload/1/cat.jpg"
+    assert boxes[["x", "y", "width", "height"]].iloc[0].tolist() == [10, 20, 30, 40]
+
+
+def test_annotations_to_boxes_drops_incomplete_boxes():
+    df = _export([
+        ("http://ls/a.jpg", [{"x": 1, "y": 1, "width": 1, "height": 1}, _box("cat", "oops", 1, 1, 1), _box("cat", 1, 2, 3, 4)]),
+    ])
+
+    boxes = annotations_to_boxes(df)
+
+    assert len(boxes) == 1 and boxes["x"].iloc[0] == 1
+
+
+def test_annotations_to_boxes_empty_input():
+    assert annotations_to_boxes(pd.DataFrame()).empty
+    assert annotations_to_boxes(pd.DataFrame({"image": ["http://ls/a.jpg"]})).empty
+
+
+def test_boxes_to_yolo_converts_percent_boxes():
+    boxes = annotations_to_boxes(_export([
+        ("http://ls/a.jpg", [_box("cat", 10, 20, 30, 40), _box("bird", 0, 0, 10, 10), _box("dog", 90, 90, 20, 20)]),
+    ]))
+
+    yolo = boxes_to_yolo(boxes, ["cat", "dog"])
+
+    assert yolo["class_id"].tolist() == [0, 1]
+    assert yolo.iloc[0][["cx", "cy", "w", "h"]].tolist() == pytest.approx([0.25, 0.4, 0.3, 0.4])
+    # 超出图片的框裁剪到 [0, 1]
+    assert yolo.iloc[1][["cx", "cy", "w", "h"]].tolist() == pytest.approx([1.0, 1.0, 0.2, 0.2])
+
+
+def test_boxes_to_yolo_keeps_last_row_per_image():
+    boxes = annotations_to_boxes(_export([
+        ("http://ls/a.jpg", [_box("cat", 0, 0, 10, 10)]),
+        ("http://ls/a.jpg", [_box("dog", 0, 0, 20, 20), _box("dog", 50, 50, 20, 20)]),
+    ]))
+
+    yolo = boxes_to_yolo(boxes, ["cat", "dog"])
+
+    assert yolo["class_id"].tolist() == [1, 1]
+
+
+def test_write_yolo_labels_groups_by_image(tmp_path):
+    yolo = pd.DataFrame({
+        "pre_name": ["a", "b", "a"],
+        "class_id": [0, 1, 2],
+        "cx": [0.5, 0.1, 0.25],
+        "cy": [0.5, 0.2, 0.75],
+        "w": [1.0, 0.3, 0.5],
+        "h": [1.0, 0.4, 0.5],
+    })
+
+    assert write_yolo_labels(yolo, str(tmp_path)) == 2
+    assert (tmp_path / "a.txt").read_text() == "0 0.500000 0.500000 1.000000 1.000000\n2 0.250000 0.750000 0.500000 0.500000"
+    assert (tmp_path / "b.txt").read_text() == "1 0.100000 0.200000 0.300000 0.400000"
+    assert write_yolo_labels(yolo.iloc[0:0], str(tmp_path)) == 0
+
+
+def test_hash_splitter_is_stable_and_order_independent():
+    keys = [f"img_{i}" for i in range(2000)]
+    first = HashSplitter((0.8, 0.2, 0.0), seed=7)
+    second = HashSplitter((0.8, 0.2, 0.0), seed=7)
+
+    forward = {k: first.assign(k) for k in keys}
+    backward = {k: second.assign(k) for k in reversed(keys)}
+
+    assert forward == backward
+    counts = Counter(forward.values())
+    assert counts["test"] == 0
+    assert 0.75 < counts["train"] / len(keys) < 0.85
+    assert HashSplitter((0.8, 0.2, 0.0), seed=8).hash_split("img_1") in ("train", "val")
+
+
+def test_hash_splitter_seed_changes_assignment():
+    keys = [f"img_{i}" for i in range(200)]
+    a = [HashSplitter((0.5, 0.5, 0.0), seed=1).hash_split(k) for k in keys]
+    b = [HashSplitter((0.5, 0.5, 0.0), seed=2).hash_split(k) for k in keys]
+    assert a != b
+
+
+def test_hash_splitter_stratify_balances_each_class():
+    splitter = HashSplitter((0.7, 0.2, 0.1), seed=3, stratify=True)
+    assignments = Counter()
+    for i in range(300):
+        assignments[(i % 3, splitter.assign(f"img_{i}", stratum=i % 3))] += 1
+
+    for stratum in range(3):
+        assert assignments[(stratum, "train")] == pytest.approx(70, abs=2)
+        assert assignments[(stratum, "val")] == pytest.approx(20, abs=2)
+        assert assignments[(stratum, "test")] == pytest.approx(10, abs=2)
+
+
+def test_hash_splitter_continues_existing_counts():
+    splitter = HashSplitter((0.5, 0.5, 0.0), stratify=True, counts={"cat": {"train": 10}})
+    assert [splitter.assign(f"k{i}", stratum="cat") for i in range(5)] == ["val"] * 5
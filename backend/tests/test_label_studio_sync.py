@@ -0,0 +1,63 @@
+import json
+import os
+
+import pandas as pd
+
+import IDataset.process_annotation_projects as pap
+from IDataset.ls_sync_state import LabelStudioSyncState
+
+
+def _box(label, x, y, w, h):
+    return {"x": x, "y": y, "width": w, "height": h, "rectanglelabels": [label]}
+
+
+def _dataset(tmp_path, base_url):
+    dataset_dir = str(tmp_path / "dataset")
+    os.makedirs(dataset_dir)
+    with LabelStudioSyncState(dataset_dir) as state:
+        state.set_meta("project_id", 1)
+        state.set_meta("base_url", base_url)
+        state.set_meta("class_names", ["cat"])
+        state.set_meta("class_names_fixed", True)
+        state.set_meta("splits", [1.0, 0.0, 0.0])
+        state.set_meta("split_strategy", "hash")
+        state.commit()
+    return dataset_dir
+
+
+def _serve_export(monkeypatch, rows):
+    """
+    用给定的任务行代替 Label Studio 的 CSV 导出
+    """
+    def spool(project_id, save_dir, export_type, base_url, token):
+        path = os.path.join(save_dir, ".ls_export_test.csv")
+        pd.DataFrame(rows).to_csv(path, index=False)
+        return path
+    monkeypatch.setattr(pap, "_spool_export", spool)
+
+
+def test_sync_removes_image_when_task_loses_all_boxes(tmp_path, monkeypatch, server):
+    server.files["/data/upload/1/a.jpg"] = b"a"
+    server.files["/data/upload/1/b.jpg"] = b"b"
+    dataset_dir = _dataset(tmp_path, server.url)
+    images = os.path.join(dataset_dir, "images", "train")
+    labels = os.path.join(dataset_dir, "labels", "train")
+
+    _serve_export(monkeypatch, [
+        {"id": 1, "image": "/data/upload/1/a.jpg", "object": json.dumps([_box("cat", 10, 10, 20, 20)])},
+        {"id": 2, "image": "/data/upload/1/b.jpg", "object": json.dumps([_box("cat", 30, 30, 20, 20)])},
+    ])
+    stats = pap.sync_dataset_from_label_studio(dataset_dir)
+    assert stats["added"] == 2
+    assert sorted(os.listdir(images)) == ["a.jpg", "b.jpg"]
+
+    # 任务 2 的标注被全部删除
+    _serve_export(monkeypatch, [
+        {"id": 1, "image": "/data/upload/1/a.jpg", "object": json.dumps([_box("cat", 10, 10, 20, 20)])},
+        {"id": 2, "image": "/data/upload/1/b.jpg", "object": "[]"},
+    ])
+    stats = pap.sync_dataset_from_label_studio(dataset_dir)
+
+    assert stats["removed"] == 1 and stats["unchanged"] == 1
+    assert os.listdir(images) == ["a.jpg"]
+    assert os.listdir(labels) == ["a.txt"]
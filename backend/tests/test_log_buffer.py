@@ -0,0 +1,62 @@
+import threading
+
+from ITraining.handlers import LogBuffer
+
+
+def _filled(count, max_lines=5):
+    buf = LogBuffer(max_lines=max_lines, max_events=0)
+    for i in range(count):
+        buf.put(f"line {i}")
+    return buf
+
+
+def test_read_from_start():
+    buf = _filled(3)
+
+    assert buf.read() == (["line 0", "line 1", "line 2"], 3, False)
+    assert buf.read(0) == (["line 0", "line 1", "line 2"], 3, False)
+
+
+def test_read_from_returned_cursor():
+    buf = _filled(2)
+    _, cursor, _ = buf.read(0)
+
+    assert buf.read(cursor) == ([], 2, False)
+    buf.put("line 2")
+    buf.put("line 3")
+    assert buf.read(cursor) == (["line 2", "line 3"], 4, False)
+    assert buf.read(1) == (["line 1", "line 2", "line 3"], 4, False)
+
+
+def test_cursor_dropped_from_ring_resumes_at_oldest_line():
+    buf = _filled(8, max_lines=5)
+
+    # 序号 0-2 已被丢弃，只保留 3-7
+    assert buf.read(1) == (["line 3", "line 4", "line 5", "line 6", "line 7"], 8, True)
+    assert buf.read(3) == (["line 3", "line 4", "line 5", "line 6", "line 7"], 8, False)
+    assert buf.read(6) == (["line 6", "line 7"], 8, False)
+
+
+def test_cursor_ahead_of_head_is_reset():
+    buf = _filled(8, max_lines=5)
+
+    # 例如服务重启后客户端带着旧游标重连
+    assert buf.read(20) == (["line 3", "line 4", "line 5", "line 6", "line 7"], 8, True)
+
+
+def test_wait_returns_when_new_line_arrives():
+    buf = _filled(1)
+    assert not buf.wait(1, timeout=0.01)
+
+    threading.Timer(0.05, buf.put, args=("line 1",)).start()
+    assert buf.wait(1, timeout=5)
+    assert buf.read(1) == (["line 1"], 2, False)
+
+
+def test_events_buffer():
+    buf = LogBuffer(max_lines=5, max_events=2)
+    for i in range(3):
+        buf.events.put({"epoch": i})
+
+    assert buf.events.read(0) == ([{"epoch": 1}, {"epoch": 2}], 3, True)
+    assert buf.read() == ([], 0, False)
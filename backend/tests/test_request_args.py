@@ -0,0 +1,26 @@
+import pytest
+
+from tools.request_args import parse_priority, parse_bool
+
+
+@pytest.mark.parametrize("value, expected", [(None, 0), ("", 0), (0, 0), (5, 5), ("-3", -3), ("10", 10)])
+def test_parse_priority(value, expected):
+    assert parse_priority(value) == expected
+
+
+@pytest.mark.parametrize("value", ["high", "1.5", [1], {}])
+def test_parse_priority_rejects_non_integers(value):
+    assert parse_priority(value) is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, True), (True, True), (False, False), (1, True), (0, False),
+    ("true", True), ("False", False), ("1", True), ("0", False), ("no", False), ("", False),
+])
+def test_parse_bool(value, expected):
+    assert parse_bool(value, default=True) is expected
+
+
+@pytest.mark.parametrize("value", ["maybe", 2, 0.5, []])
+def test_parse_bool_rejects_unknown_values(value):
+    assert parse_bool(value) is None
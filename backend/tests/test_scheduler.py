@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import JobScheduler
+from worker_pool import TaskExecutor
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    executor = TaskExecutor(max_workers=2, warm_idle_timeout=0)
+    sched = JobScheduler(str(tmp_path / "jobs.db"), executor, max_processes=2, gpu_count=0, max_cpu_jobs=1, poll_interval=0.05)
+    sched.finished = []
+    sched.finished_event = threading.Event()
+    for kind, target in [("ok", "succeed"), ("crash", "crash"), ("sleep", "sleep")]:
+        sched.register_kind(kind, f"scheduler_targets:{target}")
+
+        def on_finish(job, status):
+            sched.finished.append((job["job_key"], status))
+            sched.finished_event.set()
+
+        sched.set_finish_handler(kind, on_finish)
+    yield sched
+    executor.shutdown()
+
+
+def _wait_finished(sched, key, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for job_key, status in sched.finished:
+            if job_key == key:
+                return status
+        sched.finished_event.wait(0.1)
+        sched.finished_event.clear()
+    raise AssertionError(f"{key} 未结束")
+
+
+def _job_status(sched, job_id):
+    return next(job["status"] for job in sched.list_jobs() if job["id"] == job_id)
+
+
+def test_successful_job_is_done(scheduler):
+    job_id, _, _ = scheduler.submit("ok", "a", {}, device_request={"device": "cpu"})
+    assert _wait_finished(scheduler, "a") == "done"
+    assert _job_status(scheduler, job_id) == "done"
+
+
+def test_crashed_job_is_failed(scheduler):
+    job_id, _, log = scheduler.submit("crash", "b", {}, device_request={"device": "cpu"})
+    assert _wait_finished(scheduler, "b") == "failed"
+    assert _job_status(scheduler, job_id) == "failed"
+
+
+def test_cancel_queued_and_running_jobs(scheduler):
+    running_id, running, _ = scheduler.submit("sleep", "running", {}, device_request={"device": "cpu"})
+    # 只有一个 CPU 槽位，第二个任务保持排队
+    queued_id, _, _ = scheduler.submit("sleep", "queued", {}, device_request={"device": "cpu"})
+    deadline = time.monotonic() + 30
+    while running.process is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert scheduler.cancel(queued_id)
+    assert _wait_finished(scheduler, "queued") == "cancelled"
+    assert scheduler.cancel(running_id)
+    assert _wait_finished(scheduler, "running") == "cancelled"
+    assert _job_status(scheduler, running_id) == "cancelled"
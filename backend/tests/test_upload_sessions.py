@@ -0,0 +1,62 @@
+import io
+import os
+import threading
+
+import pytest
+
+from IDataset.upload_sessions import UploadSessionStore
+
+
+class BlockingStream(io.BytesIO):
+    """
+    读取第一块数据前阻塞，模拟仍在传输中的数据块请求
+    """
+    def __init__(self, data):
+        super().__init__(data)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def read(self, size=-1):
+        self.started.set()
+        self.release.wait(5)
+        return super().read(size)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadSessionStore(str(tmp_path / "sessions"), retention=600)
+
+
+def _create(store, tmp_path, size=8):
+    return store.create(str(tmp_path / "dataset"), "dataset.zip", size, {})
+
+
+def test_transition_waits_for_inflight_chunk(store, tmp_path):
+    session = _create(store, tmp_path)
+    stream = BlockingStream(b"abcdefgh")
+    writer = threading.Thread(target=session.write_chunk, args=(0, stream, 8))
+    writer.start()
+    stream.started.wait(5)
+
+    assert not session.try_transition("uploading", "extracting")
+    stream.release.set()
+    writer.join(5)
+    assert session.is_complete()
+    assert session.try_transition("uploading", "extracting")
+    with pytest.raises(ValueError):
+        session.write_chunk(0, io.BytesIO(b"x"), 1)
+
+
+def test_terminal_session_is_removed(store, tmp_path):
+    session = _create(store, tmp_path)
+    session_file = os.path.join(store.sessions_dir, f"{session.upload_id}.json")
+    assert os.path.exists(session_file)
+
+    session.set_status("done")
+    assert not os.path.exists(session_file)
+    # 保留期内仍可查询最终状态
+    assert store.get(session.upload_id).status == "done"
+
+    store.retention = 0
+    session.finished_at -= 1
+    assert store.get(session.upload_id) is None
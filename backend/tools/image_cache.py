@@ -0,0 +1,115 @@
+import hashlib
+import mimetypes
+import os
+import threading
+from flask import send_file
+from config import get_thumbnail_cache_path, get_thumbnail_max_edge, get_thumbnail_format, get_thumbnail_quality
+
+# 缩略图最长边上限，避免任意尺寸请求撑大缓存
+THUMBNAIL_MAX_EDGE_LIMIT = 4096
+
+# 格式 -> (Pillow 格式名, MIME, 扩展名)
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+}
+
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+def parse_thumbnail_args(args):
+    """
+    解析缩略图查询参数，返回 (max_edge, fmt)；max_edge 为 None 表示返回原图
+    Query: thumbnail（1 表示使用默认最长边）, maxEdge（指定最长边，优先）, format（webp / jpeg）
+    """
+    max_edge = args.get("maxEdge", None, type=int)
+    if max_edge is None and args.get("thumbnail", "0") in ("1", "true"):
+        max_edge = get_thumbnail_max_edge()
+    if max_edge is not None:
+        max_edge = None if max_edge <= 0 else min(max(16, max_edge), THUMBNAIL_MAX_EDGE_LIMIT)
+
+    fmt = (args.get("format") or get_thumbnail_format()).lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in THUMBNAIL_FORMATS:
+        fmt = get_thumbnail_format()
+    return max_edge, fmt
+
+def _lock_for(key):
+    with _key_locks_guard:
+        lock = _key_locks.get(key)
+        if lock is None:
+            lock = _key_locks[key] = threading.Lock()
+        return lock
+
+def _render_thumbnail(src, dst, max_edge, fmt):
+    from PIL import Image
+
+    pil_format = THUMBNAIL_FORMATS[fmt][0]
+    with Image.open(src) as img:
+        # JPEG 可在解码阶段直接按比例缩小，大图生成缩略图时开销小得多
+        img.draft("RGB", (max_edge, max_edge))
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if pil_format == "JPEG" and img.mode != "RGB":
+            if img.mode in ("RGBA", "LA", "P"):
+                rgba = img.convert("RGBA")
+                img = Image.new("RGB", rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.split()[-1])
+            else:
+                img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+
+        tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            img.save(tmp, pil_format, quality=get_thumbnail_quality())
+            os.replace(tmp, dst)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+def get_thumbnail(src, max_edge, fmt):
+    """
+    获取图片的缩略图路径，首次请求时用 Pillow 生成并缓存到磁盘
+
+    缓存键包含源文件路径、修改时间与大小，源文件变化后自动生成新的缩略图；
+    原图最长边不超过 max_edge 时直接返回原图路径。
+    """
+    from PIL import Image
+
+    src = os.path.abspath(src)
+    st = os.stat(src)
+    key = hashlib.sha1(f"{src}\0{st.st_mtime_ns}\0{st.st_size}\0{max_edge}\0{fmt}".encode("utf-8")).hexdigest()
+    dst_dir = os.path.join(get_thumbnail_cache_path(), key[:2])
+    dst = os.path.join(dst_dir, key + THUMBNAIL_FORMATS[fmt][2])
+    if os.path.exists(dst):
+        return dst
+
+    with Image.open(src) as img:
+        if max(img.size) <= max_edge:
+            return src
+
+    with _lock_for(key):
+        if not os.path.exists(dst):
+            os.makedirs(dst_dir, exist_ok=True)
+            _render_thumbnail(src, dst, max_edge, fmt)
+    with _key_locks_guard:
+        _key_locks.pop(key, None)
+    return dst
+
+def send_image(path, max_edge=None, fmt=None):
+    """
+    以二进制返回图片，max_edge 不为空时返回缓存的缩略图
+
+    ETag / Last-Modified 条件请求（304）与 Range 请求（206）由 send_file 处理；
+    浏览器缓存图片但每次使用前校验 ETag，文件未变化时不再重复传输。
+    """
+    if max_edge:
+        path = get_thumbnail(path, max_edge, fmt or get_thumbnail_format())
+    mime_type, _ = mimetypes.guess_type(path)
+    if path.endswith(".webp"):
+        mime_type = "image/webp"
+    response = send_file(path, mimetype=mime_type or "application/octet-stream", conditional=True, etag=True)
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    return response
@@ -0,0 +1,186 @@
+import os
+import re
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+
+# 每行第一个字段为类别 ID（空行自然不会匹配）
+_CLASS_ID_PATTERN = re.compile(rb"^[ \t]*([^\s]+)", re.M)
+# 未指定类别数时允许的最大类别 ID，防止异常数据导致 bincount 分配过大的数组
+MAX_CLASS_ID = 65535
+
+def find_label_files(label_dir, recursive=False, with_stat=False):
+    """
+    使用 os.scandir 列出目录下的 .txt 标签文件
+
+    - recursive: 是否递归子目录
+    - with_stat: 为 True 时返回 {路径: stat}，否则返回路径列表
+    """
+    found = {}
+    stack = [str(label_dir)]
+    while stack:
+        current = stack.pop()
+        try:
+            it = os.scandir(current)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                elif entry.name.lower().endswith(".txt") and entry.is_file():
+                    found[entry.path] = entry.stat() if with_stat else None
+    return found if with_stat else list(found)
+
+def _count_lines(data):
+    """
+    行数（与 readlines() 的计数一致）
+    """
+    if not data:
+        return 0
+    return data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+
+def _parse_class_ids(tokens):
+    """
+    用 NumPy 批量把类别字段转换为整数 ID，无法解析的字段记为 -1
+    """
+    if not tokens:
+        return np.empty(0, dtype=np.int64)
+    arr = np.array(tokens)
+    try:
+        return arr.astype(np.int64)
+    except ValueError:
+        pass
+    try:
+        values = arr.astype(np.float64)
+    except ValueError:
+        values = None
+    if values is not None:
+        # inf / nan 以及超出 int64 的数值直接转换的结果未定义，与 int(float(x)) 失败时一样记为 -1
+        ids = np.full(len(tokens), -1, dtype=np.int64)
+        finite = np.isfinite(values) & (np.abs(values) < 2 ** 62)
+        ids[finite] = values[finite].astype(np.int64)
+        return ids
+
+    ids = np.full(len(tokens), -1, dtype=np.int64)
+    for i, token in enumerate(tokens):
+        try:
+            ids[i] = int(float(token))
+        except (ValueError, OverflowError):
+            continue
+    return ids
+
+def _scan_chunk(paths, num_classes, per_file):
+    """
+    统计一批标签文件（线程 / 进程池中执行）
+
+    先批量读取整批文件并收集每行第一个字段，再一次性交给 NumPy 转换与计数，
+    避免逐文件创建数组的开销。
+    """
+    read_paths = []
+    line_counts = []
+    tokens = []
+    token_counts = []
+
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        file_tokens = _CLASS_ID_PATTERN.findall(data)
+        read_paths.append(path)
+        line_counts.append(_count_lines(data))
+        tokens.extend(file_tokens)
+        token_counts.append(len(file_tokens))
+
+    file_count = len(read_paths)
+    ids = _parse_class_ids(tokens)
+    file_idx = np.repeat(np.arange(file_count, dtype=np.int64), token_counts)
+
+    upper = num_classes if num_classes is not None else MAX_CLASS_ID + 1
+    valid = (ids >= 0) & (ids < upper)
+    ids, file_idx = ids[valid], file_idx[valid]
+
+    minlength = num_classes or 0
+    instances = np.bincount(ids, minlength=minlength)
+    # 每个 (文件, 类别) 组合只计一次，得到包含该类别的图片数
+    width = int(ids.max()) + 1 if len(ids) else 1
+    pairs, pair_counts = np.unique(file_idx * width + ids, return_counts=True)
+    images = np.bincount(pairs % width, minlength=minlength)
+
+    files = {}
+    if per_file:
+        for path, num_lines in zip(read_paths, line_counts):
+            files[path] = {"num_labels": num_lines, "class_counts": {}}
+        for pair, count in zip(pairs.tolist(), pair_counts.tolist()):
+            files[read_paths[pair // width]]["class_counts"][pair % width] = count
+
+    return {
+        "num_files": file_count,
+        "label_count": sum(line_counts),
+        "instances": instances,
+        "images": images,
+        "files": files,
+    }
+
+def _merge_counts(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    a = a.copy()
+    a[:len(b)] += b
+    return a
+
+def scan_label_files(paths, num_classes=None, per_file=False, workers=None, use_processes=False, chunk_size=512):
+    """
+    并行统计 YOLO 标签文件
+
+    - num_classes: 指定时只统计 [0, num_classes) 内的类别 ID
+    - per_file: 是否返回每个文件的统计结果
+    - use_processes: 使用进程池（文件数量极大、解析成为瓶颈时）；默认使用线程池
+
+    返回 dict：
+    - num_files: 成功读取的文件数
+    - label_count: 总行数（与逐个 readlines() 计数一致）
+    - instances_per_class: 各类别实例数（list，下标为类别 ID）
+    - images_per_class: 各类别出现过的文件（图片）数
+    - files: per_file 为 True 时为 {路径: {"num_labels", "class_counts"}}
+    """
+    paths = list(paths)
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+    if len(chunks) <= 1:
+        results = [_scan_chunk(chunk, num_classes, per_file) for chunk in chunks]
+    elif use_processes:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_scan_chunk, chunks, [num_classes] * len(chunks), [per_file] * len(chunks)))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_scan_chunk, chunks, [num_classes] * len(chunks), [per_file] * len(chunks)))
+
+    empty = np.zeros(num_classes or 0, dtype=np.int64)
+    instances, images = empty, empty
+    num_files = 0
+    label_count = 0
+    files = {}
+    for result in results:
+        num_files += result["num_files"]
+        label_count += result["label_count"]
+        instances = _merge_counts(instances, result["instances"])
+        images = _merge_counts(images, result["images"])
+        files.update(result["files"])
+
+    return {
+        "num_files": num_files,
+        "label_count": label_count,
+        "instances_per_class": instances.tolist(),
+        "images_per_class": images.tolist(),
+        "files": files,
+    }
+
+def scan_label_dir(label_dir, num_classes=None, recursive=True, **kwargs):
+    """
+    统计目录下所有标签文件，参数与返回值同 scan_label_files
+    """
+    return scan_label_files(find_label_files(label_dir, recursive=recursive), num_classes=num_classes, **kwargs)
@@ -0,0 +1,32 @@
+def parse_priority(value):
+    """
+    解析请求中的任务优先级：缺省（None / 空字符串）为 0，非整数时返回 None
+    """
+    if value is None or value == "":
+        return 0
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+FALSE_VALUES = ("0", "false", "no", "off", "")
+
+def parse_bool(value, default=False):
+    """
+    解析请求中的布尔开关：接受 JSON 布尔值、0 / 1 以及 "true" / "false"、"1" / "0" 等字符串，
+    缺省（None）时返回 default，无法识别时返回 None
+    """
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+    return None
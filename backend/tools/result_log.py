@@ -0,0 +1,107 @@
+import gzip
+import itertools
+import os
+import shutil
+
+def result_log_path(result_file_path):
+    """
+    结果文件对应的日志文件路径：{task_id}_{timestamp}.yaml -> {task_id}_{timestamp}.log
+    """
+    return os.path.splitext(result_file_path)[0] + ".log"
+
+class ResultLogFile:
+    """
+    只追加的任务日志文件
+
+    提供与 list.append 相同的接口，可直接作为 StreamToLogger 的 log_cache 使用，
+    日志逐行落盘，不再整体写入结果 YAML。
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._f = open(path, "a", encoding="utf-8", buffering=1)
+
+    def append(self, line):
+        if not self._f.closed:
+            self._f.write(f"{line}\n")
+
+    def close(self):
+        self._f.close()
+
+def finalize_result_log(log_file):
+    """
+    任务结束时关闭日志文件；开启压缩时转存为 .log.gz，返回最终路径
+    """
+    from config import get_result_log_compress
+
+    log_file.close()
+    path = log_file.path
+    if not get_result_log_compress() or not os.path.exists(path):
+        return path
+
+    gz_path = f"{path}.gz"
+    try:
+        with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+        return gz_path
+    except OSError:
+        return path
+
+def read_result_log(path, since=0, limit=None):
+    """
+    按行读取日志文件（支持 .gz）
+
+    返回 (lines, next, eof)：
+    - lines: 第 since 行起的至多 limit 行
+    - next: 下一次读取应携带的游标
+    - eof: 是否已读到文件末尾
+    """
+    since = max(0, since or 0)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        stop = None if limit is None else since + limit
+        lines = [line.rstrip("\n") for line in itertools.islice(f, since, stop)]
+        eof = limit is None or len(lines) < limit or f.readline() == ""
+    return lines, since + len(lines), eof
+
+def remove_result_log(result_file_path):
+    """
+    删除结果文件对应的日志文件（含压缩版本）
+    """
+    path = result_log_path(result_file_path)
+    for candidate in (path, f"{path}.gz"):
+        if os.path.exists(candidate):
+            os.remove(candidate)
+
+def strip_embedded_log(data):
+    """
+    旧版本把完整日志写在结果 YAML 的 log 字段中，索引 / 列表中只保留标记，日志通过单独的接口读取
+    """
+    if isinstance(data, dict) and isinstance(data.get("log"), list):
+        data.pop("log")
+        data["logEmbedded"] = True
+    return data
+
+def get_result_log(result_file_path, data, since=0, limit=None, load=None):
+    """
+    读取某条结果记录的日志，返回值同 read_result_log
+
+    - data: 索引中的结果数据（logFile 指向日志文件）
+    - load: 旧版本记录（日志内嵌在 YAML 中）时用于重新读取原始结果文件
+    """
+    log_file = data.get("logFile")
+    if log_file:
+        # 任务结束后可能已被压缩
+        for candidate in (log_file, f"{log_file}.gz"):
+            if os.path.exists(candidate):
+                return read_result_log(candidate, since, limit)
+
+    since = max(0, since or 0)
+    if data.get("logEmbedded") and load is not None:
+        lines = (load(result_file_path) or {}).get("log") or []
+        stop = None if limit is None else since + limit
+        lines = [str(line) for line in lines[since:stop]]
+        return lines, since + len(lines), limit is None or len(lines) < limit
+
+    return [], since, True
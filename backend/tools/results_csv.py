@@ -0,0 +1,114 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+
+# 最多同时缓存的 results.csv 数量
+RESULTS_CSV_CACHE_SIZE = 64
+
+class ResultsCsvTail:
+    """
+    增量读取 Ultralytics 训练输出的 results.csv
+
+    记录已读到的字节偏移，每次只读取新增部分并解析为浮点数行缓存在内存中；
+    末尾未写完的行留到下次读取，文件被截断或替换（inode 变化）时从头重新读取。
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._offset = 0
+        self._inode = None
+        self.columns = []
+        self.rows = []
+
+    @staticmethod
+    def _parse_value(value):
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        return None if math.isnan(number) or math.isinf(number) else number
+
+    def refresh(self):
+        """
+        读取文件新增的内容，返回新增的行数
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset()
+                return 0
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                self._reset()
+                self._inode = st.st_ino
+            if st.st_size == self._offset:
+                return 0
+
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read(st.st_size - self._offset)
+
+            # 只处理完整的行
+            end = data.rfind(b"\n")
+            if end < 0:
+                return 0
+            self._offset += end + 1
+
+            added = 0
+            for line in data[:end].decode("utf-8", errors="replace").splitlines():
+                fields = [field.strip() for field in line.split(",")]
+                if not any(fields):
+                    continue
+                if not self.columns:
+                    self.columns = fields
+                    continue
+                self.rows.append([self._parse_value(field) for field in fields])
+                added += 1
+            return added
+
+    def epochs_since(self, since=0):
+        """
+        返回 epoch 大于 since 的行，按列组织：{"columns", "metrics": {列名: [值, ...]}, "next"}
+
+        next 为已返回的最后一个 epoch，客户端下次以此作为 since；无 epoch 列时按行号计算。
+        """
+        self.refresh()
+        with self._lock:
+            columns = list(self.columns)
+            if "epoch" in columns:
+                epoch_idx = columns.index("epoch")
+                rows = [row for row in self.rows if row[epoch_idx] is not None and row[epoch_idx] > since]
+                last = rows[-1][epoch_idx] if rows else since
+            else:
+                rows = self.rows[int(since):]
+                last = len(self.rows)
+
+        metrics = {name: [row[i] if i < len(row) else None for row in rows] for i, name in enumerate(columns)}
+        return {
+            "columns": columns,
+            "metrics": metrics,
+            "next": int(last),
+        }
+
+_tails = OrderedDict()
+_tails_lock = threading.Lock()
+
+def get_results_csv_tail(path):
+    """
+    获取（或创建）指定 results.csv 的增量读取器，按最近使用保留 RESULTS_CSV_CACHE_SIZE 个
+    """
+    path = os.path.abspath(path)
+    with _tails_lock:
+        tail = _tails.get(path)
+        if tail is None:
+            tail = ResultsCsvTail(path)
+            _tails[path] = tail
+            while len(_tails) > RESULTS_CSV_CACHE_SIZE:
+                _tails.popitem(last=False)
+        else:
+            _tails.move_to_end(path)
+        return tail
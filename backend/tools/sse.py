@@ -0,0 +1,82 @@
+import json
+from flask import Response, request
+from tools.format_output import format_output
+
+def sse_log_response(log_buffer, is_running, since=None, heartbeat=15):
+    """
+    以 Server-Sent Events 推送任务日志
+
+    - log_buffer: 任务的 LogBuffer
+    - is_running: 无参可调用对象，返回任务是否仍在运行
+    - since: 起始游标（不传则从缓冲区最早的日志开始）
+    - heartbeat: 无新日志时发送心跳注释的间隔（秒）
+
+    事件格式：
+      event: log  data: {"log": str, "next": int, "truncated": bool}
+      event: end  data: {"next": int, "is_running": false}
+    每个 log 事件的 id 即为 next 游标，浏览器断线重连时会通过 Last-Event-ID 带回。
+    """
+    def _event(name, data, event_id=None):
+        out = ""
+        if event_id is not None:
+            out += f"id: {event_id}\n"
+        out += f"event: {name}\n"
+        out += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        return out
+
+    def generate():
+        cursor = since
+        idle = 0.0
+        while True:
+            lines, next_seq, truncated = log_buffer.read(cursor)
+            if lines or truncated:
+                idle = 0.0
+                yield _event("log", {
+                    "log": "\n".join(lines),
+                    "next": next_seq,
+                    "truncated": truncated,
+                }, event_id=next_seq)
+            cursor = next_seq
+
+            if not is_running():
+                # 线程结束后再取一次，避免漏掉最后几行
+                lines, next_seq, truncated = log_buffer.read(cursor)
+                if lines:
+                    yield _event("log", {
+                        "log": "\n".join(lines),
+                        "next": next_seq,
+                        "truncated": truncated,
+                    }, event_id=next_seq)
+                yield _event("end", {"next": next_seq, "is_running": False})
+                return
+
+            # 每秒至少醒来一次以检测任务是否结束
+            if not log_buffer.wait(cursor, timeout=1.0):
+                idle += 1.0
+                if idle >= heartbeat:
+                    idle = 0.0
+                    yield ": ping\n\n"
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+def sse_task_log_response(tasks, key_param):
+    """
+    SSE 日志接口的通用实现：按查询参数 key_param 在 tasks（任务键 -> {"log", "thread"}）中查找任务并推送日志
+
+    起始游标优先取断线重连时浏览器带上的 Last-Event-ID，其次为 URL 中的 since
+    """
+    key = request.args.get(key_param)
+    since = request.headers.get("Last-Event-ID", None, type=int)
+    if since is None:
+        since = request.args.get("since", None, type=int)
+    if not key:
+        return format_output(code=400, msg="缺少必要参数(step:1)")
+
+    task_info = tasks.get(key)
+    if not task_info:
+        return format_output(code=404, msg="任务未在运行，或不存在")
+
+    return sse_log_response(task_info["log"], task_info["thread"].is_alive, since)
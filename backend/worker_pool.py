@@ -0,0 +1,384 @@
+import atexit
+import importlib
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from ITraining.handlers import QueueHandler
+
+class _PipeSender:
+    """
+    将日志行通过管道发送回主进程（提供 put 接口以复用 QueueHandler）
+    """
+    def __init__(self, conn):
+        self.conn = conn
+
+    def put(self, line):
+        try:
+            self.conn.send(line)
+        except (BrokenPipeError, OSError):
+            pass
+
+_event_sender = None
+
+def emit_event(event):
+    """
+    在工作进程中上报结构化事件（dict），主进程将其写入任务的 events 缓冲区；不在工作进程中时忽略
+    """
+    if _event_sender is not None:
+        _event_sender.put(event)
+
+# 常驻工作进程在每个任务结束后发送的消息（附带该进程的模型缓存统计）
+_TASK_DONE = "__task_done__"
+
+def _run_target(conn, target, kwargs, logger_name, start_msg, end_msg, error_msg, logfile=None, catch_exit=False):
+    """
+    在当前工作进程中运行一个任务：配置日志管道后调用 target（形如 "ITraining.train:main"）
+    catch_exit: 捕获任务中的 sys.exit（常驻进程使用），返回与进程退出码含义相同的结果码
+    """
+    global _event_sender
+    _event_sender = _PipeSender(conn)
+
+    logger = logging.getLogger(logger_name)
+    logger.setLevel(logging.INFO)
+    for handler in list(logger.handlers):
+        handler.close()
+    logger.handlers.clear()
+
+    formatter = logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S")
+    pipe_handler = QueueHandler(_PipeSender(conn))
+    pipe_handler.setFormatter(formatter)
+    logger.addHandler(pipe_handler)
+
+    # 日志持久化到文件（失败不影响管道输出）
+    if logfile:
+        try:
+            file_handler = logging.FileHandler(logfile, encoding="utf-8")
+            file_handler.setFormatter(formatter)
+            logger.addHandler(file_handler)
+        except Exception:
+            pass
+
+    try:
+        logger.info(start_msg)
+        module_name, func_name = target.split(":")
+        func = getattr(importlib.import_module(module_name), func_name)
+        func(**kwargs, logger=logger)
+        logger.info(end_msg)
+    except SystemExit as e:
+        if not catch_exit:
+            raise
+        # 常驻进程中任务调用 sys.exit 只结束该任务
+        return e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        logger.exception(f"{error_msg}: {e}")
+        return 1
+    finally:
+        for handler in logger.handlers:
+            handler.flush()
+        _event_sender = None
+    return 0
+
+def _worker_main(conn, target, kwargs, logger_name, start_msg, end_msg, error_msg, logfile=None):
+    """
+    子进程入口：运行单个任务后退出
+    """
+    try:
+        code = _run_target(conn, target, kwargs, logger_name, start_msg, end_msg, error_msg, logfile)
+    finally:
+        conn.close()
+    # 任务异常时以非零退出码结束，调度器据此把任务标记为 failed
+    if code:
+        sys.exit(code)
+
+def _warm_worker_main(conn):
+    """
+    常驻子进程入口：循环接收任务并依次运行，收到 None 时退出
+
+    进程内的模型缓存在任务之间保留，同一权重的后续任务无需重新加载。
+    """
+    try:
+        while True:
+            try:
+                job = conn.recv()
+            except (EOFError, OSError):
+                break
+            if job is None:
+                break
+            code = _run_target(conn, *job, catch_exit=True)
+            try:
+                from model_cache import get_model_cache
+                stats = get_model_cache().stats()
+            except Exception:
+                stats = None
+            conn.send((_TASK_DONE, code, stats))
+    finally:
+        conn.close()
+
+class _WarmWorker:
+    """
+    常驻工作进程及其双向管道
+    """
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe(duplex=True)
+        self.process = ctx.Process(target=_warm_worker_main, args=(child_conn,), daemon=False)
+        self.process.start()
+        child_conn.close()
+        self.idle_since = time.monotonic()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+class TaskHandle:
+    """
+    工作进程中运行的任务句柄（接口与 Thread.is_alive 兼容）
+    """
+    def __init__(self):
+        self.job_id = None
+        self.process = None
+        self.exitcode = None
+        self._done = threading.Event()
+        self._cancelled = False
+
+    def is_alive(self):
+        """
+        排队中或运行中均视为存活
+        """
+        return not self._done.is_set()
+
+    def join(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def terminate(self):
+        """
+        终止任务：排队中的任务不再启动，运行中的任务强制结束子进程
+        """
+        self._cancelled = True
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+
+class TaskExecutor:
+    """
+    进程池任务执行器
+
+    每个任务在独立的 spawn 子进程中运行，stdout/stderr 的替换只作用于该进程，
+    任务之间的输出互不干扰，崩溃也不会影响 API 进程。
+    同时运行的进程数受 max_workers 限制，超出的任务排队等待。
+
+    warm=True 提交的任务（测试 / 验证 / 导出）在常驻子进程中运行，任务结束后进程空闲保留
+    warm_idle_timeout 秒，其中的模型缓存可被后续任务复用；warm_idle_timeout 为 0 时不保留。
+    """
+    def __init__(self, max_workers=2, warm_idle_timeout=0):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._max_idle = max_workers
+        self._warm_idle_timeout = warm_idle_timeout
+        self._idle = []
+        self._idle_lock = threading.Lock()
+        self._cache_stats = {}      # 常驻进程 pid -> 最近一次上报的模型缓存统计
+        self._retired_stats = {"hits": 0, "misses": 0, "evictions": 0}  # 已结束的常驻进程的累计统计
+        self._reaper_started = False
+        atexit.register(self.shutdown)
+
+    def submit(self, target, kwargs, log_buffer, logger_name,
+               start_msg="开始任务", end_msg="任务结束", error_msg="任务发生异常", logfile=None, handle=None, warm=False):
+        """
+        提交任务，立即返回 TaskHandle；日志逐行写入 log_buffer
+        handle: 可传入事先创建的句柄（如调度器为排队中的任务提前创建的句柄）
+        warm: 在常驻子进程中运行（复用进程内的模型缓存）
+        """
+        if handle is None:
+            handle = TaskHandle()
+
+        job = (target, kwargs, logger_name, start_msg, end_msg, error_msg, logfile)
+        run = self._run_warm if warm and self._warm_idle_timeout > 0 else self._run
+
+        def supervise():
+            try:
+                run(handle, job, log_buffer)
+            finally:
+                handle._done.set()
+
+        threading.Thread(target=supervise, daemon=True).start()
+        return handle
+
+    def _pump(self, conn, log_buffer, worker=None):
+        """
+        把管道中的消息转存到 log_buffer：字符串为日志行，dict 为结构化事件；
+        常驻进程报告任务结束时返回其结果码，管道已关闭时返回 None
+        """
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return None
+            if isinstance(message, tuple) and message and message[0] == _TASK_DONE:
+                _, code, stats = message
+                if worker is not None and stats is not None:
+                    with self._idle_lock:
+                        self._cache_stats[worker.process.pid] = stats
+                return code
+            if isinstance(message, dict):
+                if getattr(log_buffer, "events", None) is not None:
+                    log_buffer.events.put(message)
+            else:
+                log_buffer.put(message)
+
+    def _run(self, handle, job, log_buffer):
+        """
+        占用一个进程槽位，启动子进程并把管道中的日志转存到 log_buffer
+        """
+        error_msg = job[5]
+        with self._slots:
+            if handle._cancelled:
+                return
+            recv_conn, send_conn = self._ctx.Pipe(duplex=False)
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(send_conn, *job),
+                # Ultralytics 的 DataLoader 会再创建子进程，守护进程不允许这样做
+                daemon=False,
+            )
+            try:
+                process.start()
+            except Exception as e:
+                log_buffer.put(f"{error_msg}: 启动工作进程失败: {e}")
+                return
+            handle.process = process
+            # 关闭主进程持有的写端，子进程退出后 recv 才能收到 EOF
+            send_conn.close()
+
+            self._pump(recv_conn, log_buffer)
+            recv_conn.close()
+
+            process.join()
+            handle.exitcode = process.exitcode
+            if process.exitcode:
+                log_buffer.put(f"工作进程已退出，退出码: {process.exitcode}")
+
+    def _run_warm(self, handle, job, log_buffer):
+        """
+        占用一个进程槽位，在空闲的常驻子进程中运行任务（没有空闲进程时新建）
+        """
+        error_msg = job[5]
+        with self._slots:
+            if handle._cancelled:
+                return
+            worker = self._take_idle()
+            if worker is None:
+                try:
+                    worker = _WarmWorker(self._ctx)
+                except Exception as e:
+                    log_buffer.put(f"{error_msg}: 启动工作进程失败: {e}")
+                    return
+            else:
+                log_buffer.put(f"[WORKER] 复用常驻工作进程 {worker.process.pid}")
+            handle.process = worker.process
+
+            try:
+                worker.conn.send(job)
+                code = self._pump(worker.conn, log_buffer, worker)
+            except (BrokenPipeError, OSError):
+                code = None
+
+            if code is not None and not handle._cancelled:
+                handle.exitcode = code
+                if code:
+                    log_buffer.put(f"任务已退出，退出码: {code}")
+                self._release_idle(worker)
+            else:
+                # 进程崩溃或被终止，不再复用
+                worker.process.join(5)
+                handle.exitcode = worker.process.exitcode
+                worker.conn.close()
+                with self._idle_lock:
+                    self._forget(worker)
+                if handle.exitcode:
+                    log_buffer.put(f"工作进程已退出，退出码: {handle.exitcode}")
+
+    def _take_idle(self):
+        with self._idle_lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    return worker
+                self._forget(worker)
+        return None
+
+    def _forget(self, worker):
+        """
+        移除已结束的常驻进程，其缓存统计计入累计值（调用方持有 _idle_lock）
+        """
+        stats = self._cache_stats.pop(worker.process.pid, None) or {}
+        for key in self._retired_stats:
+            self._retired_stats[key] += stats.get(key, 0)
+
+    def _release_idle(self, worker):
+        worker.idle_since = time.monotonic()
+        with self._idle_lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(worker)
+                worker = None
+            if not self._reaper_started:
+                self._reaper_started = True
+                threading.Thread(target=self._reap_idle, daemon=True).start()
+        if worker is not None:
+            self._stop_worker(worker)
+
+    def _stop_worker(self, worker):
+        with self._idle_lock:
+            self._forget(worker)
+        worker.stop()
+
+    def _reap_idle(self):
+        """
+        定期结束空闲超过 warm_idle_timeout 的常驻进程，释放其占用的内存 / 显存
+        """
+        while True:
+            time.sleep(min(30.0, max(1.0, self._warm_idle_timeout / 2)))
+            now = time.monotonic()
+            with self._idle_lock:
+                expired = [w for w in self._idle if now - w.idle_since >= self._warm_idle_timeout]
+                self._idle = [w for w in self._idle if w not in expired]
+            for worker in expired:
+                self._stop_worker(worker)
+
+    def shutdown(self):
+        """
+        结束所有空闲的常驻进程（服务退出时调用）
+        """
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            self._stop_worker(worker)
+
+    def warm_stats(self):
+        """
+        常驻进程与其模型缓存的汇总统计
+        """
+        with self._idle_lock:
+            per_worker = dict(self._cache_stats)
+            idle = len(self._idle)
+            totals = dict(self._retired_stats)
+        for stats in per_worker.values():
+            for key in totals:
+                totals[key] += stats.get(key, 0)
+        hits, misses = totals["hits"], totals["misses"]
+        return {
+            "warm_idle_timeout": self._warm_idle_timeout,
+            "idle_workers": idle,
+            "hits": hits,
+            "misses": misses,
+            "evictions": totals["evictions"],
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "workers": {str(pid): stats for pid, stats in per_worker.items()},
+        }
@@ -70,10 +70,45 @@ async function upload(endpoint, formData, { params, signal } = {}) {
     }
 }
 
+/**
+ * 订阅 Server-Sent Events 日志流
+ * 后端推送 log / end 两类事件，data 均为 JSON
+ */
+function stream(endpoint, { params, onLog, onEnd, onError } = {}) {
+    const url = `${BASE_URL}${endpoint}${buildQuery(params)}`;
+    const source = new EventSource(url);
+
+    source.addEventListener("log", (e) => {
+        if (onLog) onLog(JSON.parse(e.data));
+    });
+    source.addEventListener("end", (e) => {
+        source.close();
+        if (onEnd) onEnd(JSON.parse(e.data));
+    });
+    source.onerror = (error) => {
+        // 连接被彻底关闭（如任务不存在）时才回调；临时断线由浏览器自动重连
+        if (source.readyState === EventSource.CLOSED) {
+            console.error(`[API ERROR] STREAM ${endpoint}:`, error);
+            if (onError) onError(error);
+        }
+    };
+
+    return source;
+}
+
+/**
+ * 生成直接用于 <img src> / <a href> 的完整地址（二进制资源可由浏览器缓存）
+ */
+function url(endpoint, params = {}) {
+    return `${BASE_URL}${endpoint}${buildQuery(params)}`;
+}
+
 export const api = {
     get: (url, options = {}) => request("GET", url, options),
     post: (url, options = {}) => request("POST", url, options),
     put: (url, options = {}) => request("PUT", url, options),
     del: (url, options = {}) => request("DELETE", url, options),
     upload: (url, formData, options = {}) => upload(url, formData, options),
+    stream: (url, options = {}) => stream(url, options),
+    url: (endpoint, params = {}) => url(endpoint, params),
 };
\ No newline at end of file
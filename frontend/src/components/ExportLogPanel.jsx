@@ -173,13 +173,19 @@ function ExportLogPanel({ visible, onClose, exportKey, parameter, setPageUrl })
     if (!visible || !exportKey) return;
     let timer = null;
     let mounted = true;
+    // 日志游标：每次只拉取上次之后新增的行
+    let since = 0;
+    setLogText("");
 
     const poll = async () => {
       try {
-        const res = await api.get(`/IModel/getExportTaskLog?exportKey=${encodeURIComponent(exportKey)}`);
+        const res = await api.get(`/IModel/getExportTaskLog?exportKey=${encodeURIComponent(exportKey)}&since=${since}`);
         if (!mounted) return;
         if (res.code === 200 && res.data) {
-          setLogText(res.data.log || "");
+          since = res.data.next ?? since;
+          if (res.data.log) {
+            setLogText(prev => prev ? `${prev}\n${res.data.log}` : res.data.log);
+          }
           setIsRunning(!!res.data.is_running);
           setMeta(res.data.meta || null);
         }
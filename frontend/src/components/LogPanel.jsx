@@ -14,50 +14,32 @@ function LogPanel({
     const [logText, setLogText] = useState("");
     const [isRunning, setIsRunning] = useState(false);
 
-    // 轮询日志
+    // 通过 SSE 订阅日志
     useEffect(() => {
         if (!visible || !logFilename) return;
 
-        let timer = null;
-        let isMounted = true;
+        setLogText("");
 
-        const poll = async () => {
-            try {
-                const isVal = taskType === "validation";
-                const endpoint = isVal ? "/IModel/getValTaskLog" : "/IModel/getTaskLog";
-                const res = await api.get(`${endpoint}?filename=${encodeURIComponent(logFilename)}`);
-                
-                if (!isMounted) return;
-                
-                if (res.code === 200 && res.data) {
-                    setLogText(res.data.log || "");
-                    setIsRunning(!!res.data.is_running);
-                    if (!res.data.is_running) {
-                        if (timer) {
-                            clearInterval(timer);
-                            timer = null;
-                        }
-                        if (onTaskComplete) {
-                            onTaskComplete();
-                        }
-                    }
+        const isVal = taskType === "validation";
+        const endpoint = isVal ? "/IModel/streamValTaskLog" : "/IModel/streamTaskLog";
+        const source = api.stream(endpoint, {
+            params: { filename: logFilename, since: 0 },
+            onLog: ({ log }) => {
+                if (log) {
+                    setLogText(prev => prev ? `${prev}\n${log}` : log);
                 }
-            } catch (err) {
-                if (isMounted) {
-                    console.error("获取日志失败:", err);
+                setIsRunning(true);
+            },
+            onEnd: () => {
+                setIsRunning(false);
+                if (onTaskComplete) {
+                    onTaskComplete();
                 }
-            }
-        };
-
-        poll();
-        timer = setInterval(poll, 1000);
+            },
+        });
 
         return () => {
-            isMounted = false;
-            if (timer) {
-                clearInterval(timer);
-                timer = null;
-            }
+            source.close();
         };
     }, [visible, logFilename, taskType, onTaskComplete]);
 
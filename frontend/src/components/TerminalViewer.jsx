@@ -21,37 +21,25 @@ function TerminalViewer({ filename, setIsRunning, trainingCompleted }) {
     }, []);
 
     useEffect(() => {
-        const fetchLog = () => {
-            api.get("/ITraining/getTaskLog", {
-                params: { filename },
-            })
-                .then(res => {
-                    if (res.code === 200) {
-                        const { log, is_running } = res.data;
-                        if (termInstance.current) {
-                            termInstance.current.clear();
-                            termInstance.current.write(log.replace(/\n/g, "\r\n"));
-                        }
-                        if (!is_running) {
-                            clearInterval(timerRef.current);
-                            trainingCompleted();
-                        }
-
-                        setIsRunning(is_running);
-                    }
-                })
-                .catch(err => {
-                    console.error("获取日志失败:", err);
-                });
-        };
-
-        const timerRef = { current: null };
-
-        fetchLog();
-        timerRef.current = setInterval(fetchLog, 3000); // 每3秒请求一次
+        termInstance.current?.clear();
+
+        // 通过 SSE 接收新增日志，任务结束时后端发送 end 事件
+        const source = api.stream("/ITraining/streamTaskLog", {
+            params: { filename, since: 0 },
+            onLog: ({ log }) => {
+                if (termInstance.current && log) {
+                    termInstance.current.write(log.replace(/\n/g, "\r\n") + "\r\n");
+                }
+                setIsRunning(true);
+            },
+            onEnd: () => {
+                setIsRunning(false);
+                trainingCompleted();
+            },
+        });
 
         return () => {
-            clearInterval(timerRef.current);
+            source.close();
         };
     }, [filename]);
 
@@ -9,6 +9,9 @@ function TestForm({
 }) {
     const [modelName, setModelName] = useState("best.pt");
     const [inputPath, setInputPath] = useState("");
+    const [inputType, setInputType] = useState("image");
+    const [batchSize, setBatchSize] = useState("");
+    const [maxFrames, setMaxFrames] = useState("");
     const [loading, setLoading] = useState(false);
     const [browseBusy, setBrowseBusy] = useState(false);
     const [hasElectron, setHasElectron] = useState(false);
@@ -38,7 +41,9 @@ function TestForm({
                     taskName: parameter.taskName,
                     outputDir: parameter.outputDir || "",
                     inputPath: inputPath,
-                    inputType: "image",
+                    inputType: inputType,
+                    batchSize: inputType !== "image" && batchSize ? parseInt(batchSize) : undefined,
+                    maxFrames: inputType === "video" && maxFrames ? parseInt(maxFrames) : undefined,
                     modelType: modelName.replace(".pt", "")
                 }
             });
@@ -125,7 +130,42 @@ function TestForm({
             </div>
 
             <div className="form-group">
-                <label htmlFor="inputPath">请选择您希望用于测试的图片</label>
+                <label htmlFor="inputType">测试方式</label>
+                <select id="inputType" value={inputType} onChange={(e) => setInputType(e.target.value)}>
+                    <option value="image">单张图片</option>
+                    <option value="batch">批量（目录、通配符或 zip）</option>
+                    <option value="video">视频（文件、流地址或摄像头编号）</option>
+                </select>
+            </div>
+
+            {inputType === "video" && (
+                <div className="form-group">
+                    <label htmlFor="maxFrames">最多处理的帧数（可选，视频流建议填写）</label>
+                    <input
+                        id="maxFrames"
+                        type="number"
+                        min="1"
+                        value={maxFrames}
+                        onChange={(e) => setMaxFrames(e.target.value)}
+                    />
+                </div>
+            )}
+
+            {inputType !== "image" && (
+                <div className="form-group">
+                    <label htmlFor="batchSize">推理 batch 大小（留空使用服务端默认值）</label>
+                    <input
+                        id="batchSize"
+                        type="number"
+                        min="1"
+                        value={batchSize}
+                        onChange={(e) => setBatchSize(e.target.value)}
+                    />
+                </div>
+            )}
+
+            <div className="form-group">
+                <label htmlFor="inputPath">{inputType === "batch" ? "请输入图片目录、通配符（如 /data/imgs/**/*.jpg）或 zip 路径" : inputType === "video" ? "请输入视频文件路径、流地址（rtsp://...）或摄像头编号" : "请选择您希望用于测试的图片"}</label>
                 <div style={{ display: 'flex', gap: '10px' }}>
                     <input
                         type="text"
@@ -140,7 +180,7 @@ function TestForm({
                     <input
                         ref={fileInputRef}
                         type="file"
-                        accept=".jpg,.jpeg,.png,.webp"
+                        accept={inputType === "batch" ? ".zip" : inputType === "video" ? "video/*" : ".jpg,.jpeg,.png,.webp"}
                         style={{ display: 'none' }}
                         onChange={handleFileSelected}
                     />
@@ -7,6 +7,53 @@ import 'highlight.js/styles/github.css';
 import Logo_Coco from "../assets/logo/coco_sm.png";
 import Logo_Ultralytics from "../assets/logo/ultralytics.svg";
 
+// 超过该大小的压缩包使用分块上传（支持断点续传）
+const CHUNKED_UPLOAD_THRESHOLD = 64 * 1024 * 1024;
+const CHUNKED_UPLOAD_CONCURRENCY = 4;
+
+async function uploadDatasetChunked(file, meta) {
+    const init = await api.post("/IDataset/initChunkedUpload", {
+        data: { ...meta, filename: file.name, size: file.size }
+    });
+    if (init.code != 200) throw init.msg;
+
+    const { uploadID, chunkSize } = init.data;
+
+    // 只上传缺失的区间（续传时跳过已上传的部分）
+    const chunks = [];
+    for (const [start, end] of init.data.missing) {
+        for (let offset = start; offset < end; offset += chunkSize) {
+            chunks.push([offset, Math.min(offset + chunkSize, end)]);
+        }
+    }
+
+    const worker = async () => {
+        while (chunks.length > 0) {
+            const [start, end] = chunks.shift();
+            const res = await fetch(`${CONFIGS.API_BASE_URL}/IDataset/uploadChunk?uploadID=${uploadID}&offset=${start}`, {
+                method: "PUT",
+                headers: { "Content-Type": "application/octet-stream" },
+                body: file.slice(start, end),
+            });
+            const data = await res.json();
+            if (data.code != 200) throw data.msg;
+        }
+    };
+    await Promise.all(Array.from({ length: CHUNKED_UPLOAD_CONCURRENCY }, worker));
+
+    const finalize = await api.post("/IDataset/finalizeChunkedUpload", { data: { uploadID } });
+    if (finalize.code != 200) throw finalize.msg;
+
+    // 等待后台解压完成
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const status = await api.get("/IDataset/getUploadStatus", { params: { uploadID } });
+        if (status.code != 200) throw status.msg;
+        if (status.data.status == "done") return { code: 200, msg: "数据集上传成功" };
+        if (status.data.status == "failed") throw status.data.error;
+    }
+}
+
 function uploadDataset({ setPageUrl, datasetType, includeYaml, trainPath, valPath, testPath, nc, names }) {
     const formData = new FormData();
 
@@ -15,6 +62,23 @@ function uploadDataset({ setPageUrl, datasetType, includeYaml, trainPath, valPat
     const version = document.getElementById("datasetVersion").value;
     const file = document.querySelector('input[type="file"]').files[0];
 
+    if (file && file.size >= CHUNKED_UPLOAD_THRESHOLD) {
+        const meta = { name, description, version, type: datasetType, include_yaml: includeYaml };
+        if (includeYaml == 0) {
+            Object.assign(meta, { train: trainPath, val: valPath, test: testPath || "", nc, names });
+        }
+        uploadDatasetChunked(file, meta)
+            .then(data => {
+                alert(data.msg);
+                if (data.code == 200) setPageUrl("home");
+            })
+            .catch(err => {
+                alert("上传失败：" + err);
+                console.error("上传失败：", err);
+            });
+        return;
+    }
+
     formData.append("name", name);
     formData.append("description", description);
     formData.append("version", version);
@@ -97,6 +161,26 @@ function DatasetPage({ setPageUrl, parameter }) {
         }
     };
 
+    const syncDataset = (path) => {
+        const token = prompt("Label Studio Token（留空则使用服务端默认配置）", "");
+        if (token === null) return;
+
+        api.post("/IDataset/syncDatasetFromLabelStudio", { data: { path: path, token: token }, params: {} })
+            .then(data => {
+                if (data.code == 200) {
+                    const s = data.data;
+                    alert(`同步完成：新增 ${s.added}，更新 ${s.updated}，移除 ${s.removed}，未变化 ${s.unchanged}，失败 ${s.failed}`);
+                    setPageUrl("home");
+                } else {
+                    alert(data.msg);
+                }
+            })
+            .catch(err => {
+                console.error("同步数据集失败:", err);
+                alert(err);
+            });
+    };
+
     switch (parameter.type) {
         case "uploadDataset":
             return (
@@ -324,11 +408,12 @@ function DatasetPage({ setPageUrl, parameter }) {
                                         <br />
                                         标记类别: {dataset.yaml_info.class_names.join(', ')}
                                         <br />
-                                        训练集图片数量: {dataset.yaml_info.train_img_count}
+                                        训练集图片数量: {dataset.yaml_info.train_img_count ?? "统计中..."}
                                         <br />
-                                        训练集标注数量: {dataset.yaml_info.train_label_count}
+                                        训练集标注数量: {dataset.yaml_info.train_label_count ?? "统计中..."}
+                                        {dataset.yaml_info.stats_status == "stale" && <span>（正在更新）</span>}
                                         <br />
-                                        {(dataset.yaml_info.train_img_count == 0 || dataset.yaml_info.train_label_count == 0) &&
+                                        {dataset.yaml_info.stats_status != "pending" && (dataset.yaml_info.train_img_count == 0 || dataset.yaml_info.train_label_count == 0) &&
                                             <span>Tip: 训练集图片/标注数量为0可能是因为格式有误，如您确定数据集内包含数据，请检查您的数据集格式是否正确。</span>
                                         }
                                     </>
@@ -344,6 +429,7 @@ function DatasetPage({ setPageUrl, parameter }) {
                                 {showDetailsInfo.includes(index) ? <>隐藏详细</> : <>查看详情</>}
                             </a>
                             <button className="btn sm" style={{ marginRight: '10px' }} onClick={() => { setPageUrl(`tasks?type=newTask&datasetPath=${dataset.path}`) }}>从该数据集开始创建任务</button>
+                            {dataset.label_studio_sync && <button className="btn sm" style={{ marginRight: '10px' }} onClick={() => { syncDataset(dataset.path) }}>从 Label Studio 同步</button>}
                             <button className="btn sm r" onClick={() => { deleteDataset(dataset.path) }}>删除数据集</button>
                         </div>
                     ))}
@@ -18,6 +18,7 @@ function LabelStudioImportPage({ setPageUrl, parameter }) {
   const [valSplit, setValSplit] = useState(0.2);
   const [testSplit, setTestSplit] = useState(0.0);
   const [downloadImages, setDownloadImages] = useState(true);
+  const [stratify, setStratify] = useState(false);
   const [classNamesText, setClassNamesText] = useState("");
 
   const sumSplits = useMemo(() => (
@@ -79,6 +80,8 @@ function LabelStudioImportPage({ setPageUrl, parameter }) {
           seed: 42,
           download_images: downloadImages,
           class_names,
+          split_strategy: "hash",
+          stratify,
         },
       });
       alert(res.msg || "构建成功");
@@ -161,6 +164,11 @@ function LabelStudioImportPage({ setPageUrl, parameter }) {
             <input type="checkbox" checked={downloadImages} onChange={e => setDownloadImages(e.target.checked)} style={{ marginRight: '8px' }} /> 下载图片
           </label>
         </div>
+        <div className="form-group" style={{ marginBottom: '16px' }}>
+          <label>
+            <input type="checkbox" checked={stratify} onChange={e => setStratify(e.target.checked)} style={{ marginRight: '8px' }} /> 按主类别分层划分
+          </label>
+        </div>
         <div className="form-group">
           <label>类别名称（可选，逗号或换行分隔）</label>
           <textarea value={classNamesText} onChange={e => setClassNamesText(e.target.value)} placeholder={"如：person,car,bike 或每行一个"} />
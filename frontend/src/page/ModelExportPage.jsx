@@ -8,6 +8,10 @@ function ModelExportPage({ setPageUrl, parameter }) {
   const [showLog, setShowLog] = useState(false);
   const [history, setHistory] = useState([]);
   const [deletingKey, setDeletingKey] = useState("");
+  const [benchBatchSizes, setBenchBatchSizes] = useState("1");
+  const [benchIterations, setBenchIterations] = useState(20);
+  const [benchLoading, setBenchLoading] = useState(false);
+  const [benchmark, setBenchmark] = useState(null);
 
   const outputDir = useMemo(() => parameter.outputDir || "", [parameter.outputDir]);
 
@@ -31,6 +35,42 @@ function ModelExportPage({ setPageUrl, parameter }) {
     fetchHistory();
   }, [outputDir]);
 
+  const handleRunBenchmark = async () => {
+    if (!outputDir) return;
+    setBenchLoading(true);
+    try {
+      const res = await api.post('/IModel/runExportBenchmark', { data: {
+        taskID: parameter.taskID,
+        taskName: parameter.taskName,
+        outputDir,
+        batchSizes: benchBatchSizes,
+        iterations: Number(benchIterations) || undefined,
+      }});
+      if (res.code === 200 && res.data?.exportKey) {
+        handleExportStart(res.data.exportKey);
+      } else {
+        alert(res.msg || '启动基准测试失败');
+      }
+    } catch (e) {
+      alert('启动基准测试失败: ' + (e?.message || e));
+    } finally {
+      setBenchLoading(false);
+    }
+  };
+
+  const handleShowBenchmark = async (exportKey) => {
+    try {
+      const res = await api.get(`/IModel/getExportBenchmark?outputDir=${encodeURIComponent(outputDir)}&exportKey=${encodeURIComponent(exportKey)}`);
+      if (res.code === 200) {
+        setBenchmark({ exportKey, ...res.data });
+      } else {
+        alert(res.msg || '读取基准测试结果失败');
+      }
+    } catch (e) {
+      alert('读取基准测试结果失败: ' + (e?.message || e));
+    }
+  };
+
   const handleDeleteHistory = async (exportKey) => {
     if (!outputDir || !exportKey) return;
     if (!confirm && typeof window !== 'undefined') {
@@ -79,12 +119,24 @@ function ModelExportPage({ setPageUrl, parameter }) {
                   <div key={idx} style={{ borderBottom: '1px dashed var(--border-color)', padding: '6px 0' }}>
                     <div style={{ display:'flex', justifyContent:'space-between', alignItems:'center', gap:'10px' }}>
                       <div style={{ flex:1, minWidth:0 }}>
-                        <div style={{ fontWeight:600, wordBreak:'break-all' }}>{h.model_choice || 'best'}.pt → {Array.isArray(h.formats) ? h.formats.join(', ') : ''}</div>
+                        <div style={{ fontWeight:600, wordBreak:'break-all' }}>
+                          {h.type === 'benchmark' ? '基准测试：' : ''}{h.model_choice || 'best'}.pt {h.type === 'benchmark' ? 'vs' : '→'} {Array.isArray(h.formats) ? h.formats.join(', ') : ''}
+                          {h.type === 'benchmark' && h.status ? `（${h.status}）` : ''}
+                        </div>
                         <div style={{ color:'var(--secondary-text-color)', fontSize:'12px' }}>
                           {new Date((h.startedAt||0) * 1000).toLocaleString()} · exportKey: {h.exportKey}
                         </div>
+                        {Array.isArray(h.format_results) && h.format_results.length > 0 && (
+                          <div style={{ color:'var(--secondary-text-color)', fontSize:'12px' }}>
+                            {h.format_results.map(r => `${r.format} ${r.status === 'ok' ? `${r.seconds}s` : '失败'}${r.reused ? `（复用 ${r.reused}）` : ''}`).join(' · ')}
+                            {h.wall_s != null ? ` · 总耗时 ${h.wall_s}s（串行约 ${h.serial_s}s）` : ''}
+                          </div>
+                        )}
                       </div>
                       <div style={{ whiteSpace:'nowrap', display:'flex', gap:'8px' }}>
+                        {h.type === 'benchmark' && (
+                          <button className="btn sm" onClick={() => handleShowBenchmark(h.exportKey)}>查看对比</button>
+                        )}
                         <button className="btn sm" onClick={() => { setExportKey(h.exportKey); setShowLog(true); }}>查看历史记录</button>
                         <button className={`btn sm danger ${deletingKey===h.exportKey?'disabled':''}`} disabled={deletingKey===h.exportKey}
                           onClick={() => handleDeleteHistory(h.exportKey)}>
@@ -102,6 +154,53 @@ function ModelExportPage({ setPageUrl, parameter }) {
         )}
       </div>
 
+      {/* 导出产物基准测试 */}
+      {outputDir && (
+        <div className="card" style={{ padding: '14px', marginBottom: '12px' }}>
+          <div className="form-group-title">
+            <h1 className="step-tag nobg">B</h1>
+            <h1 className="title">推理基准测试（CPU）</h1>
+          </div>
+          <div style={{ display: 'flex', gap: '10px', alignItems: 'flex-end', flexWrap: 'wrap' }}>
+            <div className="form-group">
+              <label>batch 大小（逗号分隔）</label>
+              <input type="text" value={benchBatchSizes} onChange={(e) => setBenchBatchSizes(e.target.value)} />
+            </div>
+            <div className="form-group">
+              <label>计时次数</label>
+              <input type="number" min="1" value={benchIterations} onChange={(e) => setBenchIterations(e.target.value)} />
+            </div>
+            <button className={`btn sm ${benchLoading ? 'disabled' : ''}`} disabled={benchLoading} onClick={handleRunBenchmark}>
+              {benchLoading ? '提交中...' : '测试全部导出产物'}
+            </button>
+          </div>
+          {benchmark && (
+            <div className="list-card" style={{ padding: '10px', marginTop: '10px', overflowX: 'auto' }}>
+              <div style={{ marginBottom: '6px', color: 'var(--secondary-text-color)', fontSize: '12px' }}>
+                {benchmark.exportKey} · 最快：{Object.entries(benchmark.comparison?.fastest || {}).map(([b, f]) => `batch ${b} → ${f}`).join('，') || '-'}
+              </div>
+              <table style={{ width: '100%', fontSize: '13px', borderCollapse: 'collapse' }}>
+                <thead>
+                  <tr>
+                    <th align="left">格式</th><th>batch</th><th>平均 (ms)</th><th>P95 (ms)</th><th>P99 (ms)</th>
+                    <th>吞吐 (img/s)</th><th>加速比</th><th>峰值内存 (MB)</th>
+                  </tr>
+                </thead>
+                <tbody>
+                  {(benchmark.comparison?.rows || []).map((row, idx) => (
+                    <tr key={idx}>
+                      <td>{row.format}</td><td align="center">{row.batch}</td><td align="center">{row.mean_ms}</td>
+                      <td align="center">{row.p95_ms}</td><td align="center">{row.p99_ms}</td><td align="center">{row.throughput}</td>
+                      <td align="center">{row.speedup != null ? `${row.speedup}×` : '-'}</td><td align="center">{row.peak_rss_mb}</td>
+                    </tr>
+                  ))}
+                </tbody>
+              </table>
+            </div>
+          )}
+        </div>
+      )}
+
       <ExportForm parameter={parameter} setPageUrl={setPageUrl} onExportStart={handleExportStart} />
 
       <ExportLogPanel visible={showLog} onClose={() => setShowLog(false)} exportKey={exportKey} parameter={parameter} setPageUrl={setPageUrl} />
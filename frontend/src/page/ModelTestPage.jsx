@@ -9,76 +9,29 @@ import ValidationForm from "../components/ValidationForm";
 import Icon_Box_seam_fill from "../assets/icons/box-seam-fill.svg";
 import Icon_Calendar_fill from "../assets/icons/calendar-fill.svg";
 
-function TestResultImage({ taskID, filePath, style }) {
-    const [base64, setBase64] = useState(null);
+// 结果图以二进制地址加载，浏览器按 ETag 缓存；thumbnail 为 true 时加载服务端生成的缩略图
+function ResultImage({ endpoint, taskID, filePath, thumbnail, style, alt }) {
     const [error, setError] = useState(null);
 
     useEffect(() => {
-        if (!taskID || !filePath) return;
-        const controller = new AbortController();
         setError(null);
-        setBase64(null);
-
-        api.get(`/IModel/getTestResultImageBase64?taskID=${taskID}&filePath=${encodeURIComponent(filePath)}`, { signal: controller.signal })
-            .then(data => {
-                if (data.code === 200 && data.data.type === "image") {
-                    const b64 = data.data.base64 || '';
-                    const src = b64.startsWith('data:') ? b64 : `data:image/png;base64,${b64}`;
-                    setBase64(src);
-                } else {
-                    setError('未获取到图片');
-                }
-            })
-            .catch(err => {
-                if (err?.name === 'AbortError') return;
-                console.error("加载图片失败", err);
-                setError('加载失败');
-            });
-
-        return () => controller.abort();
     }, [taskID, filePath]);
 
+    if (!taskID || !filePath) return null;
     if (error) return <div className="tip-box">{error}</div>;
-    if (!base64) return <div className="tip-box">加载中...</div>;
 
-    return <img src={base64} style={style} alt="测试结果图" loading="lazy" />;
-}
+    const params = { taskID, filePath };
+    if (thumbnail) params.thumbnail = 1;
 
-function ValResultImage({ taskID, filePath, style }) {
-    const [base64, setBase64] = useState(null);
-    const [loading, setLoading] = useState(false);
-    const [error, setError] = useState(null);
+    return <img src={api.url(endpoint, params)} style={style} alt={alt} loading="lazy" onError={() => setError('加载失败')} />;
+}
 
-    useEffect(() => {
-        if (!taskID || !filePath) return;
-        const controller = new AbortController();
-        setLoading(true);
-        setError(null);
-        setBase64(null);
-        api.get(`/IModel/getValResultImageBase64?taskID=${taskID}&filePath=${encodeURIComponent(filePath)}`, { signal: controller.signal })
-            .then(data => {
-                if (data.code === 200 && data.data?.type === "image") {
-                    const b64 = data.data.base64 || '';
-                    const src = b64.startsWith('data:') ? b64 : `data:image/png;base64,${b64}`;
-                    setBase64(src);
-                } else {
-                    setError('未获取到图片');
-                }
-            })
-            .catch(err => {
-                if (err?.name === 'AbortError') return;
-                console.error("加载验证图片失败", err);
-                setError('加载失败');
-            })
-            .finally(() => setLoading(false));
-
-        return () => controller.abort();
-    }, [taskID, filePath]);
+function TestResultImage({ taskID, filePath, thumbnail, style }) {
+    return <ResultImage endpoint="/IModel/getTestResultImage" taskID={taskID} filePath={filePath} thumbnail={thumbnail} style={style} alt="测试结果图" />;
+}
 
-    if (loading) return <div className="tip-box">加载中...</div>;
-    if (error) return <div className="tip-box">{error}</div>;
-    if (!base64) return <div className="tip-box">未获取到图片</div>;
-    return <img src={base64} style={style} alt="验证结果图" loading="lazy" />;
+function ValResultImage({ taskID, filePath, thumbnail, style }) {
+    return <ResultImage endpoint="/IModel/getValResultImage" taskID={taskID} filePath={filePath} thumbnail={thumbnail} style={style} alt="验证结果图" />;
 }
 
 // 内联日志组件：针对某条历史记录，实时轮询日志并渲染到卡片内
@@ -88,30 +41,21 @@ function InlineLogViewer({ filename, taskType }) {
 
     useEffect(() => {
         if (!filename) return;
-        let timer = null;
-        let mounted = true;
-        const endpoint = taskType === 'validation' ? '/IModel/getValTaskLog' : '/IModel/getTaskLog';
-
-        const poll = async () => {
-            try {
-                const res = await api.get(`${endpoint}?filename=${encodeURIComponent(filename)}`);
-                if (!mounted) return;
-                if (res.code === 200 && res.data) {
-                    setLogText(res.data.log || "");
-                    setIsRunning(!!res.data.is_running);
+        setLogText("");
+        const endpoint = taskType === 'validation' ? '/IModel/streamValTaskLog' : '/IModel/streamTaskLog';
+
+        const source = api.stream(endpoint, {
+            params: { filename, since: 0 },
+            onLog: ({ log }) => {
+                if (log) {
+                    setLogText(prev => prev ? `${prev}\n${log}` : log);
                 }
-            } catch (e) {
-                if (mounted) {
-                    // 静默失败，避免打断页面
-                }
-            }
-        };
-
-        poll();
-        timer = setInterval(poll, 1000);
+                setIsRunning(true);
+            },
+            onEnd: () => setIsRunning(false),
+        });
         return () => {
-            mounted = false;
-            if (timer) clearInterval(timer);
+            source.close();
         };
     }, [filename, taskType]);
 
@@ -445,6 +389,38 @@ function ModelTestPage({ setPageUrl, parameter }) {
                                                                         <span style={{ fontSize: '13px', color: 'var(--secondary-text-color)' }}>测试图片来自 {splitPath(test.input_path).pop()}</span>
                                                                         <br />
                                                                         <span style={{ fontSize: '13px', color: 'var(--secondary-text-color)' }}>使用 {splitPath(test.model_path).pop()} 进行测试</span>
+                                                                        {test.input_type === 'video' && (
+                                                                            <>
+                                                                                <br />
+                                                                                <span style={{ fontSize: '13px', color: 'var(--secondary-text-color)' }}>
+                                                                                    {test.video_stats
+                                                                                        ? `视频测试 ${test.video_stats.frames} 帧，整体 ${test.video_stats.pipeline_fps ?? '-'} FPS（解码 ${test.video_stats.stage_fps?.decode ?? '-'} / 推理 ${test.video_stats.stage_fps?.infer ?? '-'} / 编码 ${test.video_stats.stage_fps?.encode ?? '-'} FPS）`
+                                                                                        : `视频测试进度 ${test.video_progress?.processed ?? 0}/${test.video_progress?.total ?? '-'} 帧`}
+                                                                                </span>
+                                                                                {test.video_stats && test.resultVideo && (
+                                                                                    <>
+                                                                                        {' '}
+                                                                                        <a
+                                                                                            href={`${CONFIGS.API_BASE_URL}/IModel/downloadTestResult?taskID=${model.task_id}&filePath=${encodeURIComponent(test.resultVideo)}`}
+                                                                                            target="_blank"
+                                                                                            rel="noreferrer"
+                                                                                        >
+                                                                                            下载结果视频
+                                                                                        </a>
+                                                                                    </>
+                                                                                )}
+                                                                            </>
+                                                                        )}
+                                                                        {test.input_type === 'batch' && (
+                                                                            <>
+                                                                                <br />
+                                                                                <span style={{ fontSize: '13px', color: 'var(--secondary-text-color)' }}>
+                                                                                    {test.batch_stats
+                                                                                        ? `批量测试 ${test.batch_stats.images} 张，${test.batch_stats.throughput_img_s ?? '-'} img/s，延迟 p50 ${test.batch_stats.latency_ms?.p50 ?? '-'} ms / p95 ${test.batch_stats.latency_ms?.p95 ?? '-'} ms / p99 ${test.batch_stats.latency_ms?.p99 ?? '-'} ms`
+                                                                                        : `批量测试进度 ${test.batch_progress?.processed ?? 0}/${test.batch_progress?.total ?? '-'}`}
+                                                                                </span>
+                                                                            </>
+                                                                        )}
                                                                     </div>
                                                                     <div style={{ display: 'flex', gap: '8px' }}>
                                                                         <button className="btn sm" onClick={() => setShowTestResultImage(prev => prev.includes(k) ? prev.filter(i => i !== k) : [...prev, k])}>
@@ -468,6 +444,7 @@ function ModelTestPage({ setPageUrl, parameter }) {
                                                                             setPreviewVisible(true); 
                                                                         }}>
                                                                             <TestResultImage 
+                                                                                thumbnail
                                                                                 taskID={model.task_id} 
                                                                                 filePath={test.result_file_path} 
                                                                                 style={{ 
@@ -664,7 +641,7 @@ function ModelTestPage({ setPageUrl, parameter }) {
                                                                     <div style={{ textAlign: 'center' }}>
                                                                         <div style={{ fontSize: '13px', color: 'var(--secondary-text-color)', marginBottom: '6px' }}>混淆矩阵</div>
                                                                         <div style={{ cursor: 'zoom-in' }} onClick={() => { setPreviewInfo({ taskID: model.task_id, filePath: val.plots.confusion_matrix, title: '混淆矩阵' }); setPreviewVisible(true); }}>
-                                                                            <ValResultImage taskID={model.task_id} filePath={val.plots.confusion_matrix} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
+                                                                            <ValResultImage thumbnail taskID={model.task_id} filePath={val.plots.confusion_matrix} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
                                                                         </div>
                                                                         <div style={{ marginTop: '6px' }}>
                                                                             <a className="btn sm" href={buildValDownloadUrl(model.task_id, val.plots.confusion_matrix)} target="_blank" rel="noreferrer">下载</a>
@@ -675,7 +652,7 @@ function ModelTestPage({ setPageUrl, parameter }) {
                                                                     <div style={{ textAlign: 'center' }}>
                                                                         <div style={{ fontSize: '13px', color: 'var(--secondary-text-color)', marginBottom: '6px' }}>结果图</div>
                                                                         <div style={{ cursor: 'zoom-in' }} onClick={() => { setPreviewInfo({ taskID: model.task_id, filePath: val.plots.results, title: '结果图' }); setPreviewVisible(true); }}>
-                                                                            <ValResultImage taskID={model.task_id} filePath={val.plots.results} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
+                                                                            <ValResultImage thumbnail taskID={model.task_id} filePath={val.plots.results} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
                                                                         </div>
                                                                         <div style={{ marginTop: '6px' }}>
                                                                             <a className="btn sm" href={buildValDownloadUrl(model.task_id, val.plots.results)} target="_blank" rel="noreferrer">下载</a>
@@ -686,7 +663,7 @@ function ModelTestPage({ setPageUrl, parameter }) {
                                                                     <div style={{ textAlign: 'center' }}>
                                                                         <div style={{ fontSize: '13px', color: 'var(--secondary-text-color)', marginBottom: '6px' }}>PR 曲线</div>
                                                                         <div style={{ cursor: 'zoom-in' }} onClick={() => { setPreviewInfo({ taskID: model.task_id, filePath: val.plots.pr_curve, title: 'PR 曲线' }); setPreviewVisible(true); }}>
-                                                                            <ValResultImage taskID={model.task_id} filePath={val.plots.pr_curve} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
+                                                                            <ValResultImage thumbnail taskID={model.task_id} filePath={val.plots.pr_curve} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
                                                                         </div>
                                                                         <div style={{ marginTop: '6px' }}>
                                                                             <a className="btn sm" href={buildValDownloadUrl(model.task_id, val.plots.pr_curve)} target="_blank" rel="noreferrer">下载</a>
@@ -697,7 +674,7 @@ function ModelTestPage({ setPageUrl, parameter }) {
                                                                     <div style={{ textAlign: 'center' }}>
                                                                         <div style={{ fontSize: '13px', color: 'var(--secondary-text-color)', marginBottom: '6px' }}>F1 曲线</div>
                                                                         <div style={{ cursor: 'zoom-in' }} onClick={() => { setPreviewInfo({ taskID: model.task_id, filePath: val.plots.f1_curve, title: 'F1 曲线' }); setPreviewVisible(true); }}>
-                                                                            <ValResultImage taskID={model.task_id} filePath={val.plots.f1_curve} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
+                                                                            <ValResultImage thumbnail taskID={model.task_id} filePath={val.plots.f1_curve} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
                                                                         </div>
                                                                         <div style={{ marginTop: '6px' }}>
                                                                             <a className="btn sm" href={buildValDownloadUrl(model.task_id, val.plots.f1_curve)} target="_blank" rel="noreferrer">下载</a>
@@ -708,7 +685,7 @@ function ModelTestPage({ setPageUrl, parameter }) {
                                                                     <div style={{ textAlign: 'center' }}>
                                                                         <div style={{ fontSize: '13px', color: 'var(--secondary-text-color)', marginBottom: '6px' }}>P 曲线</div>
                                                                         <div style={{ cursor: 'zoom-in' }} onClick={() => { setPreviewInfo({ taskID: model.task_id, filePath: val.plots.p_curve, title: 'P 曲线' }); setPreviewVisible(true); }}>
-                                                                            <ValResultImage taskID={model.task_id} filePath={val.plots.p_curve} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
+                                                                            <ValResultImage thumbnail taskID={model.task_id} filePath={val.plots.p_curve} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
                                                                         </div>
                                                                         <div style={{ marginTop: '6px' }}>
                                                                             <a className="btn sm" href={buildValDownloadUrl(model.task_id, val.plots.p_curve)} target="_blank" rel="noreferrer">下载</a>
@@ -719,7 +696,7 @@ function ModelTestPage({ setPageUrl, parameter }) {
                                                                     <div style={{ textAlign: 'center' }}>
                                                                         <div style={{ fontSize: '13px', color: 'var(--secondary-text-color)', marginBottom: '6px' }}>R 曲线</div>
                                                                         <div style={{ cursor: 'zoom-in' }} onClick={() => { setPreviewInfo({ taskID: model.task_id, filePath: val.plots.r_curve, title: 'R 曲线' }); setPreviewVisible(true); }}>
-                                                                            <ValResultImage taskID={model.task_id} filePath={val.plots.r_curve} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
+                                                                            <ValResultImage thumbnail taskID={model.task_id} filePath={val.plots.r_curve} style={{ maxWidth: '320px', borderRadius: '6px', border: '1px solid var(--border-color)' }} />
                                                                         </div>
                                                                         <div style={{ marginTop: '6px' }}>
                                                                             <a className="btn sm" href={buildValDownloadUrl(model.task_id, val.plots.r_curve)} target="_blank" rel="noreferrer">下载</a>
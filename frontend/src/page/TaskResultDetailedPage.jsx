@@ -21,32 +21,30 @@ function getExplanation(item) {
 }
 
 function ImageCard({ taskID, filePath, resultFilePath }) {
-    const [base64, setBase64] = useState("");
+    const [error, setError] = useState(false);
+    const params = { taskID, filePath, resultFilePath };
 
-    useEffect(() => {
-        api.get('/ITraining/getTrainingTaskOutputFile', {
-            params: {
-                taskID: taskID,
-                filePath: filePath,
-                resultFilePath: resultFilePath
-            }
-        })
-            .then(data => {
-                if (data.code === 200) {
-                    setBase64(data.data.base64);
-                }
-            })
-            .catch(err => {
-                console.error("获取图像Base64失败:", err);
-            });
-    }, [taskID, filePath]);
-
-    return base64 ? (
+    // 卡片中显示缩略图，点击链接查看原图
+    return error ? (
+        <span>加载失败</span>
+    ) : (
         <>
-            <img src={`${base64}`} alt={filePath} style={{ width: '100%' }} />
+            <img
+                src={api.url('/ITraining/getTrainingTaskOutputImage', { ...params, thumbnail: 1 })}
+                alt={filePath}
+                style={{ width: '100%' }}
+                loading="lazy"
+                onError={() => setError(true)}
+            />
+            <a
+                href={api.url('/ITraining/getTrainingTaskOutputImage', params)}
+                target="_blank"
+                rel="noreferrer"
+                onClick={e => e.stopPropagation()}
+            >
+                查看原图
+            </a>
         </>
-    ) : (
-        <span>加载中...</span>
     )
 }
 
@@ -148,6 +146,7 @@ function TaskResultDetailedPage({ setPageUrl, parameter }) {
     const [analyzeTrainingResultsData, setAnalyzeTrainingResultsData] = useState("");
     const [csvData, setCsvData] = useState([]);
     const [headers, setHeaders] = useState([]);
+    const [logLines, setLogLines] = useState([]);
 
     useEffect(() => {
         hljs.highlightAll();
@@ -175,31 +174,73 @@ function TaskResultDetailedPage({ setPageUrl, parameter }) {
     }, [parameter.taskID]);
 
     useEffect(() => {
-        if (taskResultData.__taskResultFilePath) {
-            api.get("/ITraining/getTrainingTaskOutputFile", {
+        if (!taskResultData.__taskResultFilePath) return;
+
+        // 按 epoch 增量获取 results.csv 中的指标，训练未完成时定时刷新
+        let since = 0;
+        let rows = [];
+        let timer = null;
+        let cancelled = false;
+
+        const fetchMetrics = () => {
+            api.get("/ITraining/getTrainingMetrics", {
                 params: {
                     taskID: parameter.taskID,
-                    filePath: "results.csv",
-                    resultFilePath: taskResultData.__taskResultFilePath
+                    resultFilePath: taskResultData.__taskResultFilePath,
+                    since: since
                 }
             })
                 .then(res => {
-                    if (res.code === 200 && res.data?.type === "csv") {
-                        const content = res.data.content.trim();
-                        const lines = content.split("\n");
-                        const headerRow = lines[0].split(",");
-                        const dataRows = lines.slice(1).map(line => line.split(","));
+                    if (cancelled) return;
+                    if (res.code !== 200) {
+                        console.error("获取训练指标失败:", res.msg);
+                        return;
+                    }
+                    const { columns, metrics, next, completed } = res.data;
+                    const count = columns.length ? metrics[columns[0]].length : 0;
+                    if (count > 0) {
+                        for (let i = 0; i < count; i++) {
+                            rows.push(columns.map(column => metrics[column][i] ?? ""));
+                        }
+                        rows = [...rows];
+                        since = next;
+                        setHeaders(columns);
+                        setCsvData(rows);
+                        setAnalyzeTrainingResultsData(analyzeTrainingResults([columns.join(","), ...rows.map(row => row.join(","))].join("\n")));
+                    }
+                    if (!completed) {
+                        timer = setTimeout(fetchMetrics, 5000);
+                    }
+                })
+                .catch(err => {
+                    console.error("获取训练指标失败:", err);
+                });
+        };
 
-                        setHeaders(headerRow);
-                        setCsvData(dataRows);
+        fetchMetrics();
+        return () => {
+            cancelled = true;
+            clearTimeout(timer);
+        };
+    }, [parameter.taskID, taskResultData]);
 
-                        setAnalyzeTrainingResultsData(analyzeTrainingResults(res.data.content.trim()));
+    useEffect(() => {
+        if (taskResultData.__taskResultFilePath) {
+            api.get("/ITraining/getTrainingTaskResultLog", {
+                params: {
+                    taskID: parameter.taskID,
+                    resultFilePath: taskResultData.__taskResultFilePath
+                }
+            })
+                .then(res => {
+                    if (res.code === 200) {
+                        setLogLines(res.data.log || []);
                     } else {
-                        console.error("不是CSV格式或请求失败");
+                        console.error("获取日志失败:", res.msg);
                     }
                 })
                 .catch(err => {
-                    console.error("获取results失败:", err);
+                    console.error("获取日志失败:", err);
                 });
         }
     }, [parameter.taskID, taskResultData]);
@@ -400,7 +441,7 @@ function TaskResultDetailedPage({ setPageUrl, parameter }) {
                             whiteSpace: 'pre-wrap'
                         }}
                     >
-                        {(taskResultData?.log || []).join('\n')}
+                        {logLines.join('\n')}
                     </code>
                 </pre>
             </div>